@@ -1,6 +1,20 @@
+import os
+import re
 from core.llm import ModelManager
 from config.settings import ROOMS
 
+# Sampling temperatures per decision type
+MOVE_TEMPERATURE = 0.1
+DISCUSSION_TEMPERATURE = 1.0
+VOTE_TEMPERATURE = 0.1
+
+# world_view keys of the log files behind each in-memory context log
+LOG_PATH_KEYS = {
+    "action": "log_path",
+    "discussion": "discussion_log_path",
+    "results": "results_log_path",
+}
+
 class BaseAgent:
     def __init__(self, name, color, role, model_name):
         self.name = name
@@ -9,16 +23,86 @@ class BaseAgent:
         self.model_name = model_name
         self.llm = ModelManager.get_instance()
         self.action_num = 0
+        self.game_id = None  # set by GameEngine.setup
+
+    def _tags(self, round_num):
+        """Telemetry tags of this agent's generate() calls (core/telemetry.py)."""
+        return {"game": self.game_id, "round": round_num, "agent": self.name}
+
+    def _read_file(self, path):
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        return ""
+
+    def _get_current_round_log(self, full_log, round_num):
+        if not full_log: return ""
+        round_num = str(round_num)
+        pattern = f"(?:Round {round_num}/|=== Round {round_num} ===)"
+        match = re.search(pattern, full_log)
+        if match: return full_log[match.start():]
+        else: return full_log
+
+    def _read_log(self, world_view, log_name, since_round=None):
+        """
+        Returns the 'action', 'discussion' or 'results' log, optionally only
+        from round since_round onwards. Served from the in-memory context
+        store; falls back to reading the file for views built without one.
+        """
+        context = world_view.get("context")
+        if context and log_name in context:
+            log = context[log_name]
+            return log.text() if since_round is None else log.since_round(since_round)
+
+        full_log = self._read_file(world_view[LOG_PATH_KEYS[log_name]])
+        return full_log if since_round is None else self._get_current_round_log(full_log, since_round)
 
     def think_and_act(self, world_view, round_num):
         """
         Main decision loop for the movement phase.
         Returns tuple: (action_type, target/destination, raw_reasoning)
         """
+        request, ctx = self.prepare_action(world_view, round_num)
+        if request is None:
+            return ctx
+        response = self.llm.generate(self.model_name, **request)
+        return self.resolve_action(response, ctx)
+
+    def prepare_action(self, world_view, round_num):
+        """
+        Builds the movement prompt without calling the LLM.
+        Returns (request, ctx): request holds the generate() keyword arguments
+        (system_prompt, user_prompt, temperature, phase, tags, answers) and ctx
+        is passed back to resolve_action. If no LLM call is needed, request is
+        None and ctx is the final decision tuple.
+        """
+        raise NotImplementedError
+
+    def resolve_action(self, response, ctx):
+        """Parses an LLM response from prepare_action's request into a decision tuple."""
         raise NotImplementedError
 
     def participate_in_discussion(self, conversation_history, world_view):
         raise NotImplementedError
 
-    def vote(self, world_view, candidates):
-        raise NotImplementedError
\ No newline at end of file
+    def vote(self, world_view, candidates, round_num, **kwargs):
+        request, candidates = self.prepare_vote(world_view, candidates, round_num, **kwargs)
+        response = self.llm.generate(self.model_name, **request)
+        return self.resolve_vote(response, candidates)
+
+    def prepare_vote(self, world_view, candidates, round_num):
+        """
+        Builds the voting prompt without calling the LLM.
+        Returns (request, candidates); candidates may be narrowed (hybrid agents).
+        """
+        raise NotImplementedError
+
+    def resolve_vote(self, response, candidates):
+        """Maps an LLM response onto one of the candidates, defaulting to SKIP."""
+        clean_resp = response.strip()
+
+        for cand in candidates:
+            if cand in clean_resp:
+                return cand
+
+        return "SKIP"
@@ -1,7 +1,5 @@
 # agents/byzantine_agent.py
-import os
-import re
-from agents.base_agent import BaseAgent
+from agents.base_agent import BaseAgent, MOVE_TEMPERATURE, DISCUSSION_TEMPERATURE, VOTE_TEMPERATURE
 from config.settings import ROOMS, MAX_MOVEMENT_PHASES
 
 class ByzantineAgent(BaseAgent):
@@ -39,24 +37,9 @@ class ByzantineAgent(BaseAgent):
             out = out.replace(placeholder, str(val))
         return out
 
-    def _read_file(self, path):
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                return f.read()
-        return ""
-
-    def _get_current_round_log(self, full_log, round_num):
-        if not full_log: return ""
-        round_num = str(round_num)
-        pattern = f"(?:Round {round_num}/|=== Round {round_num} ===)"
-        match = re.search(pattern, full_log)
-        if match: return full_log[match.start():]
-        else: return full_log
-
-    def think_and_act(self, world_view, round_num):
-        full_action_log = self._read_file(world_view["log_path"])
-        results_log = self._read_file(world_view["results_log_path"])
-        current_round_log = self._get_current_round_log(full_action_log, round_num)
+    def prepare_action(self, world_view, round_num):
+        results_log = self._read_log(world_view, "results")
+        current_round_log = self._read_log(world_view, "action", since_round=round_num)
         
         loc = world_view["self"]["location"]
         occupants = world_view["surroundings"][loc]["occupants"]
@@ -124,7 +107,15 @@ Options
 
 {move_body}
 """
-        response = self.llm.generate(self.model_name, self._system_prompt(), prompt, temperature=0.1)
+        request = {"system_prompt": self._system_prompt(), "user_prompt": prompt, "temperature": MOVE_TEMPERATURE,
+                   "phase": "movement", "tags": self._tags(round_num), "answers": special_actions + move_options}
+        ctx = {"loc": loc, "adj": adj, "bodies": bodies, "button_used": button_used,
+               "victims": victims, "last_action": last_action}
+        return request, ctx
+
+    def resolve_action(self, response, ctx):
+        loc, adj, bodies, button_used = ctx["loc"], ctx["adj"], ctx["bodies"], ctx["button_used"]
+        victims, last_action = ctx["victims"], ctx["last_action"]
         clean_resp = response.strip().upper()
         
         # Check for TAG action first, safeguard to avoid consecutive tags in case hallucination
@@ -146,10 +137,8 @@ Options
         return "move", loc, response
 
     def participate_in_discussion(self, conversation_history, world_view, round_num):
-        action_log = self._read_file(world_view["log_path"])
-        recent_action_log = self._get_current_round_log(action_log, round_num)
-        discussion_log = self._read_file(world_view["discussion_log_path"])
-        recent_discussion = self._get_current_round_log(discussion_log, round_num)
+        recent_action_log = self._read_log(world_view, "action", since_round=round_num)
+        recent_discussion = self._read_log(world_view, "discussion", since_round=round_num)
 
         n = self.max_discussion_messages
         if n < 3:
@@ -187,7 +176,7 @@ You are in a discussion phase.
 ==================================
 
 == Past rounds results ===
-{self._read_file(world_view["results_log_path"])}
+{self._read_log(world_view, "results")}
 
 === What has been said in the ongoing discussion. ===
 {recent_discussion}
@@ -197,13 +186,13 @@ Your Teammates: {teammates_str}
 
 {discussion_body}
 """
-        return self.llm.generate(self.model_name, self._system_prompt(), prompt, temperature=1.0)
+        return self.llm.generate(self.model_name, self._system_prompt(), prompt, temperature=DISCUSSION_TEMPERATURE,
+                                 phase="discussion", tags=self._tags(round_num))
 
-    def vote(self, world_view, candidates, round_num):
-        discussion_log = self._read_file(world_view["discussion_log_path"])
+    def prepare_vote(self, world_view, candidates, round_num):
         round_num = int(round_num)
-        recent_discussion = self._get_current_round_log(discussion_log, round_num-2)           
-        results_log = self._read_file(world_view["results_log_path"])
+        recent_discussion = self._read_log(world_view, "discussion", since_round=round_num-2)           
+        results_log = self._read_log(world_view, "results")
 
         default_vote_instructions = """
 INSTRUCTIONS:
@@ -238,14 +227,9 @@ Note: Skipping your vote is an option. Your vote is ANONYMOUS. Only total counts
 
 {vote_body}
 """
-        response = self.llm.generate(self.model_name, self._system_prompt(), prompt)
-        clean_resp = response.strip()
-        
-        for cand in candidates:
-            if cand in clean_resp:
-                return cand
-                
-        return "SKIP"
+        request = {"system_prompt": self._system_prompt(), "user_prompt": prompt, "temperature": VOTE_TEMPERATURE,
+                   "phase": "voting", "tags": self._tags(round_num), "answers": list(candidates)}
+        return request, candidates
     
     def _system_prompt(self):
         overrides = getattr(self, "prompt_overrides", {}) or {}
@@ -1,7 +1,5 @@
 # agents/honest_agent.py
-import os
-import re
-from agents.base_agent import BaseAgent
+from agents.base_agent import BaseAgent, MOVE_TEMPERATURE, DISCUSSION_TEMPERATURE, VOTE_TEMPERATURE
 from config.settings import ROOMS, MAX_MOVEMENT_PHASES
 
 class HonestAgent(BaseAgent):
@@ -37,27 +35,12 @@ class HonestAgent(BaseAgent):
             out = out.replace(placeholder, str(val))
         return out
 
-    def _read_file(self, path):
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                return f.read()
-        return ""
-
-    def _get_current_round_log(self, full_log, round_num):
-        if not full_log: return ""
-        round_num = str(round_num)
-        pattern = f"(?:Round {round_num}/|=== Round {round_num} ===)"
-        match = re.search(pattern, full_log)
-        if match: return full_log[match.start():]
-        else: return full_log
-
-    def think_and_act(self, world_view, round_num):
+    def prepare_action(self, world_view, round_num):
         # 1. READ LOGS
-        full_action_log = self._read_file(world_view["log_path"])
-        results_log = self._read_file(world_view["results_log_path"])
+        results_log = self._read_log(world_view, "results")
 
         # 2. FILTER LOG
-        current_round_log = self._get_current_round_log(full_action_log, round_num)
+        current_round_log = self._read_log(world_view, "action", since_round=round_num)
 
         # 3. Setup Context
         loc = world_view["self"]["location"]
@@ -73,7 +56,7 @@ class HonestAgent(BaseAgent):
         options_str = ""
         if bodies:
             special_actions.append("REPORT")
-            return "report", bodies[0], "REPORT"
+            return None, ("report", bodies[0], "REPORT")
 
         if loc == "Cafeteria" and not button_used: 
             special_actions.append("BUTTON")
@@ -115,7 +98,13 @@ Options:
 
 {move_body}
 """
-        response = self.llm.generate(self.model_name, self._system_prompt(), prompt, temperature=0.1)
+        request = {"system_prompt": self._system_prompt(), "user_prompt": prompt, "temperature": MOVE_TEMPERATURE,
+                   "phase": "movement", "tags": self._tags(round_num), "answers": special_actions + move_options}
+        ctx = {"loc": loc, "adj": adj, "bodies": bodies, "button_used": button_used}
+        return request, ctx
+
+    def resolve_action(self, response, ctx):
+        loc, adj, bodies, button_used = ctx["loc"], ctx["adj"], ctx["bodies"], ctx["button_used"]
         clean_resp = response.strip().upper()
         
         if "REPORT" in clean_resp and bodies:
@@ -129,10 +118,8 @@ Options:
         return "move", loc, response
 
     def participate_in_discussion(self, conversation_history, world_view, round_num):
-        full_action_log = self._read_file(world_view["log_path"])
-        recent_action_log = self._get_current_round_log(full_action_log, round_num)
-        discussion_log = self._read_file(world_view["discussion_log_path"])
-        recent_discussion = self._get_current_round_log(discussion_log, round_num)
+        recent_action_log = self._read_log(world_view, "action", since_round=round_num)
+        recent_discussion = self._read_log(world_view, "discussion", since_round=round_num)
 
         n = self.max_discussion_messages
         if n < 3:
@@ -171,7 +158,7 @@ You are in a discussion phase.
 ==================================
 
 == Past rounds results ===
-{self._read_file(world_view["results_log_path"])}
+{self._read_log(world_view, "results")}
 
 === What has been said in the ongoing discussion ===
 {recent_discussion}
@@ -179,12 +166,12 @@ You are in a discussion phase.
 
 {discussion_body}
 """
-        return self.llm.generate(self.model_name, self._system_prompt(), prompt, temperature=1.0)
+        return self.llm.generate(self.model_name, self._system_prompt(), prompt, temperature=DISCUSSION_TEMPERATURE,
+                                 phase="discussion", tags=self._tags(round_num))
 
-    def vote(self, world_view, candidates, round_num, pruner=None):
-        discussion_log = self._read_file(world_view["discussion_log_path"])
+    def prepare_vote(self, world_view, candidates, round_num, pruner=None):
         round_num = int(round_num)
-        recent_discussion = self._get_current_round_log(discussion_log, round_num-2) # can adjust as needed
+        recent_discussion = self._read_log(world_view, "discussion", since_round=round_num-2) # can adjust as needed
 
         
         if self.is_hybrid and pruner is not None:
@@ -202,7 +189,7 @@ You are in a discussion phase.
         # except Exception as e:
         #     print(f"Failed to write debug file: {e}")
         
-        results_log = self._read_file(world_view["results_log_path"])
+        results_log = self._read_log(world_view, "results")
 
         default_vote_instructions = """
 INSTRUCTIONS:
@@ -236,14 +223,9 @@ Note: Be aware of total player count to ensure Byzantines do not equal or outnum
 
 {vote_body}
 """
-        response = self.llm.generate(self.model_name, self._system_prompt(), prompt)
-        clean_resp = response.strip()
-        
-        for cand in candidates:
-            if cand in clean_resp:
-                return cand
-                
-        return "SKIP"
+        request = {"system_prompt": self._system_prompt(), "user_prompt": prompt, "temperature": VOTE_TEMPERATURE,
+                   "phase": "voting", "tags": self._tags(round_num), "answers": list(candidates)}
+        return request, candidates
 
     def _system_prompt(self):
        overrides = getattr(self, "prompt_overrides", {}) or {}
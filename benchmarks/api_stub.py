@@ -0,0 +1,153 @@
+"""Local stub of the OpenAI-compatible and Anthropic HTTP APIs.
+
+Serves POST /v1/chat/completions and POST /v1/messages with a fixed reply after
+an artificial latency, and counts how many requests are in flight at once. Use it
+to exercise the async API clients (pooling, concurrency and rate limits) without
+real keys or network access.
+
+    # serve on a fixed port, then run games with OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+    python benchmarks/api_stub.py --port 8765 --latency 0.5
+
+    # fire 64 prompts through ModelManager.generate_batch against an in-process stub
+    python benchmarks/api_stub.py --drive 64 --provider openai
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+class StubStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.started = []  # monotonic start time of every request
+
+    def enter(self):
+        with self.lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.started.append(time.monotonic())
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+def make_handler(stats, latency, reply):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is visible
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            stats.enter()
+            try:
+                time.sleep(latency)
+            finally:
+                stats.leave()
+
+            if self.path.endswith("/chat/completions"):
+                payload = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": reply}}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11},
+                }
+            elif self.path.endswith("/messages"):
+                payload = {
+                    "id": "msg_stub",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": body.get("model", "stub"),
+                    "content": [{"type": "text", "text": reply}],
+                    "stop_reason": "end_turn",
+                    "stop_sequence": None,
+                    "usage": {"input_tokens": 10, "output_tokens": 1},
+                }
+            else:
+                self.send_error(404)
+                return
+
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def start_stub(port=0, latency=0.2, reply="Cafeteria"):
+    """Start the stub in a background thread. Returns (server, stats)."""
+    stats = StubStats()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(stats, latency, reply))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def drive(n, provider, latency):
+    server, stats = start_stub(latency=latency)
+    port = server.server_address[1]
+    base = f"http://127.0.0.1:{port}"
+    os.environ[f"{provider.upper()}_BASE_URL"] = base + ("/v1" if provider != "anthropic" else "")
+    os.environ.setdefault({"navigator": "NAVIGATOR_TOOLKIT_API_KEY", "openai": "OPENAI_API_KEY",
+                           "anthropic": "ANTHROPIC_API_KEY"}[provider], "stub-key")
+
+    from core.api_clients import ProviderLimiter
+    from core.llm import ModelManager
+
+    limiter = ProviderLimiter.for_provider(provider)
+    manager = ModelManager.get_instance()
+    prompts = [("system", f"prompt {i}", 0.1) for i in range(n)]
+
+    start = time.perf_counter()
+    responses = manager.generate_batch(f"{provider}:stub-model", prompts)
+    elapsed = time.perf_counter() - start
+
+    ok = sum(r == "Cafeteria" for r in responses)
+    print(f"{n} requests to {provider} stub ({latency:.2f}s latency): {elapsed:.2f}s, {ok}/{n} ok")
+    print(f"max in flight: {stats.max_in_flight} (limit {limiter.semaphore._value})")
+    if limiter.bucket is not None and len(stats.started) > 1:
+        span = stats.started[-1] - stats.started[0]
+        print(f"observed rate: {(len(stats.started) - 1) / span if span else float('inf'):.1f} req/s "
+              f"(limit {limiter.bucket.rate:.1f} req/s, burst {limiter.bucket.capacity:.0f})")
+    print(f"token usage: {manager.get_token_usage()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds each request takes")
+    parser.add_argument("--reply", type=str, default="Cafeteria")
+    parser.add_argument("--drive", type=int, default=0, help="send this many prompts through ModelManager and report")
+    parser.add_argument("--provider", choices=["openai", "navigator", "anthropic"], default="openai")
+    args = parser.parse_args()
+
+    if args.drive:
+        drive(args.drive, args.provider, args.latency)
+    else:
+        server, _ = start_stub(args.port, args.latency, args.reply)
+        print(f"API stub listening on http://127.0.0.1:{server.server_address[1]} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,135 @@
+"""Compares the worker's static and continuous batching on staggered requests.
+
+Requests arrive as a Poisson stream (like decisions from several games that
+are out of step) and are served in-process by the same ModelManager calls the
+worker uses:
+
+    static      take everything queued, run generate_batch(), repeat (worker.serve_socket)
+    continuous  submit each request on arrival to generate_continuous()
+
+Latency is measured from arrival to response. Runs on CPU with the small
+test models listed in config/model_composition.py:
+
+    python benchmarks/continuous_batching.py --model TinyLlama/TinyLlama-1.1B-Chat-v1.0 \
+        --requests 32 --rate 4
+"""
+
+import argparse
+import os
+import queue
+import random
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ["LLM_MODE"] = "LOCAL"
+os.environ["LLM_CACHE_MODE"] = "off"
+
+from core.llm import ModelManager, MAX_LOCAL_BATCH
+
+SYSTEM_PROMPT = "You are an agent in a social deduction game on a spaceship. Answer briefly."
+QUESTIONS = [
+    "You are in Cafeteria. Adjacent rooms: Admin, MedBay, Weapons. Where do you move?",
+    "Agent_3 was seen leaving Electrical. What do you say in the meeting?",
+    "Vote for the most suspicious agent or SKIP. Candidates: Agent_1, Agent_4, Agent_6.",
+    "You found a body in Storage. Do you report it or keep moving?",
+]
+
+
+def arrivals(n, rate, seed):
+    rng = random.Random(seed)
+    t, times = 0.0, []
+    for _ in range(n):
+        t += rng.expovariate(rate)
+        times.append(t)
+    return times
+
+
+def run_static(manager, model, prompts, times):
+    pending = queue.Queue()
+    done = {}
+
+    def feed():
+        start = time.perf_counter()
+        for i, t in enumerate(times):
+            time.sleep(max(0.0, start + t - time.perf_counter()))
+            pending.put((i, time.perf_counter()))
+
+    threading.Thread(target=feed, daemon=True).start()
+    while len(done) < len(prompts):
+        batch = [pending.get()]
+        while len(batch) < MAX_LOCAL_BATCH:
+            try:
+                batch.append(pending.get_nowait())
+            except queue.Empty:
+                break
+        manager.generate_batch(model, [prompts[i] for i, _ in batch])
+        finished = time.perf_counter()
+        for i, arrived in batch:
+            done[i] = finished - arrived
+    return [done[i] for i in range(len(prompts))]
+
+
+def run_continuous(manager, model, prompts, times):
+    latencies = [None] * len(prompts)
+    all_done = threading.Event()
+    remaining = [len(prompts)]
+    lock = threading.Lock()
+
+    def record(i, arrived):
+        def callback(_):
+            latencies[i] = time.perf_counter() - arrived
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    all_done.set()
+        return callback
+
+    start = time.perf_counter()
+    for i, t in enumerate(times):
+        time.sleep(max(0.0, start + t - time.perf_counter()))
+        arrived = time.perf_counter()
+        manager.generate_continuous(model, *prompts[i]).add_done_callback(record(i, arrived))
+    all_done.wait()
+    return latencies
+
+
+def summarize(name, latencies, elapsed):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    print(f"  {name:<11} mean {statistics.mean(latencies):6.2f}s  p95 {p95:6.2f}s  "
+          f"makespan {elapsed:6.2f}s  ({len(latencies) / elapsed:.2f} req/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="TinyLlama/TinyLlama-1.1B-Chat-v1.0")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--rate", type=float, default=4.0, help="Mean arrivals per second")
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    manager = ModelManager.get_instance()
+    manager.load_model(args.model)
+    rng = random.Random(args.seed)
+    prompts = [(SYSTEM_PROMPT, rng.choice(QUESTIONS), args.temperature) for _ in range(args.requests)]
+    times = arrivals(args.requests, args.rate, args.seed)
+
+    # Warm up both paths so neither pays for first-call setup
+    manager.generate_batch(args.model, prompts[:2])
+    manager.generate_continuous(args.model, *prompts[0]).result()
+
+    print(f"{args.requests} requests to {args.model} at {args.rate}/s (batch limit {MAX_LOCAL_BATCH})")
+    for name, run in (("static", run_static), ("continuous", run_continuous)):
+        start = time.perf_counter()
+        latencies = run(manager, args.model, prompts, times)
+        summarize(name, latencies, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
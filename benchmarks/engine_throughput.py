@@ -0,0 +1,125 @@
+"""Measures GameEngine overhead end to end with the mock LLM backend.
+
+Plays N games of M agents with LLM_MODE=MOCK (core/mock_llm.py), so no model,
+GPU or API key is needed, and reports wall time per movement tick, per
+discussion message and per voting phase from the engines' PhaseTimings. With the
+default zero latency those times are the engine's own overhead (views,
+prompts, logging, live-state writes); --latency injects model latency to see
+how much of it the engine overlaps.
+
+    python benchmarks/engine_throughput.py --games 8 --agents 10 --concurrency 4
+    python benchmarks/engine_throughput.py --games 4 --latency uniform:0.05,0.2
+
+Game logs go to logs/EngineBench/ and are removed afterwards unless --keep-logs.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+COMP_NAME = "EngineBench"
+STEPS = ("tick", "discussion_message", "voting")
+
+
+def build_composition(agents, byzantines, models, classifiers):
+    names = [f"mock/model-{i}" for i in range(models)]
+    composition = {
+        "name": COMP_NAME,
+        "honest_model": names,
+        "byzantine_model": names,
+        "honest_count": agents - byzantines,
+        "byzantine_count": byzantines,
+    }
+    if not classifiers:
+        composition["enabled_classifiers"] = {"lr": False, "sgd": False, "svm": False}
+    return composition
+
+
+def run_game(index, args, composition):
+    from core.game_engine import GameEngine
+
+    game_id = f"bench_{index}"
+    engine = GameEngine(
+        game_id=game_id,
+        num_agents=args.agents,
+        num_rounds=args.rounds,
+        num_ticks=args.ticks,
+        decision_workers=args.decision_workers,
+        action_delay=0,
+        seed=args.seed + index,
+        live_state_file=os.path.join("logs", COMP_NAME, f"Game_{game_id}", "live_state.json"),
+    )
+    engine.setup(composition=composition)
+    result = engine.run()
+    return engine.timings, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=4)
+    parser.add_argument("--agents", type=int, default=8)
+    parser.add_argument("--byzantines", type=int, default=None, help="Default: a quarter of the agents")
+    parser.add_argument("--models", type=int, default=2, help="Distinct mock model names agents are spread over")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1, help="Games in flight at once")
+    parser.add_argument("--decision_workers", type=int, default=4)
+    parser.add_argument("--latency", default="0", help="Mock latency spec (see core/mock_llm.py)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--classifiers", action="store_true", help="Run the Observer classifiers too")
+    parser.add_argument("--keep-logs", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="Show the engines' own output")
+    args = parser.parse_args()
+
+    os.environ["LLM_MODE"] = "MOCK"
+    os.environ["LLM_CACHE_MODE"] = "off"
+    os.environ["MOCK_LLM_LATENCY"] = args.latency
+    from core.game_engine import PhaseTimings
+    from core.llm import ModelManager
+
+    byzantines = args.byzantines if args.byzantines is not None else max(1, args.agents // 4)
+    composition = build_composition(args.agents, byzantines, args.models, args.classifiers)
+    manager = ModelManager.get_instance()
+
+    timings = PhaseTimings()
+    results = []
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    with output, ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+        for game_timings, result in pool.map(lambda i: run_game(i, args, composition), range(args.games)):
+            timings.merge(game_timings)
+            results.append(result)
+    elapsed = time.perf_counter() - start
+
+    mock = manager.mock
+    print(f"{args.games} games x {args.agents} agents ({byzantines} byzantine), "
+          f"{args.concurrency} at a time, latency {args.latency}")
+    print(f"  {elapsed:.2f}s total, {args.games / elapsed:.2f} games/s, "
+          f"{mock.calls} LLM calls in {mock.batches} batches, {mock.injected_seconds:.2f}s injected latency")
+    coalescing = manager.get_coalescing_stats()
+    print(f"  {coalescing['coalesced']} calls coalesced into {coalescing['leaders']} in-flight generations")
+    summary = timings.summary()
+    for step in STEPS:
+        if step in summary:
+            count, mean, worst = summary[step]
+            print(f"  {step:<19} {count:6d} x  mean {mean * 1000:8.2f} ms  max {worst * 1000:8.2f} ms")
+    outcomes = {}
+    for result in results:
+        outcomes[result] = outcomes.get(result, 0) + 1
+    print(f"  results: {outcomes}")
+
+    if not args.keep_logs:
+        shutil.rmtree(os.path.join("logs", COMP_NAME), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Times controller start-up imports and fails if they regress.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter with
+LLM_MODE=CONTROLLER, takes the fastest of several runs, and exits non-zero
+if the cumulative import time of `main` exceeds the budget or if any heavy
+ML dependency was imported on the way.
+
+    python benchmarks/import_time.py --budget-ms 300 --runs 5
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Controllers run no model locally and must not import these at start-up
+HEAVY_MODULES = ["torch", "transformers", "unsloth", "pandas", "sklearn", "scipy", "xgboost", "joblib", "numpy", "tqdm"]
+
+# "import time: <self us> | <cumulative us> | <indented module name>"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def measure(module):
+    """Returns ({top-level package: cumulative us}, cumulative us of module) for one cold import."""
+    env = dict(os.environ, LLM_MODE="CONTROLLER", PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    packages = {}
+    total = None
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, name = int(match.group(2)), match.group(4)
+        top = name.split(".")[0]
+        packages[top] = max(packages.get(top, 0), cumulative)
+        if name == module and not match.group(3):
+            total = cumulative
+    return packages, total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main", help="Module a controller imports at start-up")
+    parser.add_argument("--budget-ms", type=float, default=300.0, help="Fail above this cumulative import time")
+    parser.add_argument("--runs", type=int, default=5, help="Cold imports to run; the fastest counts")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list")
+    args = parser.parse_args()
+
+    # Best of several runs: the first also warms the OS file cache
+    results = [measure(args.module) for _ in range(max(1, args.runs))]
+    packages, total = min(results, key=lambda r: r[1])
+    total_ms = total / 1000
+
+    print(f"import {args.module} (LLM_MODE=CONTROLLER), best of {len(results)}: {total_ms:.1f} ms")
+    for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {name:<24} {us / 1000:8.1f} ms")
+
+    failures = []
+    heavy = [m for m in HEAVY_MODULES if m in packages]
+    if heavy:
+        failures.append(f"heavy modules imported at start-up: {', '.join(heavy)}")
+    if total_ms > args.budget_ms:
+        failures.append(f"{total_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+    if failures:
+        sys.exit("Import time check failed: " + "; ".join(failures))
+    print("Import time OK")
+
+
+if __name__ == "__main__":
+    main()
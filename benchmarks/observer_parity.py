@@ -0,0 +1,112 @@
+"""Checks Observer.analyze_round against the original pandas implementation and times both.
+
+    python benchmarks/observer_parity.py --rounds 200 --statements 20
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import pandas as pd
+
+from core.game_engine import Observer
+
+PHRASES = [
+    "I was in {room} with {agent} the whole time.",
+    "{agent} was acting sus near {room}, I saw them leave quickly.",
+    "I found the body in {room}! {agent} was the only one nearby.",
+    "I pressed the button because {agent} followed me from {room}.",
+    "Skip this vote, we don't have enough information yet.",
+    "I can vouch for {agent}, we did tasks in {room} together.",
+    "Why did {agent} go from {room} to Electrical without a task?",
+    "I think it's {agent}. Vote them out before more eliminations happen!",
+]
+ROOMS = ["Cafeteria", "MedBay", "Reactor", "Storage", "Admin", "Weapons", "Security", "Electrical"]
+
+
+def reference_analyze_round(observer, statements):
+    """Observer.analyze_round before the NumPy fast path (per-row pandas apply + groupby)."""
+    df = pd.DataFrame(statements)
+    df['Clean_Text'] = df['Text'].apply(observer._preprocess)
+    input_df = df[['Clean_Text', 'Reported', 'S_Num']].rename(
+        columns={'Clean_Text': 'Text', 'S_Num': 'Statement_Num'}
+    )
+    results = {}
+    for name, clf in observer.models.items():
+        df[f'{name}_Prob'] = clf.predict_proba(input_df)[:, 1]
+        results[name] = df.groupby('Agent')[f'{name}_Prob'].mean()
+
+    agents = results["LogisticRegression"].index if "LogisticRegression" in results else []
+    return {
+        agent_name: {
+            name: float(results.get(name, {}).get(agent_name, 0))
+            for name in ("LogisticRegression", "SGD", "SVM")
+        }
+        for agent_name in agents
+    }
+
+
+def make_round(rng, n_statements, n_agents):
+    statements = []
+    for s_num in range(1, n_statements + 1):
+        agent = f"Agent_{rng.randrange(n_agents)}"
+        text = rng.choice(PHRASES).format(room=rng.choice(ROOMS), agent=f"Agent_{rng.randrange(n_agents)}")
+        statements.append({"Agent": agent, "Text": text, "Reported": rng.randint(0, 1), "S_Num": s_num})
+    return statements
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--statements", type=int, default=20, help="statements per discussion")
+    parser.add_argument("--agents", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    args = parser.parse_args()
+
+    observer = Observer()
+    if not observer.models:
+        sys.exit("No observer models found in results/classifiers/models/")
+    print(f"Models: {list(observer.models)}; preprocessor groups: {len(observer._fast_groups)}, "
+          f"pandas fallback: {observer._slow_models or 'none'}")
+
+    rng = random.Random(args.seed)
+    rounds = [make_round(rng, args.statements, args.agents) for _ in range(args.rounds)]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        expected = [reference_analyze_round(observer, r) for r in rounds]
+        reference_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = [observer.analyze_round(r) for r in rounds]
+        fast_time = time.perf_counter() - start
+
+    max_diff = 0.0
+    for exp, act in zip(expected, actual):
+        if list(exp) != list(act):
+            sys.exit(f"Agent mismatch: {list(exp)} vs {list(act)}")
+        for agent, scores in exp.items():
+            for name, value in scores.items():
+                max_diff = max(max_diff, abs(value - act[agent][name]))
+
+    print(f"{args.rounds} discussions x {args.statements} statements")
+    print(f"  pandas reference: {reference_time * 1000 / args.rounds:.2f} ms/round")
+    print(f"  analyze_round:    {fast_time * 1000 / args.rounds:.2f} ms/round "
+          f"({reference_time / fast_time:.1f}x)")
+    print(f"  max |difference|: {max_diff:.2e}")
+    if max_diff > args.tolerance:
+        sys.exit(f"Parity check failed (tolerance {args.tolerance})")
+    print("Parity OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,19 @@
 NUM_ROUNDS = 10 
 MAX_MOVEMENT_PHASES = 4  
 
+# Movement ticks resolve all decisions simultaneously, so agents can think concurrently.
+DECISION_WORKERS = 8    # agents asked in parallel per tick (1 = one at a time)
+ACTION_DELAY = 0        # seconds to pause per tick (per agent when sequential) so the live map stays watchable
+BATCH_DECISIONS = True  # send prompts for the same model as one ModelManager.generate_batch() call
+
+# Game logs keep their files open; "phase" buffers writes and flushes at the end of each
+# movement/discussion phase (and at exit), "line" flushes after every entry.
+LOG_FLUSH_POLICY = "phase"
+
+# Live map state (logs/live_state.json) is rewritten at most this often; phase changes always publish.
+LIVE_STATE_MAX_WRITES_PER_SEC = 4
+LIVE_STATE_DELTAS = True  # also append per-publish changes to logs/live_state_deltas.jsonl for incremental polling
+
 ROOMS = {
     # --- Left Side (Reactor & Engines) ---
     "Reactor": [
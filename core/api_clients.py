@@ -1,10 +1,61 @@
 """API client wrappers for Navigator, OpenAI, and Anthropic providers."""
 
+import asyncio
+import os
 import time
 from dataclasses import dataclass
 
 from loguru import logger
 
+# Default endpoints; <PROVIDER>_BASE_URL overrides them (e.g. to point at a local stub server)
+BASE_URLS = {
+    "navigator": "https://api.ai.it.ufl.edu/v1",
+    "openai": "https://api.openai.com/v1",
+    "anthropic": None,  # SDK default
+}
+
+# (max requests in flight, requests per second) per provider for the async clients;
+# override with <PROVIDER>_MAX_CONCURRENCY / <PROVIDER>_RATE_LIMIT
+PROVIDER_LIMITS = {
+    "navigator": (8, 4.0),
+    "openai": (32, 10.0),
+    "anthropic": (16, 5.0),
+}
+
+API_KEY_ENV = {
+    "navigator": "NAVIGATOR_TOOLKIT_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+}
+
+PROVIDER_NAMES = {"navigator": "Navigator", "openai": "OpenAI", "anthropic": "Anthropic"}
+
+
+def _base_url(provider):
+    return os.environ.get(f"{provider.upper()}_BASE_URL") or BASE_URLS.get(provider)
+
+
+def _stop_kwargs(provider, stop):
+    """Stop sequences in the provider's request format (OpenAI takes at most 4;
+    Anthropic rejects whitespace-only ones, which are applied after the call instead)."""
+    if provider == "anthropic":
+        sequences = [s for s in stop if s.strip()]
+        return {"stop_sequences": sequences} if sequences else {}
+    return {"stop": list(stop)[:4]} if stop else {}
+
+
+def _api_key(provider, api_keys):
+    env_key = API_KEY_ENV.get(provider)
+    if not env_key:
+        raise ValueError(f"Unknown API provider: {provider}")
+
+    api_key = api_keys.get(env_key, "")
+    if not api_key:
+        raise ValueError(
+            f"API key '{env_key}' is required for provider '{provider}' but not set."
+        )
+    return api_key
+
 
 @dataclass
 class APIResponse:
@@ -13,6 +64,7 @@ class APIResponse:
     text: str
     input_tokens: int
     output_tokens: int
+    queue_wait: float = 0.0  # seconds spent waiting for the provider limiter
 
 
 class OpenAICompatibleClient:
@@ -24,7 +76,7 @@ class OpenAICompatibleClient:
         self.client = OpenAI(base_url=base_url, api_key=api_key)
         self.provider_name = provider_name
 
-    def generate(self, model_id, system_prompt, user_prompt, temperature, max_tokens=160):
+    def generate(self, model_id, system_prompt, user_prompt, temperature, max_tokens=160, stop=()):
         """Generate a response using the OpenAI-compatible API.
 
         Args:
@@ -33,6 +85,7 @@ class OpenAICompatibleClient:
             user_prompt: User prompt for the model.
             temperature: Sampling temperature.
             max_tokens: Maximum tokens to generate.
+            stop: Stop sequences.
 
         Returns:
             APIResponse with generated text and token usage.
@@ -51,6 +104,7 @@ class OpenAICompatibleClient:
                     temperature=temperature,
                     max_tokens=max_tokens,
                     timeout=60,
+                    **_stop_kwargs("openai", stop),
                 )
                 text = response.choices[0].message.content or ""
                 usage = response.usage
@@ -76,12 +130,12 @@ class OpenAICompatibleClient:
 class AnthropicClient:
     """Client for the Anthropic API."""
 
-    def __init__(self, api_key):
+    def __init__(self, api_key, base_url=None):
         import anthropic
 
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = anthropic.Anthropic(api_key=api_key, base_url=base_url)
 
-    def generate(self, model_id, system_prompt, user_prompt, temperature, max_tokens=160):
+    def generate(self, model_id, system_prompt, user_prompt, temperature, max_tokens=160, stop=()):
         """Generate a response using the Anthropic API.
 
         Args:
@@ -90,6 +144,7 @@ class AnthropicClient:
             user_prompt: User prompt for the model.
             temperature: Sampling temperature.
             max_tokens: Maximum tokens to generate.
+            stop: Stop sequences.
 
         Returns:
             APIResponse with generated text and token usage.
@@ -106,6 +161,7 @@ class AnthropicClient:
                     temperature=temperature,
                     max_tokens=max_tokens,
                     timeout=60,
+                    **_stop_kwargs("anthropic", stop),
                 )
                 text = response.content[0].text if response.content else ""
                 return APIResponse(
@@ -131,6 +187,214 @@ class AnthropicClient:
         )
 
 
+class TokenBucket:
+    """Async token bucket: allows `rate` acquisitions per second with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        # Only used from the single API event loop thread, so no lock is needed
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ProviderLimiter:
+    """Caps requests in flight (semaphore) and request rate (token bucket) for one provider.
+
+    Usage: ``async with limiter: await ...``
+    """
+
+    def __init__(self, max_concurrency, rate_limit):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = TokenBucket(rate_limit) if rate_limit else None
+
+    @classmethod
+    def for_provider(cls, provider):
+        concurrency, rate = PROVIDER_LIMITS.get(provider, (8, 4.0))
+        concurrency = int(os.environ.get(f"{provider.upper()}_MAX_CONCURRENCY", concurrency))
+        rate = float(os.environ.get(f"{provider.upper()}_RATE_LIMIT", rate))
+        return cls(concurrency, rate)
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        if self.bucket is not None:
+            await self.bucket.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+class AsyncOpenAICompatibleClient:
+    """Async client for OpenAI-compatible APIs (Navigator, OpenAI)."""
+
+    def __init__(self, base_url, api_key, provider_name, http_client=None, limiter=None):
+        from openai import AsyncOpenAI
+
+        self.client = AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
+        self.provider_name = provider_name
+        self.limiter = limiter or ProviderLimiter(8, None)
+
+    async def generate(self, model_id, system_prompt, user_prompt, temperature, max_tokens=160, stop=()):
+        """Async version of OpenAICompatibleClient.generate; waits for a limiter slot per attempt."""
+        from openai import APIConnectionError, APITimeoutError, RateLimitError
+
+        last_error = None
+        queue_wait = 0.0
+        for attempt in range(3):
+            try:
+                waiting = time.perf_counter()
+                async with self.limiter:
+                    queue_wait += time.perf_counter() - waiting
+                    response = await self.client.chat.completions.create(
+                        model=model_id,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt},
+                        ],
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        timeout=60,
+                        **_stop_kwargs("openai", stop),
+                    )
+                text = response.choices[0].message.content or ""
+                usage = response.usage
+                return APIResponse(
+                    text=text.strip(),
+                    input_tokens=usage.prompt_tokens if usage else 0,
+                    output_tokens=usage.completion_tokens if usage else 0,
+                    queue_wait=queue_wait,
+                )
+            except (APIConnectionError, APITimeoutError, RateLimitError) as e:
+                last_error = e
+                wait = 2**attempt
+                logger.warning(
+                    "[{}] Attempt {}/3 failed: {}. Retrying in {}s...",
+                    self.provider_name, attempt + 1, e, wait,
+                )
+                await asyncio.sleep(wait)
+
+        raise RuntimeError(
+            f"[{self.provider_name}] All 3 attempts failed. Last error: {last_error}"
+        )
+
+
+class AsyncAnthropicClient:
+    """Async client for the Anthropic API."""
+
+    def __init__(self, api_key, base_url=None, http_client=None, limiter=None):
+        import anthropic
+
+        self.client = anthropic.AsyncAnthropic(api_key=api_key, base_url=base_url, http_client=http_client)
+        self.limiter = limiter or ProviderLimiter(8, None)
+
+    async def generate(self, model_id, system_prompt, user_prompt, temperature, max_tokens=160, stop=()):
+        """Async version of AnthropicClient.generate; waits for a limiter slot per attempt."""
+        import anthropic
+
+        last_error = None
+        queue_wait = 0.0
+        for attempt in range(3):
+            try:
+                waiting = time.perf_counter()
+                async with self.limiter:
+                    queue_wait += time.perf_counter() - waiting
+                    response = await self.client.messages.create(
+                        model=model_id,
+                        system=system_prompt,
+                        messages=[{"role": "user", "content": user_prompt}],
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        timeout=60,
+                        **_stop_kwargs("anthropic", stop),
+                    )
+                text = response.content[0].text if response.content else ""
+                return APIResponse(
+                    text=text.strip(),
+                    input_tokens=response.usage.input_tokens,
+                    output_tokens=response.usage.output_tokens,
+                    queue_wait=queue_wait,
+                )
+            except (
+                anthropic.APIConnectionError,
+                anthropic.APITimeoutError,
+                anthropic.RateLimitError,
+            ) as e:
+                last_error = e
+                wait = 2**attempt
+                logger.warning(
+                    "[Anthropic] Attempt {}/3 failed: {}. Retrying in {}s...",
+                    attempt + 1, e, wait,
+                )
+                await asyncio.sleep(wait)
+
+        raise RuntimeError(
+            f"[Anthropic] All 3 attempts failed. Last error: {last_error}"
+        )
+
+
+class AsyncClientPool:
+    """Creates async provider clients on demand.
+
+    Providers speaking the same SDK share one pooled HTTP client (keep-alive
+    connections are reused across calls), and each provider gets its own
+    ProviderLimiter. All clients must be used from the same event loop.
+    """
+
+    def __init__(self):
+        self.clients = {}
+        self._http_clients = {}
+
+    def _http_client(self, sdk):
+        if sdk not in self._http_clients:
+            if sdk == "anthropic":
+                import anthropic
+                self._http_clients[sdk] = anthropic.DefaultAsyncHttpxClient()
+            else:
+                import openai
+                self._http_clients[sdk] = openai.DefaultAsyncHttpxClient()
+        return self._http_clients[sdk]
+
+    def get(self, provider, api_keys):
+        """Return the async client for provider, creating it on first use.
+
+        Raises:
+            ValueError: If the provider is unknown or its API key is missing.
+        """
+        if provider in self.clients:
+            return self.clients[provider]
+
+        api_key = _api_key(provider, api_keys)
+        limiter = ProviderLimiter.for_provider(provider)
+        if provider == "anthropic":
+            client = AsyncAnthropicClient(
+                api_key=api_key,
+                base_url=_base_url(provider),
+                http_client=self._http_client("anthropic"),
+                limiter=limiter,
+            )
+        else:
+            client = AsyncOpenAICompatibleClient(
+                base_url=_base_url(provider),
+                api_key=api_key,
+                provider_name=PROVIDER_NAMES[provider],
+                http_client=self._http_client("openai"),
+                limiter=limiter,
+            )
+        self.clients[provider] = client
+        return client
+
+
 def get_client(provider, api_keys):
     """Factory to get an API client for a provider.
 
@@ -144,35 +408,12 @@ def get_client(provider, api_keys):
     Raises:
         ValueError: If the required API key is missing.
     """
-    key_map = {
-        "navigator": "NAVIGATOR_TOOLKIT_API_KEY",
-        "openai": "OPENAI_API_KEY",
-        "anthropic": "ANTHROPIC_API_KEY",
-    }
-
-    env_key = key_map.get(provider)
-    if not env_key:
-        raise ValueError(f"Unknown API provider: {provider}")
-
-    api_key = api_keys.get(env_key, "")
-    if not api_key:
-        raise ValueError(
-            f"API key '{env_key}' is required for provider '{provider}' but not set."
-        )
-
-    if provider == "navigator":
-        return OpenAICompatibleClient(
-            base_url="https://api.ai.it.ufl.edu/v1",
-            api_key=api_key,
-            provider_name="Navigator",
-        )
-    elif provider == "openai":
-        return OpenAICompatibleClient(
-            base_url="https://api.openai.com/v1",
-            api_key=api_key,
-            provider_name="OpenAI",
-        )
-    elif provider == "anthropic":
-        return AnthropicClient(api_key=api_key)
-
-    raise ValueError(f"Unknown API provider: {provider}")
+    api_key = _api_key(provider, api_keys)
+
+    if provider == "anthropic":
+        return AnthropicClient(api_key=api_key, base_url=_base_url(provider))
+    return OpenAICompatibleClient(
+        base_url=_base_url(provider),
+        api_key=api_key,
+        provider_name=PROVIDER_NAMES[provider],
+    )
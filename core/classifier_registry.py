@@ -0,0 +1,102 @@
+"""Process-wide registry of the classifier artifacts used during games.
+
+The Observer pipelines (lr/sgd/svm) and the ContextPruner MLP are loaded at
+most once per process, and only when a game needs them: an Observer for the
+classifiers a composition enables, the pruner when it has a hybrid agent.
+Every GameEngine in the process (e.g. the games of multi_game.py) shares the
+loaded objects.
+
+Artifacts are loaded with joblib's mmap_mode (CLASSIFIER_MMAP_MODE, default
+"r"; empty disables it), so their large numpy arrays are memory-mapped from
+the .joblib files. Processes that load the same file share those pages.
+"""
+
+import os
+import threading
+
+from loguru import logger as log
+
+CLASSIFIER_MMAP_MODE = os.environ.get("CLASSIFIER_MMAP_MODE", "r") or None
+MODEL_DIR = "results/classifiers/models/"
+
+# Composition "enabled_classifiers" keys -> Observer model names and files
+OBSERVER_MODELS = {
+    "lr": ("LogisticRegression", "lr.joblib"),
+    "sgd": ("SGD", "sgd.joblib"),
+    "svm": ("SVM", "svm.joblib"),
+}
+
+PRUNER_MODEL_FILE = os.path.join(MODEL_DIR, "mlp_net.joblib")
+# double check this, add n = 5
+PRUNER_THRESHOLDS = {10: 0.2210, 9: 0.2516, 8: 0.2600, 7: 0.2625, 6: 0.2720, 5: 0.2828, 4: 0.2718, 'fallback': 0.2661}
+
+
+class ClassifierRegistry:
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._artifacts = {}
+        self._shared = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def load(self, path):
+        """Loaded joblib artifact at path (cached), or None if the file is missing."""
+        key = os.path.abspath(path)
+        with self._lock:
+            if key not in self._artifacts:
+                if not os.path.exists(path):
+                    self._artifacts[key] = None
+                else:
+                    import joblib
+                    self._artifacts[key] = joblib.load(path, mmap_mode=CLASSIFIER_MMAP_MODE)
+                    log.info("[ClassifierRegistry] Loaded {}", path)
+            return self._artifacts[key]
+
+    def shared(self, key, factory):
+        """Object built once by factory() and shared under key."""
+        with self._lock:
+            if key not in self._shared:
+                self._shared[key] = factory()
+            return self._shared[key]
+
+    def observer(self, enabled_classifiers=None):
+        """Observer scoring with the enabled classifiers.
+
+        enabled_classifiers: Composition flags such as {"lr": True, "sgd": False};
+            None (composition without the key) enables every classifier.
+        Returns None when nothing is enabled.
+        """
+        if enabled_classifiers is None:
+            keys = tuple(OBSERVER_MODELS)
+        else:
+            keys = tuple(k for k in OBSERVER_MODELS if enabled_classifiers.get(k))
+        if not keys:
+            return None
+
+        def build():
+            from core.game_engine import Observer
+            return Observer(model_dir=MODEL_DIR, enabled=keys, registry=self)
+        return self.shared(("observer", keys), build)
+
+    def pruner(self):
+        """ContextPruner with the live MLP loaded.
+
+        Raises:
+            FileNotFoundError: If the MLP's model file is missing; hybrid games
+                cannot run without it.
+        """
+        def build():
+            from results.context_pruner import ContextPruner
+            pruner = ContextPruner()
+            pruner.load_live_model(PRUNER_MODEL_FILE, PRUNER_THRESHOLDS, mmap_mode=CLASSIFIER_MMAP_MODE)
+            log.info("[ClassifierRegistry] Loaded {}", PRUNER_MODEL_FILE)
+            return pruner
+        return self.shared("pruner", build)
@@ -0,0 +1,288 @@
+"""Continuous batching for local models served by worker.py.
+
+Static batching (generate_batch) decodes a fixed group until its longest member
+finishes, and requests that arrive meanwhile wait for the next group. Here one
+loop per model decodes a batch whose membership changes at every token:
+waiting requests are prefilled and admitted between decode steps, and a
+sequence is retired (and its future resolved) as soon as it emits EOS, hits
+its token limit or meets its stop rule.
+
+Rows are kept left-padded: the per-layer key/value tensors share one length,
+an attention mask marks each row's padding, and position ids are counted from
+the mask. Admitting a group pads either the running batch or the new rows on
+the left to a common length; retiring rows drops them and trims padding
+columns no row needs any more.
+
+Works with models whose cache is a plain DynamicCache (full attention in every
+layer). Only imported when local models are loaded (needs torch).
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+import torch.nn.functional as F
+from loguru import logger as log
+from transformers import DynamicCache
+
+
+class _Sequence:
+    __slots__ = ("input_ids", "temperature", "future", "tokens", "submitted", "admitted", "first_token", "record",
+                 "max_new_tokens", "stop")
+
+    def __init__(self, input_ids, temperature, record=None, max_new_tokens=None, stop=None):
+        self.input_ids = input_ids
+        self.temperature = temperature
+        self.max_new_tokens = max_new_tokens
+        self.stop = stop
+        self.future = Future()
+        self.tokens = []
+        self.submitted = time.time()
+        self.admitted = None
+        self.first_token = None
+        self.record = record
+
+    def finish(self):
+        """Fills the telemetry record (queue wait, time to first token, output tokens) and resolves the future."""
+        if self.record is not None:
+            upstream_wait = self.record["queue_wait"] or 0.0
+            self.record["queue_wait"] = upstream_wait + self.admitted - self.submitted
+            self.record["ttft"] = upstream_wait + self.first_token - self.submitted
+            self.record["output_tokens"] = len(self.tokens)
+        self.future.set_result(self.tokens)
+
+
+class ContinuousBatcher:
+    """Generation loop for one model that admits and retires sequences at token boundaries.
+
+    Args:
+        model: Loaded AutoModelForCausalLM.
+        tokenizer: Its tokenizer (for EOS and padding ids).
+        max_batch: Most sequences decoded together.
+        max_new_tokens: Generated tokens per sequence at most, unless submit() sets its own.
+        lock: Held around every forward pass, so other generate() calls on the
+            same device (ModelManager's local lock) never interleave with a step.
+        seed: Seeds sampling (None = unseeded).
+    """
+
+    def __init__(self, model, tokenizer, max_batch, max_new_tokens, lock=None, seed=None):
+        self.model = model
+        self.max_batch = max(1, int(max_batch))
+        self.max_new_tokens = max_new_tokens
+        self._lock = lock or threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+        config = model.generation_config
+        eos = config.eos_token_id if config.eos_token_id is not None else tokenizer.eos_token_id
+        self.eos_token_ids = set(eos if isinstance(eos, (list, tuple)) else [eos]) - {None}
+        pad = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        self.pad_token_id = pad if pad is not None else 0
+        self.top_k = config.top_k or 0
+        self.top_p = config.top_p if config.top_p is not None else 1.0
+
+        self._generator = None
+        if seed is not None:
+            self._generator = torch.Generator(device=model.device)
+            self._generator.manual_seed(seed)
+
+        # Running batch: one _Sequence per row, per-layer [rows, heads, length, head_dim] tensors
+        self._rows = []
+        self._keys = None
+        self._values = None
+        self._mask = None
+
+        self.steps = 0
+        self.row_steps = 0
+        self.admitted = 0
+        self.retired = 0
+
+    def submit(self, input_ids, temperature, record=None, max_new_tokens=None, stop=None):
+        """Queue a tokenized prompt (1-D tensor of ids).
+
+        Returns a Future of the generated token ids (list of ints, without the prompt).
+        record: Optional telemetry record (core/telemetry.py) filled before the future resolves.
+        max_new_tokens: This sequence's budget (default: the batcher's).
+        stop: Optional function of the generated ids returning True once the sequence is done.
+        """
+        seq = _Sequence(input_ids.reshape(-1).to(self.model.device), temperature, record,
+                        max_new_tokens or self.max_new_tokens, stop)
+        self._queue.put(seq)
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+        return seq.future
+
+    @property
+    def active(self):
+        return len(self._rows)
+
+    @property
+    def busy(self):
+        return bool(self._rows) or not self._queue.empty()
+
+    def stats(self):
+        mean_rows = self.row_steps / self.steps if self.steps else 0.0
+        return (f"{self.retired} sequences in {self.steps} steps, "
+                f"{mean_rows:.1f} rows/step, {self.active} active, {self._queue.qsize()} queued")
+
+    def _loop(self):
+        while True:
+            # Block only when idle; otherwise admit whatever arrived since the last step
+            new = [] if self._rows else [self._queue.get()]
+            while len(self._rows) + len(new) < self.max_batch:
+                try:
+                    new.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                with self._lock, torch.no_grad():
+                    if new:
+                        self._admit(new)
+                    if self._rows:
+                        self._step()
+            except Exception as e:
+                log.error("[ContinuousBatcher] Generation failed: {}", e)
+                for seq in self._rows + new:
+                    if not seq.future.done():
+                        seq.future.set_exception(e)
+                self._rows, self._keys, self._values, self._mask = [], None, None, None
+
+    def _forward(self, input_ids, mask, keys=None, values=None):
+        cache = DynamicCache(list(zip(keys, values))) if keys is not None else DynamicCache()
+        position_ids = (mask.cumsum(-1) - 1).clamp(min=0)[:, -input_ids.shape[1]:]
+        outputs = self.model(
+            input_ids=input_ids,
+            attention_mask=mask,
+            position_ids=position_ids,
+            past_key_values=cache,
+            use_cache=True,
+        )
+        cache = outputs.past_key_values
+        layers = getattr(cache, "layers", None)
+        if layers is None or any(type(layer).__name__ != "DynamicLayer" for layer in layers):
+            raise NotImplementedError("continuous batching needs a model with a plain DynamicCache")
+        return outputs.logits[:, -1, :], [layer.keys for layer in layers], [layer.values for layer in layers]
+
+    def _admit(self, new):
+        """Prefill new sequences together and merge the unfinished ones into the running batch."""
+        length = max(seq.input_ids.shape[0] for seq in new)
+        device = self.model.device
+        input_ids = torch.full((len(new), length), self.pad_token_id, dtype=torch.long, device=device)
+        mask = torch.zeros((len(new), length), dtype=torch.long, device=device)
+        for row, seq in enumerate(new):
+            n = seq.input_ids.shape[0]
+            input_ids[row, length - n:] = seq.input_ids
+            mask[row, length - n:] = 1
+            seq.admitted = time.time()
+        self.admitted += len(new)
+
+        logits, keys, values = self._forward(input_ids, mask)
+        keep = self._sample_and_retire(new, logits)
+        if not keep:
+            return
+        new = [new[i] for i in keep]
+        index = torch.tensor(keep, device=device)
+        keys = [k.index_select(0, index) for k in keys]
+        values = [v.index_select(0, index) for v in values]
+        mask = mask.index_select(0, index)
+
+        if not self._rows:
+            self._rows, self._keys, self._values, self._mask = new, keys, values, mask
+            return
+
+        # Left-pad whichever side is shorter so both share one cache length
+        old_len, new_len = self._mask.shape[1], mask.shape[1]
+        if old_len < new_len:
+            pad = new_len - old_len
+            self._keys = [F.pad(k, (0, 0, pad, 0)) for k in self._keys]
+            self._values = [F.pad(v, (0, 0, pad, 0)) for v in self._values]
+            self._mask = F.pad(self._mask, (pad, 0))
+        elif new_len < old_len:
+            pad = old_len - new_len
+            keys = [F.pad(k, (0, 0, pad, 0)) for k in keys]
+            values = [F.pad(v, (0, 0, pad, 0)) for v in values]
+            mask = F.pad(mask, (pad, 0))
+
+        self._rows = self._rows + new
+        self._keys = [torch.cat(pair) for pair in zip(self._keys, keys)]
+        self._values = [torch.cat(pair) for pair in zip(self._values, values)]
+        self._mask = torch.cat([self._mask, mask])
+
+    def _step(self):
+        """Decode one token for every running sequence and retire the finished ones."""
+        device = self.model.device
+        input_ids = torch.tensor([[seq.tokens[-1]] for seq in self._rows], dtype=torch.long, device=device)
+        mask = F.pad(self._mask, (0, 1), value=1)
+        logits, self._keys, self._values = self._forward(input_ids, mask, self._keys, self._values)
+        self._mask = mask
+        self.steps += 1
+        self.row_steps += len(self._rows)
+
+        keep = self._sample_and_retire(self._rows, logits)
+        if len(keep) == len(self._rows):
+            return
+        if not keep:
+            self._rows, self._keys, self._values, self._mask = [], None, None, None
+            return
+
+        index = torch.tensor(keep, device=device)
+        self._rows = [self._rows[i] for i in keep]
+        self._keys = [k.index_select(0, index) for k in self._keys]
+        self._values = [v.index_select(0, index) for v in self._values]
+        self._mask = self._mask.index_select(0, index)
+
+        # Drop leading columns that are padding for every remaining row
+        first = int(self._mask.any(0).nonzero()[0])
+        if first:
+            self._keys = [k[:, :, first:] for k in self._keys]
+            self._values = [v[:, :, first:] for v in self._values]
+            self._mask = self._mask[:, first:]
+
+    def _sample_and_retire(self, rows, logits):
+        """Append one sampled token per row; resolve finished rows. Returns indices still running."""
+        tokens = self._sample(logits, [seq.temperature for seq in rows]).tolist()
+        keep = []
+        now = time.time()
+        for i, (seq, token) in enumerate(zip(rows, tokens)):
+            if seq.first_token is None:
+                seq.first_token = now
+            if token in self.eos_token_ids:
+                finished = True
+            else:
+                seq.tokens.append(token)
+                finished = len(seq.tokens) >= seq.max_new_tokens or (seq.stop is not None and seq.stop(seq.tokens))
+            if finished:
+                self.retired += 1
+                seq.finish()
+            else:
+                keep.append(i)
+        return keep
+
+    def _sample(self, logits, temperatures):
+        logits = logits.float()
+        greedy = logits.argmax(-1)
+        temps = torch.tensor([t if t and t > 0 else 1.0 for t in temperatures], device=logits.device)
+        sample_rows = [i for i, t in enumerate(temperatures) if t and t > 0]
+        if not sample_rows:
+            return greedy
+
+        scores = logits / temps.unsqueeze(-1)
+        if self.top_k and self.top_k < scores.shape[-1]:
+            kth = torch.topk(scores, self.top_k, dim=-1).values[:, -1:]
+            scores = scores.masked_fill(scores < kth, float("-inf"))
+        if self.top_p < 1.0:
+            sorted_scores, order = scores.sort(dim=-1, descending=True)
+            cumulative = sorted_scores.softmax(-1).cumsum(-1)
+            remove = cumulative - sorted_scores.softmax(-1) > self.top_p
+            scores = scores.masked_fill(remove.scatter(-1, order, remove), float("-inf"))
+
+        sampled = torch.multinomial(scores.softmax(-1), 1, generator=self._generator).squeeze(-1)
+        choose = torch.zeros_like(greedy, dtype=torch.bool)
+        choose[sample_rows] = True
+        return torch.where(choose, sampled, greedy)
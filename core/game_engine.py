@@ -1,30 +1,38 @@
 import random
 import re
 import time
-from config.settings import MAX_MOVEMENT_PHASES, ROOMS, NUM_BYZ, NUM_HONEST, NUM_ROUNDS as DEFAULT_NUM_ROUNDS
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import MAX_MOVEMENT_PHASES, ROOMS, NUM_BYZ, NUM_HONEST, NUM_ROUNDS as DEFAULT_NUM_ROUNDS, DECISION_WORKERS, ACTION_DELAY, BATCH_DECISIONS
 from agents.honest_agent import HonestAgent
 from agents.byzantine_agent import ByzantineAgent
 from core.state import GameState
 from core.logger import LogManager
 import os 
-import joblib
-import pandas as pd
 
 from core.stopwords import ENGLISH_STOP_WORDS
-from results.context_pruner import ContextPruner
+from core.classifier_registry import ClassifierRegistry, OBSERVER_MODELS
+
+# numpy/scipy/pandas/joblib are imported inside the Observer methods that use them, so
+# controllers whose compositions enable no classifier never pay for importing them.
+
+# Characters _preprocess strips after lowercasing
+NON_TOKEN_PATTERN = re.compile(r'[^a-z0-9\s_]')
 
 class Observer:
-    def __init__(self, model_dir="results/classifiers/models/"):
+    def __init__(self, model_dir="results/classifiers/models/", enabled=None, registry=None):
+        """
+        enabled: Composition classifier keys to load ("lr", "sgd", "svm"); None loads all.
+        registry: ClassifierRegistry to share loaded pipelines through (default: the process-wide one).
+        """
+        registry = registry or ClassifierRegistry.get_instance()
         self.models = {}
-        paths = {
-            "LogisticRegression": os.path.join(model_dir, "lr.joblib"),
-            "SGD": os.path.join(model_dir, "sgd.joblib"),
-            "SVM": os.path.join(model_dir, "svm.joblib")
-        }
-        
-        for name, path in paths.items():
-            if os.path.exists(path):
-                self.models[name] = joblib.load(path)
+        for key, (name, file_name) in OBSERVER_MODELS.items():
+            if enabled is not None and key not in enabled:
+                continue
+            path = os.path.join(model_dir, file_name)
+            model = registry.load(path)
+            if model is not None:
+                self.models[name] = model
                 print(f"[Observer] Loaded {name} model from {path}")
         
         self.locations = [
@@ -38,15 +46,64 @@ class Observer:
         self.loc_pattern = re.compile(r'\b(?:' + '|'.join(self.locations) + r')\b', flags=re.IGNORECASE)
         self.agent_pattern = re.compile(r'\bagent_\d+\b', flags=re.IGNORECASE)
         self.stop_words = ENGLISH_STOP_WORDS
+        self._fast_groups, self._slow_models = self._split_pipelines(self.models)
+
+    @staticmethod
+    def _split_pipelines(models):
+        """
+        Splits models into those whose pipeline is the standard
+        ColumnTransformer(text: TfidfVectorizer, num: MinMaxScaler) -> classifier
+        shape, which analyze_round evaluates without pandas, and the rest.
+        Fast models are grouped by a hash of their fitted preprocessor so
+        identical preprocessors compute the features only once.
+        Returns ({hash: (preprocessor, [(name, classifier)])}, [names]).
+        """
+        groups, slow = {}, []
+        for name, pipeline in models.items():
+            try:
+                preprocessor = pipeline.named_steps["preprocessor"]
+                blocks = [(n, col) for n, _, col in preprocessor.transformers_ if n != "remainder"]
+                standard = (
+                    len(pipeline.steps) == 2
+                    and blocks == [("text", "Text"), ("num", ["Reported", "Statement_Num"])]
+                    and type(preprocessor.named_transformers_["num"]).__name__ == "MinMaxScaler"
+                )
+            except (AttributeError, KeyError, TypeError, ValueError):
+                standard = False
+            if not standard:
+                slow.append(name)
+                continue
+            import joblib
+            key = joblib.hash(preprocessor)
+            groups.setdefault(key, (preprocessor, []))[1].append((name, pipeline.steps[-1][1]))
+        return groups, slow
 
     def _preprocess(self, text):
         text = text.lower()
         text = self.loc_pattern.sub('place', text)
         text = self.agent_pattern.sub('agent_x', text)
-        text = re.sub(r'[^a-z0-9\s_]', '', text)
+        text = NON_TOKEN_PATTERN.sub('', text)
         tokens = [word for word in text.split() if word not in self.stop_words]
         return ' '.join(tokens)
 
+    @staticmethod
+    def _features(preprocessor, texts, numeric):
+        """Same matrix preprocessor.transform() builds from the DataFrame, without pandas."""
+        import numpy as np
+        from scipy import sparse
+        vectorizer = preprocessor.named_transformers_["text"]
+        scaler = preprocessor.named_transformers_["num"]
+
+        text_features = vectorizer.transform(texts)
+        num_features = numeric * scaler.scale_
+        num_features += scaler.min_
+        if scaler.clip:
+            np.clip(num_features, scaler.feature_range[0], scaler.feature_range[1], out=num_features)
+
+        if preprocessor.sparse_output_:
+            return sparse.hstack([text_features, num_features]).tocsr()
+        return np.hstack([text_features.toarray(), num_features])
+
     def analyze_round(self, statements):
         """
         statements: List of dicts {'Agent': str, 'Text': str, 'Reported': int, 'S_Num': int}
@@ -55,33 +112,42 @@ class Observer:
         if not statements or not self.models:
             return None
 
-        df = pd.DataFrame(statements)
-        df['Clean_Text'] = df['Text'].apply(self._preprocess)
-        
-        # Rename columns to match what the pipeline expects
-        input_df = df[['Clean_Text', 'Reported', 'S_Num']].rename(
-            columns={'Clean_Text': 'Text', 'S_Num': 'Statement_Num'}
-        )
+        import numpy as np
+
+        texts = [self._preprocess(s['Text']) for s in statements]
+        numeric = np.array([[s['Reported'], s['S_Num']] for s in statements], dtype=np.float64)
+        agent_names, agent_idx = np.unique([s['Agent'] for s in statements], return_inverse=True)
+        counts = np.bincount(agent_idx)
 
         print("\nOBSERVER: SUSPICION PROBABILITY")
 
+        # Mean probability per agent, per model
         results = {}
-        scores_by_agent = {}  
+        for preprocessor, classifiers in self._fast_groups.values():
+            features = self._features(preprocessor, texts, numeric)
+            for name, clf in classifiers:
+                probs = clf.predict_proba(features)[:, 1]
+                results[name] = np.bincount(agent_idx, weights=probs) / counts
+        if self._slow_models:
+            import pandas as pd
+            input_df = pd.DataFrame({
+                'Text': texts,
+                'Reported': [s['Reported'] for s in statements],
+                'Statement_Num': [s['S_Num'] for s in statements],
+            })
+            for name in self._slow_models:
+                probs = self.models[name].predict_proba(input_df)[:, 1]
+                results[name] = np.bincount(agent_idx, weights=probs) / counts
+
+        scores_by_agent = {}
+        agents = agent_names if results else []
         
-        for name, clf in self.models.items():
-            probs = clf.predict_proba(input_df)[:, 1]
-            df[f'{name}_Prob'] = probs
-            # Aggregate: Mean probability per agent
-            results[name] = df.groupby('Agent')[f'{name}_Prob'].mean()
-
-        agents = results["LogisticRegression"].index if "LogisticRegression" in results else []
-        
-        for agent_name in agents:
-            lr_p = results.get("LogisticRegression", {}).get(agent_name, 0)
-            sgd_p = results.get("SGD", {}).get(agent_name, 0)
-            svm_p = results.get("SVM", {}).get(agent_name, 0)
+        for i, agent_name in enumerate(agents):
+            lr_p = results["LogisticRegression"][i] if "LogisticRegression" in results else 0
+            sgd_p = results["SGD"][i] if "SGD" in results else 0
+            svm_p = results["SVM"][i] if "SVM" in results else 0
             
-            scores_by_agent[agent_name] = {
+            scores_by_agent[str(agent_name)] = {
                 "LogisticRegression": float(lr_p),
                 "SGD": float(sgd_p),
                 "SVM": float(svm_p)
@@ -93,23 +159,63 @@ class Observer:
         
         return scores_by_agent  
 
+class PhaseTimings:
+    """Wall-clock counters per engine step ("tick", "discussion_message", "voting").
+
+    Times include the LLM calls made during the step; with LLM_MODE=MOCK and no
+    injected latency they measure the engine's own overhead
+    (benchmarks/engine_throughput.py).
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.totals = {}
+        self.maxima = {}
+
+    def record(self, name, seconds):
+        self.counts[name] = self.counts.get(name, 0) + 1
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self.maxima[name] = max(self.maxima.get(name, 0.0), seconds)
+
+    def merge(self, other):
+        for name, count in other.counts.items():
+            self.counts[name] = self.counts.get(name, 0) + count
+            self.totals[name] = self.totals.get(name, 0.0) + other.totals[name]
+            self.maxima[name] = max(self.maxima.get(name, 0.0), other.maxima[name])
+
+    def summary(self):
+        """{name: (count, mean seconds, max seconds)}"""
+        return {name: (count, self.totals[name] / count, self.maxima[name]) for name, count in self.counts.items()}
+
+
 class GameEngine:
-    def __init__(self, game_id, num_agents=NUM_BYZ + NUM_HONEST, num_rounds=DEFAULT_NUM_ROUNDS, num_ticks=None, num_discussion_messages=2):
+    def __init__(self, game_id, num_agents=NUM_BYZ + NUM_HONEST, num_rounds=DEFAULT_NUM_ROUNDS, num_ticks=None, num_discussion_messages=2,
+                 decision_workers=DECISION_WORKERS, action_delay=ACTION_DELAY, batch_decisions=BATCH_DECISIONS,
+                 seed=None, live_state_file=None, observer=None, pruner=None):
+        """
+        seed: Seeds this game's own random.Random (None = unseeded).
+        live_state_file: Where the live map snapshot goes (default logs/live_state.json).
+        observer, pruner: Observer/ContextPruner to use instead of the ones setup() takes
+            from the process-wide ClassifierRegistry for the composition.
+        """
         self.game_id = game_id
         self.num_agents = num_agents
         self.num_rounds = num_rounds
         self.num_ticks = num_ticks if num_ticks is not None else MAX_MOVEMENT_PHASES
         self.num_discussion_messages = num_discussion_messages
+        self.decision_workers = max(1, int(decision_workers))
+        self.action_delay = action_delay
+        self.batch_decisions = batch_decisions
         self.agents = []
         self.state = None
         self.logger = None
-        self.observer = Observer()
-        self.pruner = ContextPruner()
-
-        # double check this, add n = 5
-        importance_thresholds = {10: 0.2210, 9: 0.2516, 8: 0.2600, 7: 0.2625, 6: 0.2720, 5: 0.2828, 4:0.2718, 'fallback': 0.2661}
-        model_file = "results/classifiers/models/mlp_net.joblib"
-        self.pruner.load_live_model(model_file, importance_thresholds)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.live_state_file = live_state_file
+        # Loaded on demand in setup(), once the composition is known
+        self.observer = observer
+        self.pruner = pruner
+        self.timings = PhaseTimings()
 
         
         # ML Classifier config (will be set during setup)
@@ -195,7 +301,13 @@ class GameEngine:
                     pass
 
         self.logger = LogManager(self.game_id, self.agents, scen_name)
-        self.state = GameState(self.agents, self.logger)
+        self.state = GameState(self.agents, self.logger, rng=self.rng, live_state_file=self.live_state_file)
+
+        # Every generate() call of this game's agents is recorded in the game's inference.jsonl
+        from core.llm import ModelManager
+        ModelManager.get_instance().register_telemetry_sink(self.game_id, self.logger)
+        for agent in self.agents:
+            agent.game_id = self.game_id
         
         # Set up ML classifiers from composition
         if "enabled_classifiers" in composition:
@@ -204,10 +316,42 @@ class GameEngine:
             classifiers_enabled = [k.upper() for k, v in self.enabled_classifiers.items() if v]
             if classifiers_enabled:
                 print(f"Observer initialized with classifiers: {', '.join(classifiers_enabled)}")
+
+        # Only load what this composition uses; compositions without the key keep every classifier
+        registry = ClassifierRegistry.get_instance()
+        if self.observer is None:
+            self.observer = registry.observer(composition.get("enabled_classifiers"))
+        if self.pruner is None and any(getattr(a, "is_hybrid", False) for a in self.agents):
+            self.pruner = registry.pruner()
         
-        self.state.save_json()
-        print(f"--- Game Setup Complete. Logs at: {self.logger.base_dir} ---")
+        self.state.save_json(force=True)
+        print(f"--- Game Setup Complete. Logs at: {self.logger.base_dir} (seed {self.seed}) ---")
         
+    def run(self):
+        """Plays rounds until a win condition or the round limit. Returns the result string."""
+        final_result = None
+
+        for round_num in range(1, self.num_rounds + 1):
+            # Run Movement (Sync)
+            meeting_called = self.run_movement_phase(round_num)
+                    
+            # Did anyone die during movement?
+            final_result = self.check_win_condition()
+            if final_result:
+                break
+                
+            if meeting_called:
+                self.run_discussion_phase(round_num)
+                
+                final_result = self.check_win_condition()
+                if final_result:
+                    break
+
+        if not final_result:
+            final_result = "Honest Agents Win, Max Rounds Reached"
+            self.finalize_stats(final_result) 
+        return final_result
+
     def run_movement_phase(self, round_num):
         self.logger.write_log("results", None, f"\n=== Round {round_num} ===")
         print(f"\n--- Round {round_num} Movement Phase ---")
@@ -215,16 +359,14 @@ class GameEngine:
         event_occurred_in_round = False
         for phase_tick in range(1, self.num_ticks + 1):
             print(f"Tick {phase_tick}...")
+            tick_start = time.perf_counter()
             active_agents = [a for a in self.agents if self.state.world_data["agents"][a.name]["status"] == "active"]
             
             # --- 1. GATHER DECISIONS ---
-            decisions = []
-            for agent in active_agents:
-                view = self.state.get_agent_view(agent.name, round_num, log_to_file=True)
-                decision = agent.think_and_act(view, round_num)
-                decisions.append((agent, decision))
-                # wait a bit between agent actions to be watchable
-                time.sleep(1)
+            # Views are built (and logged) in agent order before anyone thinks,
+            # each agent only reads its own log so the calls are independent.
+            agent_views = [(agent, self.state.get_agent_view(agent.name, round_num, log_to_file=True)) for agent in active_agents]
+            decisions = self._gather_decisions(agent_views, round_num)
             
             reports, kills, buttons, moves = [], [], [], []
             
@@ -273,6 +415,9 @@ class GameEngine:
 
             if meeting_triggered:
                 self._reset_action_counts()
+                self.state.save_json(force=True)
+                self.logger.flush()
+                self.timings.record("tick", time.perf_counter() - tick_start)
                 return True
 
             # --- 4. EXECUTE MOVES (Lowest Priority) ---
@@ -282,14 +427,112 @@ class GameEngine:
                         self.state.update_location(mover.name, room)
 
             self.state.save_json()
+            self.timings.record("tick", time.perf_counter() - tick_start)
             
         self._reset_action_counts()
         
         if not event_occurred_in_round:
             self.logger.write_log("results", None, f"No Eliminations or Discussions in Round {round_num}")
 
+        self.state.save_json(force=True)
+        self.logger.flush()
         return False
 
+    def _gather_decisions(self, agent_views, round_num):
+        """
+        Runs think_and_act for every (agent, view) pair.
+        Returns [(agent, decision)] in the same order as agent_views, regardless of
+        which call finishes first, so tick resolution stays deterministic.
+        """
+        if self.decision_workers <= 1 or len(agent_views) <= 1:
+            decisions = []
+            for agent, view in agent_views:
+                decisions.append((agent, agent.think_and_act(view, round_num)))
+                # wait a bit between agent actions to be watchable
+                if self.action_delay:
+                    time.sleep(self.action_delay)
+            return decisions
+
+        if self.batch_decisions:
+            prepared = [(agent, *agent.prepare_action(view, round_num)) for agent, view in agent_views]
+            pending = [(agent.model_name, request) for agent, request, _ in prepared if request is not None]
+            responses = iter(self._generate_many(pending))
+            decisions = []
+            for agent, request, ctx in prepared:
+                if request is None:
+                    decisions.append((agent, ctx))
+                else:
+                    decisions.append((agent, agent.resolve_action(next(responses), ctx)))
+        else:
+            workers = min(self.decision_workers, len(agent_views))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(agent.think_and_act, view, round_num) for agent, view in agent_views]
+                decisions = [(agent, future.result()) for (agent, _), future in zip(agent_views, futures)]
+
+        if self.action_delay:
+            time.sleep(self.action_delay)
+        return decisions
+
+    def _generate_many(self, pending):
+        """
+        pending: List of (model_name, request) where request holds generate() kwargs.
+        Sends one generate_batch call per model and phase (models run side by
+        side) and returns the responses in the order of pending.
+        """
+        from core.llm import ModelManager
+
+        llm = ModelManager.get_instance()
+        by_model = {}
+        for idx, (model_name, request) in enumerate(pending):
+            by_model.setdefault((model_name, request.get("phase")), []).append(idx)
+
+        def run_model(key, indices):
+            model_name, phase = key
+            prompts = [(pending[i][1]["system_prompt"], pending[i][1]["user_prompt"], pending[i][1]["temperature"]) for i in indices]
+            tags = [pending[i][1].get("tags") for i in indices]
+            answers = [pending[i][1].get("answers") for i in indices]
+            return indices, llm.generate_batch(model_name, prompts, phase=phase, tags=tags, answers=answers)
+
+        responses = [None] * len(pending)
+        workers = max(1, min(self.decision_workers, len(by_model)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for indices, batch in pool.map(lambda item: run_model(*item), by_model.items()):
+                for i, response in zip(indices, batch):
+                    responses[i] = response
+        return responses
+
+    def _gather_votes(self, active_agents, round_num):
+        """
+        Asks every active agent for its vote. Prompts are built in agent order
+        (hybrid agents prune their context here), then generated together: one
+        batch per model with batch_decisions, otherwise up to decision_workers
+        calls at once. Votes only read the logs, so none depends on another.
+        Returns {agent name: vote}.
+        """
+        prepared = []
+        for agent in active_agents:
+            view = self.state.get_agent_view(agent.name, round_num, log_to_file=False)
+            candidates = [a.name for a in active_agents if a.name != agent.name] + ["SKIP"]
+            # Hybrid agents must get the pruner (a duplicate vote() call once dropped it)
+            if getattr(agent, "is_hybrid", False):
+                request, candidates = agent.prepare_vote(view, candidates, round_num, pruner=self.pruner)
+            else:
+                request, candidates = agent.prepare_vote(view, candidates, round_num)
+            prepared.append((agent, request, candidates))
+
+        if self.decision_workers <= 1 or len(prepared) <= 1:
+            responses = [agent.llm.generate(agent.model_name, **request) for agent, request, _ in prepared]
+        elif self.batch_decisions:
+            responses = self._generate_many([(agent.model_name, request) for agent, request, _ in prepared])
+        else:
+            workers = min(self.decision_workers, len(prepared))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(agent.llm.generate, agent.model_name, **request) for agent, request, _ in prepared]
+                responses = [future.result() for future in futures]
+
+        return {agent.name: agent.resolve_vote(response, candidates)
+                for (agent, _, candidates), response in zip(prepared, responses)}
+
     def _reset_action_counts(self):
         for agent in self.agents:
             if self.state.world_data["agents"][agent.name]["status"] == "active":
@@ -319,6 +562,7 @@ class GameEngine:
         statement_counts = {a.name: 0 for a in active_agents}
         for discussion_round in range(self.num_discussion_messages):            
             for agent in discussion_order:
+                message_start = time.perf_counter()
                 view = self.state.get_agent_view(agent.name, round_num, log_to_file=False) 
                 msg = agent.participate_in_discussion("", view, round_num)
                 
@@ -351,27 +595,22 @@ class GameEngine:
                 
                 self.state.record_chat(agent.name, clean_msg)
                 self.state.save_json()
+                self.timings.record("discussion_message", time.perf_counter() - message_start)
 
         # After Discussion, Use Classifier to see probabilities and store results
-        suspicion_scores = self.observer.analyze_round(round_statements)
+        suspicion_scores = self.observer.analyze_round(round_statements) if self.observer else None
         if suspicion_scores:
             self.state.update_suspicion_scores(suspicion_scores)
 
         self.state.update_phase("VOTING") 
-        votes = {}
-        for agent in active_agents:
-            view = self.state.get_agent_view(agent.name, round_num, log_to_file=False)
-            candidates = [a.name for a in active_agents if a.name != agent.name] + ["SKIP"]
-            if getattr(agent, "is_hybrid", False):
-                vote = agent.vote(view, candidates, round_num, pruner=self.pruner)
-            else:
-                vote = agent.vote(view, candidates, round_num)
-            # Do not call vote() again here: a duplicate line (merge artifact) used to
-            # overwrite the hybrid branch and drop the pruner, breaking hybrid voting.
+        voting_start = time.perf_counter()
+        votes = self._gather_votes(active_agents, round_num)
+        self.timings.record("voting", time.perf_counter() - voting_start)
 
-            votes[agent.name] = vote
+        # Bookkeeping in agent order, once every vote is in
+        for agent in active_agents:
+            vote = votes[agent.name]
             self.state.record_vote(agent.name, vote, round_num)
-            self.state.save_json()
             voter_stats = self.state.world_data["agents"][agent.name]["stats"]
             voter_role = self.state.world_data["agents"][agent.name]["role"]
 
@@ -389,6 +628,7 @@ class GameEngine:
                     voter_stats["correct_votes"] += 1
                 else:
                     voter_stats["incorrect_votes"] += 1
+        self.state.save_json()
 
         tally = {}
         for v in votes.values(): tally[v] = tally.get(v, 0) + 1
@@ -422,10 +662,11 @@ class GameEngine:
         self.state.world_data["global"]["meeting_called"] = False
 
         self.state.update_phase("MOVEMENT")
-        self.state.save_json()
+        self.state.save_json(force=True)
         
         status_snapshot = {n: d["status"] for n, d in self.state.world_data["agents"].items()}
         self.logger.write_log("results", None, f"Player Statuses: {status_snapshot}")
+        self.logger.flush()
         
     def check_win_condition(self):
             active = [d for n, d in self.state.world_data["agents"].items() if d["status"] == "active"]
@@ -478,6 +719,8 @@ class GameEngine:
 
         self.state.update_phase("GAME OVER")
         self.state.add_ui_event(f"{result.upper()}", "info")
-        self.state.save_json()
+        self.state.save_json(force=True)
 
-        self.logger.export_stats(self.state.world_data["agents"])
\ No newline at end of file
+        self.logger.export_stats(self.state.world_data["agents"])
+        self.logger.close()
+        ModelManager.get_instance().unregister_telemetry_sink(self.game_id)
\ No newline at end of file
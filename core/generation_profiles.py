@@ -0,0 +1,164 @@
+"""Output budgets and stop rules per game phase.
+
+A movement answer is one room or action and a vote one agent name, so those
+phases get a small token budget and stop as soon as the answer is complete;
+discussion gets room for one short message. Each profile has:
+
+    max_new_tokens   output budget (MAX_NEW_TOKENS_<PHASE> overrides it)
+    stop             stop sequences; the response ends before the first one
+    stop_on_answer   end right after the first complete valid answer (a room,
+                     action or candidate name the caller passes as answers)
+    ignore_case      match answers case-insensitively (movement responses are
+                     parsed upper-cased, votes by exact name)
+    coalesce         identical calls in flight at the same time share one
+                     generation (ModelManager single-flight); off where every
+                     caller should get its own sample
+
+Stop rules apply only to the answer: text before it is ignored while a model
+is still reasoning (an open <think> block, or the analysis channel of models
+that always reason first) and leading whitespace never ends a response.
+Models that reason first keep at least DEFAULT_MAX_NEW_TOKENS, the budget of
+calls without a phase.
+
+Local generation enforces the rules with a stopping criterion, the Globus
+function with its own copy of it, and API calls with max_tokens and stop
+sequences; every backend's text is cut with truncate() afterwards.
+"""
+
+import os
+import re
+from dataclasses import asdict, dataclass
+
+# Budget of calls made without a phase, and of the phases' reasoning models at least
+DEFAULT_MAX_NEW_TOKENS = 160
+
+_THINK_OPEN = "<think>"
+_THINK_CLOSE = "</think>"
+_FINAL_CHANNEL = "assistantfinal"
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    name: str = None
+    max_new_tokens: int = DEFAULT_MAX_NEW_TOKENS
+    stop: tuple = ()
+    stop_on_answer: bool = False
+    ignore_case: bool = False
+    coalesce: bool = False
+
+    def budget(self, reasoning=False):
+        return max(self.max_new_tokens, DEFAULT_MAX_NEW_TOKENS) if reasoning else self.max_new_tokens
+
+    def cache_tag(self):
+        """Part of the response cache key; calls without a phase keep their old keys."""
+        if self.name is None:
+            return self.max_new_tokens
+        return f"{self.name}:{self.max_new_tokens}:{'|'.join(self.stop)}:{int(self.stop_on_answer)}:{int(self.ignore_case)}"
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        data["stop"] = tuple(data.get("stop") or ())
+        return cls(**data)
+
+
+def _budget(phase, default):
+    return int(os.environ.get(f"MAX_NEW_TOKENS_{phase.upper()}", str(default)))
+
+
+GENERATION_PROFILES = {
+    None: GenerationProfile(),
+    "movement": GenerationProfile("movement", _budget("movement", 24), ("\n",), stop_on_answer=True, ignore_case=True,
+                                  coalesce=True),
+    # No stop sequence: multi-line messages are kept whole, run_discussion_phase joins their lines
+    "discussion": GenerationProfile("discussion", _budget("discussion", 80)),
+    "voting": GenerationProfile("voting", _budget("voting", 24), ("\n",), stop_on_answer=True, coalesce=True),
+}
+
+
+def get_profile(phase):
+    return GENERATION_PROFILES.get(phase, GENERATION_PROFILES[None])
+
+
+def _answer_start(text, reasoning):
+    """Index where the answer begins, or None while the model is still reasoning."""
+    if _THINK_CLOSE in text:
+        return text.rfind(_THINK_CLOSE) + len(_THINK_CLOSE)
+    if _FINAL_CHANNEL in text:
+        return text.rfind(_FINAL_CHANNEL) + len(_FINAL_CHANNEL)
+    if reasoning or _THINK_OPEN in text:
+        return None
+    return 0
+
+
+class AnswerMatcher:
+    """Finds the first complete answer in a text.
+
+    An answer is complete when the next character cannot extend the name, or
+    when the text ends with it and no other answer starts with it
+    ("Agent_1" waits for one more character while "Agent_10" is possible).
+    """
+
+    def __init__(self, answers, ignore_case=False):
+        self.ignore_case = ignore_case
+        fold = str.lower if ignore_case else str
+        self._answers = sorted({fold(a) for a in answers if a}, key=len, reverse=True)
+        self._prefixes = {a for a in self._answers if any(b != a and b.startswith(a) for b in self._answers)}
+        pattern = "|".join(re.escape(a) for a in self._answers)
+        self._pattern = re.compile(rf"(?<!\w)({pattern})(?!\w)", re.IGNORECASE if ignore_case else 0) if pattern else None
+
+    def end(self, text):
+        """Index just past the first complete answer in text, or None."""
+        if self._pattern is None:
+            return None
+        for match in self._pattern.finditer(text):
+            answer = match.group(1).lower() if self.ignore_case else match.group(1)
+            if match.end() == len(text) and answer in self._prefixes:
+                return None
+            return match.end()
+        return None
+
+
+class StopRule:
+    """A profile's stop rules for one response.
+
+    Args:
+        profile: GenerationProfile of the call.
+        answers: Valid answers for stop_on_answer (ignored otherwise).
+        reasoning: The model reasons before answering, so nothing stops it
+            until its reasoning block has closed.
+    """
+
+    def __init__(self, profile, answers=None, reasoning=False):
+        self.stop = profile.stop
+        self.reasoning = reasoning
+        self.matcher = AnswerMatcher(answers, profile.ignore_case) if profile.stop_on_answer and answers else None
+
+    @property
+    def active(self):
+        return bool(self.stop) or self.matcher is not None
+
+    def end(self, text):
+        """Index where the response in text ends, or None if generation should go on."""
+        start = _answer_start(text, self.reasoning)
+        if start is None:
+            return None
+        while start < len(text) and text[start].isspace():
+            start += 1
+        body = text[start:]
+        ends = [i for i in (body.find(s) for s in self.stop) if i >= 0]
+        if self.matcher is not None:
+            answer_end = self.matcher.end(body)
+            if answer_end is not None:
+                ends.append(answer_end)
+        return start + min(ends) if ends else None
+
+
+def truncate(text, profile, answers=None, reasoning=False):
+    """text cut where the profile says the response ends."""
+    rule = StopRule(profile, answers, reasoning)
+    end = rule.end(text) if rule.active else None
+    return text if end is None else text[:end]
@@ -11,7 +11,8 @@ from globus_compute_sdk import Client, Executor
 from loguru import logger as log
 
 
-def remote_inference(model_name, system_prompt, user_prompt, temperature):
+def remote_inference(model_name, system_prompt, user_prompt, temperature, return_metrics=False,
+                     profile=None, answers=None):
     """Standalone function executed on the Globus Compute endpoint worker.
 
     This function runs in an isolated process on the remote compute node.
@@ -23,12 +24,19 @@ def remote_inference(model_name, system_prompt, user_prompt, temperature):
         system_prompt: System prompt for the model.
         user_prompt: User prompt for the model.
         temperature: Sampling temperature.
+        return_metrics: Return a dict with the text and the call's telemetry
+            (prompt_tokens, output_tokens, ttft) instead of the text alone.
+        profile: GenerationProfile.to_dict() of the call's phase (output budget
+            and stop rules, see core/generation_profiles.py); None keeps the
+            160-token budget without stop rules.
+        answers: Valid answers for profiles that stop on an answer.
 
     Returns:
-        The generated text response as a string.
+        The generated text response as a string, or a dict (return_metrics).
     """
     import gc
     import re
+    import time
 
     import torch
     from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
@@ -136,19 +144,71 @@ def remote_inference(model_name, system_prompt, user_prompt, temperature):
     if "token_type_ids" in inputs:
         del inputs["token_type_ids"]
 
+    # Stop rules (same as core.generation_profiles.StopRule; this function cannot import the repo)
+    profile = profile or {}
+    stops = tuple(profile.get("stop") or ())
+    flags = re.IGNORECASE if profile.get("ignore_case") else 0
+    fold = str.lower if flags else str
+    answer_set = sorted({fold(a) for a in (answers or []) if a}, key=len, reverse=True) if profile.get("stop_on_answer") else []
+    answer_prefixes = {a for a in answer_set if any(b != a and b.startswith(a) for b in answer_set)}
+    answer_pattern = re.compile(rf"(?<!\w)({'|'.join(re.escape(a) for a in answer_set)})(?!\w)", flags) if answer_set else None
+    reasoning = model_name in MXFP4_MODELS or tokenizer.decode(inputs["input_ids"][0, -8:]).rstrip().endswith("<think>")
+
+    def response_end(text):
+        if "</think>" in text:
+            start = text.rfind("</think>") + len("</think>")
+        elif "assistantfinal" in text:
+            start = text.rfind("assistantfinal") + len("assistantfinal")
+        elif reasoning or "<think>" in text:
+            return None
+        else:
+            start = 0
+        while start < len(text) and text[start].isspace():
+            start += 1
+        body = text[start:]
+        ends = [i for i in (body.find(s) for s in stops) if i >= 0]
+        if answer_pattern is not None:
+            for match in answer_pattern.finditer(body):
+                if not (match.end() == len(body) and fold(match.group(1)) in answer_prefixes):
+                    ends.append(match.end())
+                break
+        return start + min(ends) if ends else None
+
+    input_len = inputs["input_ids"].shape[1]
+
+    def stop_criteria(input_ids, scores, **kwargs):
+        text = tokenizer.decode(input_ids[0, input_len:], skip_special_tokens=True)
+        return torch.tensor([response_end(text) is not None], dtype=torch.bool, device=input_ids.device)
+
+    max_new_tokens = profile.get("max_new_tokens", 160)
+    if reasoning:
+        max_new_tokens = max(max_new_tokens, 160)
+
+    # Notes when the first token is sampled (same as core.telemetry.FirstTokenTimer)
+    first_token = []
+
+    def first_token_timer(input_ids, scores):
+        if not first_token:
+            first_token.append(time.perf_counter())
+        return scores
+
+    started = time.perf_counter()
     with torch.no_grad():
         outputs = model.generate(
             **inputs,
-            max_new_tokens=160,
+            max_new_tokens=max_new_tokens,
             do_sample=True,
             temperature=temperature,
             eos_token_id=tokenizer.eos_token_id,
             pad_token_id=tokenizer.pad_token_id,
+            logits_processor=[first_token_timer],
+            stopping_criteria=[stop_criteria] if stops or answer_pattern is not None else None,
         )
 
-    input_len = inputs["input_ids"].shape[1]
     response = outputs[0][input_len:]
-    decoded = tokenizer.decode(response, skip_special_tokens=True).strip()
+    decoded = tokenizer.decode(response, skip_special_tokens=True)
+    end = response_end(decoded) if stops or answer_pattern is not None else None
+    decoded = (decoded if end is None else decoded[:end]).strip()
 
     # Post-processing (same as ModelManager._postprocess_response)
     if "<think>" in decoded:
@@ -161,6 +221,14 @@ def remote_inference(model_name, system_prompt, user_prompt, temperature):
     if quotes:
         decoded = quotes[-1]
 
+    if return_metrics:
+        stop_ids = {tokenizer.eos_token_id, tokenizer.pad_token_id} - {None}
+        return {
+            "text": decoded.strip(),
+            "prompt_tokens": input_len,
+            "output_tokens": sum(1 for token in response.tolist() if token not in stop_ids),
+            "ttft": first_token[0] - started if first_token else None,
+        }
     return decoded.strip()
 
 
@@ -179,7 +247,7 @@ class GlobusInferenceExecutor:
         self.gce = Executor(endpoint_id=endpoint_id, client=self.gcc)
         log.info("Globus Compute executor connected to endpoint: {}", endpoint_id)
 
-    def submit(self, model_name, system_prompt, user_prompt, temperature):
+    def submit(self, model_name, system_prompt, user_prompt, temperature, profile=None, answers=None):
         """Submit an inference task and return the future."""
         future = self.gce.submit(
             remote_inference,
@@ -187,6 +255,9 @@ class GlobusInferenceExecutor:
             system_prompt,
             user_prompt,
             temperature,
+            return_metrics=True,
+            profile=profile,
+            answers=answers,
         )
         return future
 
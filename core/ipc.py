@@ -0,0 +1,212 @@
+"""Socket transport for controller <-> worker inference requests.
+
+Workers host a small TCP server and advertise its address inside the
+``ready_<model>.signal`` files that submit_games.sh already waits for.
+The controller reads the address from the signal file and keeps one
+connection per worker open. Requests and responses are newline-delimited
+JSON objects tagged with the request id, so many requests can be in flight
+on one connection and nobody polls the filesystem.
+
+An empty signal file means the worker only speaks the legacy file transport
+(``IPC_TRANSPORT=file``), and ModelManager falls back to it.
+
+The port accepts connections from anyone who can reach the node, so each
+worker also writes a random token next to its address ("host:port token").
+The signal file is readable by its owner only, and the worker drops
+connections whose requests do not carry the token.
+"""
+
+import hmac
+import json
+import os
+import queue
+import secrets
+import socket
+import threading
+from concurrent.futures import Future
+
+from loguru import logger as log
+
+# "socket" (default) or "file" for the JSON-file polling transport
+IPC_TRANSPORT = os.environ.get("IPC_TRANSPORT", "socket").lower()
+
+
+def sanitize_model_name(model_name):
+    """File-name-safe model name shared by request ids and signal files."""
+    return model_name.replace("/", "_").replace("-", "_")
+
+
+def ready_signal_path(ipc_path, model_name):
+    """Path of the ready signal a worker writes once model_name is loaded."""
+    return os.path.join(ipc_path, f"ready_{sanitize_model_name(model_name)}.signal")
+
+
+def write_ready_signal(ipc_path, model_name, contents=""):
+    """Atomically write model_name's ready signal, readable by its owner only."""
+    ready_file = ready_signal_path(ipc_path, model_name)
+    temp_file = ready_file + ".tmp"
+    fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(contents)
+    os.rename(temp_file, ready_file)
+
+
+def read_signal_address(ipc_path, model_name):
+    """Return ("host:port", token) advertised for model_name, or None for file transport."""
+    try:
+        with open(ready_signal_path(ipc_path, model_name), "r") as f:
+            contents = f.read().split()
+    except OSError:
+        return None
+    if not contents:
+        return None
+    return contents[0], contents[1] if len(contents) > 1 else None
+
+
+def _send_json(sock, lock, obj):
+    data = (json.dumps(obj) + "\n").encode("utf-8")
+    with lock:
+        sock.sendall(data)
+
+
+class WorkerServer:
+    """TCP server run by worker.py.
+
+    Every request received on any connection is placed on ``self.requests``
+    as ``(payload, reply)``; calling ``reply(dict)`` sends the response back on
+    the connection the request arrived on. A request without the server's
+    token closes its connection.
+
+    Args:
+        host: Interface to bind (IPC_BIND_HOST, default all interfaces).
+        port: Port to bind (IPC_PORT, default any free port).
+        token: Shared secret requests must carry (IPC_TOKEN, default random).
+    """
+
+    def __init__(self, host=None, port=None, token=None):
+        self.host = host if host is not None else os.environ.get("IPC_BIND_HOST", "")
+        self.port = int(port if port is not None else os.environ.get("IPC_PORT", "0"))
+        self.token = token or os.environ.get("IPC_TOKEN") or secrets.token_hex(16)
+        self.requests = queue.Queue()
+        self._sock = None
+
+    @property
+    def address(self):
+        """Address controllers should connect to, as "host:port"."""
+        advertise = os.environ.get("IPC_ADVERTISE_HOST") or socket.gethostname()
+        return f"{advertise}:{self._sock.getsockname()[1]}"
+
+    @property
+    def signal(self):
+        """Ready signal contents: the address and the token controllers must send."""
+        return f"{self.address} {self.token}"
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self.host, self.port))
+        self._sock.listen()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        log.info("[IPC] Worker listening on {}", self.address)
+        return self
+
+    def _accept_loop(self):
+        while True:
+            conn, peer = self._sock.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            log.info("[IPC] Controller connected from {}", peer)
+            threading.Thread(target=self._read_loop, args=(conn, peer), daemon=True).start()
+
+    def _read_loop(self, conn, peer=None):
+        send_lock = threading.Lock()
+
+        def reply(obj):
+            try:
+                _send_json(conn, send_lock, obj)
+            except OSError as e:
+                log.warning("[IPC] Could not send response {}: {}", obj.get("id"), e)
+
+        with conn, conn.makefile("rb") as reader:
+            for line in reader:
+                if not line.strip():
+                    continue
+                try:
+                    payload = json.loads(line)
+                except json.JSONDecodeError as e:
+                    log.warning("[IPC] Dropping malformed request: {}", e)
+                    continue
+                token = payload.pop("token", None)
+                if not isinstance(token, str) or not hmac.compare_digest(token, self.token):
+                    log.warning("[IPC] Closing connection from {}: request without a valid token", peer)
+                    return
+                self.requests.put((payload, reply))
+
+
+class WorkerConnection:
+    """Controller-side connection to one worker.
+
+    ``request()`` may be called from many threads at once; responses are
+    matched back to callers by request id. Every request carries token, the
+    worker's shared secret from its ready signal.
+    """
+
+    def __init__(self, address, token=None):
+        self.address = address
+        self.token = token
+        host, _, port = address.rpartition(":")
+        self._sock = socket.create_connection((host, int(port)))
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self.closed = False
+        threading.Thread(target=self._read_loop, daemon=True).start()
+
+    def _read_loop(self):
+        try:
+            with self._sock.makefile("rb") as reader:
+                for line in reader:
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    with self._pending_lock:
+                        future = self._pending.pop(data.get("id"), None)
+                    if future is not None:
+                        future.set_result(data)
+        except (OSError, ValueError) as e:
+            log.warning("[IPC] Connection to {} lost: {}", self.address, e)
+        finally:
+            with self._pending_lock:
+                self.closed = True
+                pending, self._pending = self._pending, {}
+            for future in pending.values():
+                future.set_exception(ConnectionError(f"Worker connection {self.address} closed"))
+
+    def request(self, payload, timeout=None):
+        """Send payload (which must carry an "id") and block for the worker's reply.
+
+        Raises:
+            concurrent.futures.TimeoutError: If no reply arrives within timeout seconds.
+            ConnectionError: If the connection is closed.
+        """
+        future = Future()
+        # Checked under the lock _read_loop empties _pending with, so a future
+        # registered after the connection dropped is never left waiting
+        with self._pending_lock:
+            if self.closed:
+                raise ConnectionError(f"Worker connection {self.address} closed")
+            self._pending[payload["id"]] = future
+        try:
+            _send_json(self._sock, self._send_lock, dict(payload, token=self.token) if self.token else payload)
+            return future.result(timeout=timeout)
+        finally:
+            with self._pending_lock:
+                self._pending.pop(payload["id"], None)
+
+    def close(self):
+        with self._pending_lock:
+            self.closed = True
+        try:
+            self._sock.close()
+        except OSError:
+            pass
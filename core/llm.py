@@ -1,10 +1,20 @@
+import asyncio
 import json
+import math
 import os
 import platform
+import random
 import re
+import threading
 import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 from config.app_mode import get_allowed_providers, should_load_gpu
+from core.generation_profiles import StopRule, get_profile, truncate
+from core.response_cache import REPLAY_MISS, ResponseCache
+from core.telemetry import REMOTE_FIELDS, FirstTokenTimer, add_queue_wait, new_record
 from loguru import logger as log
 
 IS_MAC = platform.system() == "Darwin"
@@ -12,7 +22,7 @@ IS_MAC = platform.system() == "Darwin"
 # Only import torch/transformers when GPU mode is enabled and not in controller/globus mode
 _LOAD_LOCAL_MODELS = (
     should_load_gpu()
-    and os.environ.get("LLM_MODE", "LOCAL") not in ("CONTROLLER", "GLOBUS")
+    and os.environ.get("LLM_MODE", "LOCAL") not in ("CONTROLLER", "GLOBUS", "MOCK")
 )
 
 if _LOAD_LOCAL_MODELS:
@@ -25,7 +35,9 @@ if _LOAD_LOCAL_MODELS:
             from unsloth import FastLanguageModel
         except ImportError:
             FastLanguageModel = None
-    from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig, Mxfp4Config
+    from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig, LogitsProcessorList, Mxfp4Config, StoppingCriteriaList
+
+    from core.prefix_cache import PrefixCache
 
 # See Model Specific Documentation   
 CONCATENATE = {
@@ -50,6 +62,36 @@ MXFP4_MODELS = {
     "openai/gpt-oss-120b",
 }
 
+# Largest number of prompts sent through one local model.generate() call
+MAX_LOCAL_BATCH = int(os.environ.get("MAX_LOCAL_BATCH", "16"))
+# Memory budget for reusable system-prompt KV caches of local models (0 disables)
+PREFIX_CACHE_MB = float(os.environ.get("PREFIX_CACHE_MB", "1024"))
+# GPU memory (GiB) local models may occupy together; beyond it the least recently used are evicted (0 = no limit)
+MODEL_MEMORY_BUDGET_GB = float(os.environ.get("MODEL_MEMORY_BUDGET_GB", "0"))
+# Answer movement and votes by scoring each valid option's log-likelihood instead of decoding
+# text (local models and workers; API and Globus models keep generating)
+OPTION_SCORING = os.environ.get("OPTION_SCORING", "off").lower() in ("on", "1", "true")
+# Identical calls in flight at once share one generation when their phase's profile allows it
+# (single-flight) and they sample at most this hot; LLM_COALESCE=off disables it
+COALESCE_REQUESTS = os.environ.get("LLM_COALESCE", "on").lower() in ("on", "1", "true")
+COALESCE_MAX_TEMPERATURE = float(os.environ.get("COALESCE_MAX_TEMPERATURE", "0.3"))
+
+class _StopCriteria:
+    """Stopping criterion for model.generate(): ends each row once its StopRule is met."""
+
+    def __init__(self, tokenizer, rules, prompt_len):
+        self.tokenizer = tokenizer
+        self.rules = rules
+        self.prompt_len = prompt_len
+
+    def __call__(self, input_ids, scores, **kwargs):
+        done = [
+            rule.active and rule.end(self.tokenizer.decode(row[self.prompt_len:], skip_special_tokens=True)) is not None
+            for row, rule in zip(input_ids, self.rules)
+        ]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+
 class ModelManager:
     _instance = None
 
@@ -70,18 +112,43 @@ class ModelManager:
                     self._device = "cuda"
                     log.info("Using NVIDIA (CUDA) GPU.")
 
-        self.mode = os.environ.get("LLM_MODE", "LOCAL")  # LOCAL, CONTROLLER, GLOBUS
+        self.mode = os.environ.get("LLM_MODE", "LOCAL")  # LOCAL, CONTROLLER, GLOBUS, MOCK
         self.game_id = None
         self.base_ipc_path = None
+        self._ipc_connections = {}  # model name -> core.ipc.WorkerConnection
 
         # Globus Compute executor (initialized lazily when mode is GLOBUS)
         self._globus_executor = None
 
-        # API provider support
-        self.api_clients = {}
+        # API provider support: async clients run on one background event loop
+        self.api_clients = None  # core.api_clients.AsyncClientPool, created on first API call
+        self._api_loop = None
         self.api_keys = {}
         self.token_usage = {}
         self._load_api_keys_from_env()
+        self._telemetry_sinks = {}  # game id -> object with log_inference(record), see core/telemetry.py
+
+        # generate() may be called from several engine threads at once
+        self._lock = threading.Lock()
+        self._local_lock = threading.Lock()
+        self.prefix_cache = PrefixCache(PREFIX_CACHE_MB) if _LOAD_LOCAL_MODELS else None
+        self._no_prefix_cache = set()  # models whose generate() rejected a reused cache
+        self._batchers = {}  # model_name -> ContinuousBatcher (worker --scheduler continuous)
+        self._resident = OrderedDict()  # loaded local model -> GiB it occupies, least recently used first
+
+        # Optional on-disk response cache (LLM_CACHE_MODE); seed is part of its key
+        self.response_cache = ResponseCache.from_env()
+        self.seed = int(os.environ["LLM_SEED"]) if os.environ.get("LLM_SEED") else None
+        self._option_rng = random.Random(self.seed)  # samples scored options (score_options)
+        self._end_of_turn = {}  # model name -> token id closing an assistant turn in its chat template
+        self._in_flight = {}  # single-flight key -> (Future of the response, leading call's telemetry record)
+        self.coalescing = {"leaders": 0, "coalesced": 0}
+
+        # LLM_MODE=MOCK answers every model (API ones included) with core.mock_llm
+        self.mock = None
+        if self.mode == "MOCK":
+            from core.mock_llm import MockLLM
+            self.mock = MockLLM.from_env(self.seed)
 
     @classmethod
     def get_instance(cls):
@@ -147,33 +214,74 @@ class ModelManager:
 
         return text.strip()
 
-    def _generate_api(self, model_name, system_prompt, user_prompt, temperature):
+    def _run_api(self, coro):
+        """Runs coro on the shared API event loop and blocks the calling thread for its result."""
+        from core.api_clients import AsyncClientPool
+
+        with self._lock:
+            if self._api_loop is None:
+                self.api_clients = AsyncClientPool()
+                self._api_loop = asyncio.new_event_loop()
+                threading.Thread(target=self._api_loop.run_forever, name="api-loop", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._api_loop).result()
+
+    def _generate_api(self, model_name, system_prompt, user_prompt, temperature, record=None, profile=None, answers=None):
         """Generate a response using an external API provider."""
-        from core.api_clients import get_client
+        return self._run_api(self._generate_api_async(model_name, system_prompt, user_prompt, temperature,
+                                                      record, profile, answers))
 
+    def _generate_api_batch(self, model_name, prompts, records, profile=None, answers=None):
+        """Keeps every prompt in flight at once; the provider's limiter decides how many actually run."""
+        answers = answers or [None] * len(prompts)
+
+        async def gather():
+            return await asyncio.gather(
+                *(self._generate_api_async(model_name, *prompt, record, profile, allowed)
+                  for prompt, record, allowed in zip(prompts, records, answers))
+            )
+        return self._run_api(gather())
+
+    async def _generate_api_async(self, model_name, system_prompt, user_prompt, temperature, record=None,
+                                  profile=None, answers=None):
+        """Providers get the profile's budget and stop sequences; answers are cut off client-side."""
         provider, model_id = self._parse_api_model(model_name)
+        profile = profile or get_profile(None)
+        started = time.perf_counter()
 
         try:
-            if provider not in self.api_clients:
-                self.api_clients[provider] = get_client(provider, self.api_keys)
+            with self._lock:
+                client = self.api_clients.get(provider, self.api_keys)
 
-            client = self.api_clients[provider]
-            response = client.generate(model_id, system_prompt, user_prompt, temperature)
+            response = await client.generate(model_id, system_prompt, user_prompt, temperature,
+                                             max_tokens=profile.max_new_tokens, stop=profile.stop)
 
-            if model_name not in self.token_usage:
-                self.token_usage[model_name] = {"input_tokens": 0, "output_tokens": 0}
-            self.token_usage[model_name]["input_tokens"] += response.input_tokens
-            self.token_usage[model_name]["output_tokens"] += response.output_tokens
+            with self._lock:
+                if model_name not in self.token_usage:
+                    self.token_usage[model_name] = {"input_tokens": 0, "output_tokens": 0}
+                self.token_usage[model_name]["input_tokens"] += response.input_tokens
+                self.token_usage[model_name]["output_tokens"] += response.output_tokens
 
-            return self._postprocess_response(response.text)
+            if record is not None:
+                record.update(prompt_tokens=response.input_tokens, output_tokens=response.output_tokens,
+                              queue_wait=response.queue_wait, latency=time.perf_counter() - started)
+            return self._postprocess_response(truncate(response.text, profile, answers))
 
         except Exception as e:
             log.error("[API ERROR on {}]: {}", model_name, e)
+            if record is not None:
+                record.update(status="error", latency=time.perf_counter() - started)
             return "move"
 
     def get_token_usage(self):
         """Return accumulated token usage per API model."""
-        return self.token_usage.copy()
+        with self._lock:
+            return {model: usage.copy() for model, usage in self.token_usage.items()}
+
+    def batcher_stats(self):
+        """Return a summary line per model with a continuous batcher (worker --scheduler continuous)."""
+        with self._lock:
+            batchers = dict(self._batchers)
+        return {model: batcher.stats() for model, batcher in batchers.items()}
 
     def load_model(self, model_name):
         """Loads a model if it's not already in memory.
@@ -182,6 +290,10 @@ class ModelManager:
             RuntimeError: If a local model is requested but APP_MODE
                 does not support GPU inference.
         """
+        if self.mock is not None:
+            log.info("[Mock] Model '{}' answered by the mock backend.", model_name)
+            return
+
         if self._is_api_model(model_name):
             provider, model_id = self._parse_api_model(model_name)
             log.info("[API] Model '{}:{}' registered for API execution.", provider, model_id)
@@ -203,7 +315,11 @@ class ModelManager:
             )
 
         if model_name in self.models:
+            self._touch(model_name)
             return
+
+        if MODEL_MEMORY_BUDGET_GB > 0:
+            self._evict_for(self._estimate_gb(model_name), keep=model_name)
         
         gc.collect()
         if torch.cuda.is_available():
@@ -283,15 +399,76 @@ class ModelManager:
                 mem_taken = (initial_free - final_free) / 1024**3
                 print(f"Loaded {model_name} | VRAM Usage: {mem_taken:.2f} GiB | Memory Remaining: {final_free / 1024**3:.2f} GiB", flush=True)
             else:
+                mem_taken = self._estimate_gb(model_name) if MODEL_MEMORY_BUDGET_GB > 0 else 0.0
                 print(f"Loaded {model_name} on {self._device}", flush=True)
+            with self._lock:
+                self._resident[model_name] = mem_taken
 
         except Exception as e:
             print(f"Error loading model {model_name}: {e}")
             raise e
         
+    @staticmethod
+    def _estimate_gb(model_name):
+        from core.placement import estimate_footprint
+        try:
+            return estimate_footprint(model_name).total_gb
+        except ValueError:
+            return 0.0
+
+    def _touch(self, model_name):
+        with self._lock:
+            if model_name in self._resident:
+                self._resident.move_to_end(model_name)
+
+    def has_memory_for(self, model_name):
+        """Whether model_name fits in MODEL_MEMORY_BUDGET_GB next to the models already loaded."""
+        if MODEL_MEMORY_BUDGET_GB <= 0:
+            return True
+        with self._lock:
+            used = sum(self._resident.values())
+        return used + self._estimate_gb(model_name) <= MODEL_MEMORY_BUDGET_GB
+
+    def _evict_for(self, needed_gb, keep=None):
+        """Unload least recently used local models until needed_gb fits in the budget.
+
+        Models with a continuous batch in flight are skipped.
+        """
+        evicted = []
+        with self._lock:
+            used = sum(self._resident.values())
+            for name in list(self._resident):
+                if used + needed_gb <= MODEL_MEMORY_BUDGET_GB:
+                    break
+                batcher = self._batchers.get(name)
+                if name == keep or (batcher is not None and batcher.busy):
+                    continue
+                used -= self._resident.pop(name)
+                self._batchers.pop(name, None)
+                evicted.append(name)
+
+        if not evicted:
+            return
+        # Wait for any generate() running on the device before dropping the weights
+        with self._local_lock:
+            for name in evicted:
+                self.models.pop(name, None)
+                self.tokenizers.pop(name, None)
+                if self.prefix_cache is not None:
+                    self.prefix_cache.drop_model(name)
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        log.info("[ModelManager] Evicted {} to fit {:.1f} GiB (budget {:.0f} GiB)",
+                 ", ".join(evicted), needed_gb, MODEL_MEMORY_BUDGET_GB)
+
     def unload_all_models(self):
         self.models.clear()
         self.tokenizers.clear()
+        self._batchers.clear()
+        self._resident.clear()
+        if self.prefix_cache is not None:
+            self.prefix_cache.clear()
 
         if not _LOAD_LOCAL_MODELS:
             return
@@ -306,42 +483,378 @@ class ModelManager:
             except:
                 pass
 
-    def generate(self, model_name, system_prompt, user_prompt, temperature=0.1):
+    def generate(self, model_name, system_prompt, user_prompt, temperature=0.1, phase=None, tags=None, answers=None):
         """Polymorphic generate dispatching to the active backend.
 
         Modes:
             API (provider:model_id): Routes to external API.
             GLOBUS: Submits task to Globus Compute endpoint.
-            CONTROLLER: Writes to file, waits for response (SLURM IPC).
+            CONTROLLER: Sends to a SLURM worker over its socket (or IPC files), waits for response.
             LOCAL: Runs torch directly.
+            MOCK: Seeded phase-appropriate responses with injected latency (core/mock_llm.py).
+
+        With the response cache enabled, hits are returned without calling a backend.
+        Phases whose profile allows it share one generation between identical
+        calls in flight at the same time (see _coalesce_key).
+
+        phase, tags: Game phase and {"game", "round", "agent"} of the call, recorded
+            in its telemetry record (core/telemetry.py). The phase also selects the
+            output budget and stop rules (core/generation_profiles.py).
+        answers: Valid answers (rooms, actions, candidates); phases that stop on
+            an answer end the response after the first one.
         """
+        record = new_record(model_name, phase, tags)
+        profile = get_profile(phase)
+        started = time.perf_counter()
+        key = self._coalesce_key(model_name, system_prompt, user_prompt, temperature, profile)
+        future, leader_record = self._join_in_flight(key, record) if key else (None, None)
+        if leader_record is not None:
+            response = self._await_in_flight(future, leader_record, record)
+        else:
+            try:
+                response = self._generate_cached(model_name, system_prompt, user_prompt, temperature, record, profile, answers)
+            except BaseException as e:
+                if key:
+                    self._finish_in_flight(key, error=e)
+                raise
+            if key:
+                self._finish_in_flight(key, response)
+        if record["latency"] is None:
+            record["latency"] = time.perf_counter() - started
+        self._emit(record)
+        return response
+
+    def _generate_cached(self, model_name, system_prompt, user_prompt, temperature, record, profile, answers):
+        cache = self.response_cache
+        if cache is None:
+            return self._dispatch(model_name, system_prompt, user_prompt, temperature, record, profile, answers)
+
+        key = self._cache_key(model_name, system_prompt, user_prompt, temperature, profile)
+        cached = cache.get(key)
+        if cached is not None:
+            record["backend"] = "cache"
+            return cached
+        if cache.replay:
+            log.warning("[ResponseCache] Replay miss for {}", model_name)
+            record.update(backend="cache", status="replay_miss")
+            return REPLAY_MISS
+
+        response = self._dispatch(model_name, system_prompt, user_prompt, temperature, record, profile, answers)
+        cache.put(key, model_name, response)
+        return response
+
+    def _cache_key(self, model_name, system_prompt, user_prompt, temperature, profile):
+        # Answers come from the prompt itself, so the profile's settings complete the key
+        tag = profile.cache_tag()
+        if self._option_scoring(model_name, profile):
+            tag = f"{tag}:scored"
+        return ResponseCache.key(model_name, system_prompt, user_prompt, temperature, self.seed, tag)
+
+    def _backend(self, model_name):
+        if self.mock is not None:
+            return "mock"
         if self._is_api_model(model_name):
-            return self._generate_api(model_name, system_prompt, user_prompt, temperature)
+            return "api"
+        if self.mode in ("GLOBUS", "CONTROLLER"):
+            return self.mode.lower()
+        return "local"
+
+    def _dispatch(self, model_name, system_prompt, user_prompt, temperature, record=None, profile=None, answers=None):
+        if record is not None:
+            record["backend"] = self._backend(model_name)
+        profile = profile or get_profile(None)
+        if self.mock is not None:
+            return self.mock.generate(model_name, system_prompt, user_prompt, temperature, record)
+        if self._is_api_model(model_name):
+            return self._generate_api(model_name, system_prompt, user_prompt, temperature, record, profile, answers)
         if self.mode == "GLOBUS":
-            return self._generate_globus(model_name, system_prompt, user_prompt, temperature)
+            return self._generate_globus(model_name, system_prompt, user_prompt, temperature, record, profile, answers)
+        score = bool(answers) and self._option_scoring(model_name, profile)
         if self.mode == "CONTROLLER":
-            return self._generate_remote(model_name, system_prompt, user_prompt, temperature)
-        return self._generate_local(model_name, system_prompt, user_prompt, temperature)
+            return self._generate_remote(model_name, system_prompt, user_prompt, temperature, record, profile, answers,
+                                         score=score)
+        if score:
+            return self._score_local(model_name, system_prompt, user_prompt, answers, temperature, record, profile)
+        return self._generate_local(model_name, system_prompt, user_prompt, temperature, record, profile, answers)
 
+    def _can_score(self, model_name):
+        """Whether model_name runs where option log-likelihoods can be computed (locally or on a worker)."""
+        return self.mock is None and not self._is_api_model(model_name) and self.mode != "GLOBUS"
 
-    def _generate_remote(self, model_name, system_prompt, user_prompt, temperature):
-        """Writes request to disk and polls for response."""
+    def _option_scoring(self, model_name, profile):
+        """Whether calls of profile's phase are answered by score_options() (OPTION_SCORING)."""
+        return OPTION_SCORING and profile.stop_on_answer and self._can_score(model_name)
+
+    def generate_batch(self, model_name, prompts, phase=None, tags=None, records=None, answers=None, profile=None):
+        """Generate responses for many prompts to the same model.
+
+        Args:
+            model_name: Model every prompt is sent to.
+            prompts: List of (system_prompt, user_prompt, temperature) tuples.
+            phase: Game phase of the prompts (telemetry, generation profile).
+            tags: Optional list of per-prompt telemetry tags, as for generate().
+            records: Optional list of telemetry records to fill instead of new
+                ones (workers send theirs back to the controller).
+            answers: Optional list of per-prompt valid answers, as for generate().
+            profile: GenerationProfile overriding the phase's (workers use the
+                controller's).
+
+        Returns:
+            List of response strings in the same order as prompts.
+
+        Local models run the prompts through batched model.generate() calls
+        (grouped by temperature). API prompts are all submitted to the async
+        client, whose per-provider limiter paces them. GLOBUS and CONTROLLER
+        batch on their side, so the requests are simply kept in flight together.
+        Response cache hits are filled in first and only misses are generated;
+        prompts identical to one in flight wait for its response instead.
+        """
+        if records is None:
+            tags = tags or [None] * len(prompts)
+            records = [new_record(model_name, phase, t) for t in tags]
+        profile = profile or get_profile(phase)
+        answers = answers or [None] * len(prompts)
+        started = time.perf_counter()
+
+        # Prompts identical to a call in flight (here or in another thread) wait for it
+        keys = [self._coalesce_key(model_name, *prompt, profile) for prompt in prompts]
+        claims = [self._join_in_flight(key, record) if key else (None, None) for key, record in zip(keys, records)]
+        run = [i for i, (_, leader_record) in enumerate(claims) if leader_record is None]
+        try:
+            generated = self._generate_batch_cached(model_name, [prompts[i] for i in run], [records[i] for i in run],
+                                                    profile, [answers[i] for i in run])
+        except BaseException as e:
+            for i in run:
+                if keys[i]:
+                    self._finish_in_flight(keys[i], error=e)
+            raise
+        responses = [None] * len(prompts)
+        for i, response in zip(run, generated):
+            responses[i] = response
+            if keys[i]:
+                self._finish_in_flight(keys[i], response)
+        for i, (future, leader_record) in enumerate(claims):
+            if leader_record is not None:
+                responses[i] = self._await_in_flight(future, leader_record, records[i])
+
+        elapsed = time.perf_counter() - started
+        for record in records:
+            if record["latency"] is None:
+                record["latency"] = elapsed
+            self._emit(record)
+        return responses
+
+    def _generate_batch_cached(self, model_name, prompts, records, profile, answers):
+        cache = self.response_cache
+        if cache is None:
+            return self._dispatch_batch(model_name, prompts, records, profile, answers)
+
+        keys = [self._cache_key(model_name, *prompt, profile) for prompt in prompts]
+        responses = [cache.get(key) for key in keys]
+        missing = [i for i, response in enumerate(responses) if response is None]
+        for i, response in enumerate(responses):
+            if response is not None:
+                records[i]["backend"] = "cache"
+        if missing and cache.replay:
+            log.warning("[ResponseCache] {} replay misses for {}", len(missing), model_name)
+            for i in missing:
+                responses[i] = REPLAY_MISS
+                records[i].update(backend="cache", status="replay_miss")
+        elif missing:
+            generated = self._dispatch_batch(model_name, [prompts[i] for i in missing], [records[i] for i in missing],
+                                             profile, [answers[i] for i in missing])
+            for i, response in zip(missing, generated):
+                responses[i] = response
+                cache.put(keys[i], model_name, response)
+        return responses
+
+    def _dispatch_batch(self, model_name, prompts, records, profile, answers):
+        if not prompts:
+            return []
+        if len(prompts) == 1:
+            return [self._dispatch(model_name, *prompts[0], records[0], profile, answers[0])]
+        backend = self._backend(model_name)
+        for record in records:
+            record["backend"] = backend
+        if self.mock is not None:
+            return self.mock.generate_batch(model_name, prompts, records)
+        if self._is_api_model(model_name):
+            return self._generate_api_batch(model_name, prompts, records, profile, answers)
+        if self.mode in ("GLOBUS", "CONTROLLER"):
+            with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+                return list(pool.map(lambda item: self._dispatch(model_name, *item[0], item[1], profile, item[2]),
+                                     zip(prompts, records, answers)))
+        if self._option_scoring(model_name, profile) and all(answers):
+            # Each prompt is already one batched forward pass over its options
+            return [self._score_local(model_name, system_prompt, user_prompt, options, temperature, record, profile)
+                    for (system_prompt, user_prompt, temperature), options, record in zip(prompts, answers, records)]
+        return self._generate_local_batch(model_name, prompts, records, profile, answers)
+
+    def _coalesce_key(self, model_name, system_prompt, user_prompt, temperature, profile):
+        """Single-flight key of a call, or None if it must be generated on its own.
+
+        Only phases whose profile sets coalesce (not discussion, where every
+        agent should get its own sample) and temperatures up to
+        COALESCE_MAX_TEMPERATURE are shared.
+        """
+        if not (COALESCE_REQUESTS and profile.coalesce and (temperature or 0.0) <= COALESCE_MAX_TEMPERATURE):
+            return None
+        return self._cache_key(model_name, system_prompt, user_prompt, temperature, profile)
+
+    def _join_in_flight(self, key, record):
+        """Returns (future, leader_record). leader_record is None when this call leads:
+        it generates and must then call _finish_in_flight(key). Otherwise the
+        call waits for future, the leading call's response.
+        """
+        with self._lock:
+            entry = self._in_flight.get(key)
+            if entry is None:
+                future = Future()
+                self._in_flight[key] = (future, record)
+                self.coalescing["leaders"] += 1
+                return future, None
+            self.coalescing["coalesced"] += 1
+        return entry
+
+    def _finish_in_flight(self, key, response=None, error=None):
+        with self._lock:
+            future, _ = self._in_flight.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(response)
+
+    @staticmethod
+    def _await_in_flight(future, leader_record, record):
+        response = future.result()
+        record.update(backend="coalesced", status=leader_record["status"])
+        return response
+
+    def get_coalescing_stats(self):
+        """Calls that generated ("leaders") and calls answered by an identical one in flight ("coalesced")."""
+        with self._lock:
+            return dict(self.coalescing)
+
+    def register_telemetry_sink(self, game_id, sink):
+        """Sends the telemetry records tagged with game_id to sink.log_inference(record)."""
+        with self._lock:
+            self._telemetry_sinks[game_id] = sink
+
+    def unregister_telemetry_sink(self, game_id):
+        with self._lock:
+            self._telemetry_sinks.pop(game_id, None)
+
+    def _emit(self, record):
+        sink = self._telemetry_sinks.get(record["game"])
+        if sink is None:
+            return
+        try:
+            sink.log_inference(record)
+        except Exception as e:
+            log.warning("[Telemetry] Could not log inference record: {}", e)
+
+    def _generate_remote(self, model_name, system_prompt, user_prompt, temperature, record=None, profile=None, answers=None,
+                         score=False):
+        """Sends the request to the worker hosting model_name and waits for its reply.
+
+        Uses the worker's socket when its ready signal advertises an address,
+        otherwise writes the request to disk and polls for the response file.
+        The worker generates with the controller's profile and answers, or
+        with score=True picks one of the answers by score_options().
+        """
+        profile = profile or get_profile(None)
         if not self.game_id:
             raise ValueError("Game ID not set in ModelManager. Call set_game_context first.")
 
-        safe_model_name = model_name.replace("/", "_").replace("-", "_")
-        request_id = f"req_{safe_model_name}_{time.time()}_{os.getpid()}"
-        request_file = os.path.join(self.base_ipc_path, f"{request_id}.json")
-        response_file = os.path.join(self.base_ipc_path, f"{request_id}_response.json")
+        from core.ipc import sanitize_model_name
+
+        safe_model_name = sanitize_model_name(model_name)
+        # uuid keeps ids unique when several engine threads submit in the same instant
+        request_id = f"req_{safe_model_name}_{time.time()}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
 
         payload = {
             "model_name": model_name,
             "system_prompt": system_prompt,
             "user_prompt": user_prompt,
             "temperature": temperature,
-            "id": request_id
+            "id": request_id,
+            "created_at": time.time(),  # lets the worker report queue wait
+            "phase": profile.name,
+            "profile": profile.to_dict(),
+            "answers": answers,
+            "score": score,
         }
 
+        connection = self._get_ipc_connection(model_name)
+        if connection is not None:
+            return self._request_socket(connection, payload, record)
+        return self._request_file(payload, record)
+
+    def _get_ipc_connection(self, model_name):
+        """Return an open connection to model_name's worker, or None for file IPC.
+
+        The worker address is read from its ready signal once per model and
+        re-read only after the connection drops.
+        """
+        from core.ipc import WorkerConnection, read_signal_address
+
+        with self._lock:
+            connection = self._ipc_connections.get(model_name)
+            if connection is not None and not connection.closed:
+                return connection
+
+            signal = read_signal_address(self.base_ipc_path, model_name)
+            if signal is None:
+                return None
+            address, token = signal
+
+            # Models served by the same worker share its connection
+            connection = next(
+                (c for c in self._ipc_connections.values() if c.address == address and not c.closed),
+                None,
+            )
+            if connection is None:
+                try:
+                    connection = WorkerConnection(address, token)
+                except OSError as e:
+                    log.warning("[IPC] Could not connect to worker at {}: {}. Using file IPC.", address, e)
+                    return None
+            self._ipc_connections[model_name] = connection
+        return connection
+
+    @staticmethod
+    def _merge_worker_metrics(record, data):
+        """Copies the worker's measurements from its reply into the controller's record."""
+        if record is None:
+            return
+        metrics = data.get("metrics") or {}
+        record.update({field: metrics[field] for field in REMOTE_FIELDS if metrics.get(field) is not None})
+        if data.get("response") == "ERROR":
+            record["status"] = "error"
+
+    def _request_socket(self, connection, payload, record=None):
+        try:
+            data = connection.request(payload, timeout=180)
+        except FutureTimeoutError:
+            print(f"[Timeout] Waiting for {payload['model_name']}...")
+            if record is not None:
+                record["status"] = "timeout"
+            return "SKIP (Timeout)"
+        except Exception as e:
+            print(f"Error reading response: {e}")
+            if record is not None:
+                record["status"] = "error"
+            return "ERROR"
+        self._merge_worker_metrics(record, data)
+        return data.get("response", "")
+
+    def _request_file(self, payload, record=None):
+        """Writes request to disk and polls for response."""
+        request_id = payload["id"]
+        model_name = payload["model_name"]
+        request_file = os.path.join(self.base_ipc_path, f"{request_id}.json")
+        response_file = os.path.join(self.base_ipc_path, f"{request_id}_response.json")
+
         # 1. Write Request
         with open(request_file, "w") as f:
             json.dump(payload, f)
@@ -352,6 +865,8 @@ class ModelManager:
         while not os.path.exists(response_file):
             if time.time() - start_time > 180:
                 print(f"[Timeout] Waiting for {model_name}...")
+                if record is not None:
+                    record["status"] = "timeout"
                 return "SKIP (Timeout)"
             time.sleep(0.05)
 
@@ -360,9 +875,12 @@ class ModelManager:
             with open(response_file, "r") as f:
                 data = json.load(f)
             response_text = data.get("response", "")
+            self._merge_worker_metrics(record, data)
         except Exception as e:
             print(f"Error reading response: {e}")
             response_text = "ERROR"
+            if record is not None:
+                record["status"] = "error"
 
         # 4. Cleanup
         try:
@@ -373,8 +891,9 @@ class ModelManager:
 
         return response_text
 
-    def _generate_globus(self, model_name, system_prompt, user_prompt, temperature):
+    def _generate_globus(self, model_name, system_prompt, user_prompt, temperature, record=None, profile=None, answers=None):
         """Submit inference to the Globus Compute endpoint and wait for result."""
+        profile = profile or get_profile(None)
         if not self._globus_executor:
             raise RuntimeError(
                 "Globus executor not initialized. Call init_globus_executor() first."
@@ -382,76 +901,447 @@ class ModelManager:
 
         try:
             future = self._globus_executor.submit(
-                model_name, system_prompt, user_prompt, temperature
+                model_name, system_prompt, user_prompt, temperature, profile.to_dict(), answers
             )
             result = future.result(timeout=300)
+            if isinstance(result, dict):
+                # remote_inference reports its token counts and time to first token
+                if record is not None:
+                    record.update({field: result.get(field) for field in REMOTE_FIELDS if result.get(field) is not None})
+                result = result["text"]
             return result
         except Exception as e:
             log.error("[Globus Compute ERROR on {}]: {}", model_name, e)
+            if record is not None:
+                record["status"] = "timeout" if isinstance(e, (TimeoutError, FutureTimeoutError)) else "error"
             return "move"
 
-    def _generate_local(self, model_name, system_prompt, user_prompt, temperature=0.1):
+    @staticmethod
+    def _build_messages(model_name, system_prompt, user_prompt):
+        """Chat messages for a local model (some templates reject a system role)."""
+        if model_name in CONCATENATE:
+            return [{"role": "user", "content": f"{system_prompt}\n\n{user_prompt}"}]
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+
+    def _tokenize_chat(self, model_name, system_prompt, user_prompt, device):
+        tokenizer = self.tokenizers[model_name]
+        messages = self._build_messages(model_name, system_prompt, user_prompt)
+        template_kwargs = {"reasoning_effort": "low"} if model_name in MXFP4_MODELS else {}
+        inputs = tokenizer.apply_chat_template(
+            messages,
+            add_generation_prompt=True,
+            tokenize=True,
+            return_tensors="pt",
+            return_dict=True,
+            **template_kwargs,
+        ).to(device)
+        if "token_type_ids" in inputs:
+            del inputs["token_type_ids"]
+        return inputs
+
+    @staticmethod
+    def _count_generated(tokens, tokenizer):
+        """Generated tokens in one output row, excluding EOS and padding."""
+        stop_ids = {tokenizer.eos_token_id, tokenizer.pad_token_id} - {None}
+        return sum(1 for token in tokens.tolist() if token not in stop_ids)
+
+    @staticmethod
+    def _reasons_first(model_name, tokenizer, prompt_ids):
+        """Whether the model reasons before answering (analysis channel, or a template that opens <think>)."""
+        if model_name in MXFP4_MODELS:
+            return True
+        return tokenizer.decode(prompt_ids[-8:]).rstrip().endswith("<think>")
+
+    def _generate_local(self, model_name, system_prompt, user_prompt, temperature=0.1, record=None,
+                        profile=None, answers=None):
         """
         Generates response using the specified model.
+        The system prompt's KV cache is reused across calls when the prefix cache is on.
+        Output length and stop rules follow profile (core/generation_profiles.py).
         """
+        profile = profile or get_profile(None)
+        started = time.perf_counter()
+        upstream_wait = (record["queue_wait"] or 0.0) if record is not None else 0.0  # e.g. a worker's queue
         if model_name not in self.models:
             self.load_model(model_name)
+        else:
+            self._touch(model_name)
 
         model = self.models[model_name]
         tokenizer = self.tokenizers[model_name]
 
         try:
-
-            if model_name in CONCATENATE:
-                messages = [
-                    {"role": "user", "content": f"{system_prompt}\n\n{user_prompt}"}
-                ]
-            else:
-                messages = [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ]
-
-           
-            if model_name in MXFP4_MODELS: 
-                inputs = tokenizer.apply_chat_template(
-                messages,
-                add_generation_prompt=True,
-                reasoning_effort="low",
-                tokenize=True,         
-                return_tensors="pt",   
-                return_dict=True       
-            ).to(model.device)
-                    
-            else: 
-                inputs = tokenizer.apply_chat_template(
-                    messages,
-                    add_generation_prompt=True,
-                    tokenize=True,         
-                    return_tensors="pt",   
-                    return_dict=True       
-                ).to(model.device)
-            
-
-            if "token_type_ids" in inputs:
-                del inputs["token_type_ids"]
-
-            with torch.no_grad():
-                outputs = model.generate(
-                    **inputs,
-                    max_new_tokens=160,
-                    do_sample=True,
-                    temperature=temperature,
-                    eos_token_id=tokenizer.eos_token_id,
-                    pad_token_id=tokenizer.pad_token_id,
-                )
-
+            inputs = self._tokenize_chat(model_name, system_prompt, user_prompt, model.device)
             input_len = inputs['input_ids'].shape[1]
+            reasoning = self._reasons_first(model_name, tokenizer, inputs["input_ids"][0])
+            rule = StopRule(profile, answers, reasoning)
+            generate_kwargs = dict(
+                max_new_tokens=profile.budget(reasoning),
+                do_sample=True,
+                temperature=temperature,
+                eos_token_id=tokenizer.eos_token_id,
+                pad_token_id=tokenizer.pad_token_id,
+            )
+            timer = FirstTokenTimer()
+            generate_kwargs["logits_processor"] = LogitsProcessorList([timer])
+            if rule.active:
+                generate_kwargs["stopping_criteria"] = StoppingCriteriaList([_StopCriteria(tokenizer, [rule], input_len)])
+
+            # One generate() per device at a time; concurrent callers queue here
+            waiting = time.perf_counter()
+            with self._local_lock, torch.no_grad():
+                add_queue_wait(record, time.perf_counter() - waiting)
+                past_key_values = None
+                if self.prefix_cache.enabled and model_name not in self._no_prefix_cache:
+                    past_key_values = self.prefix_cache.lookup(
+                        model, model_name, system_prompt, inputs["input_ids"],
+                        lambda: self._tokenize_chat(model_name, system_prompt, "", model.device)["input_ids"],
+                    )
+
+                if past_key_values is None:
+                    outputs = model.generate(**inputs, **generate_kwargs)
+                else:
+                    try:
+                        outputs = model.generate(**inputs, past_key_values=past_key_values, **generate_kwargs)
+                    except Exception as e:
+                        log.warning("[PrefixCache] Disabled for {}: {}", model_name, e)
+                        self._no_prefix_cache.add(model_name)
+                        self.prefix_cache.drop_model(model_name)
+                        outputs = model.generate(**inputs, **generate_kwargs)
+
             response = outputs[0][input_len:]
-            decoded_response = tokenizer.decode(response, skip_special_tokens=True).strip()
+            decoded_response = truncate(tokenizer.decode(response, skip_special_tokens=True), profile, answers, reasoning).strip()
 
+            if record is not None:
+                record.update(prompt_tokens=input_len, output_tokens=self._count_generated(response, tokenizer))
+                if timer.first is not None:
+                    record["ttft"] = upstream_wait + timer.first - started
             return self._postprocess_response(decoded_response)
             
         except Exception as e:
             log.error("[LLM ERROR on {}]: {}", model_name, e)
-            return "move"
\ No newline at end of file
+            if record is not None:
+                record["status"] = "error"
+            return "move"
+
+    def generate_continuous(self, model_name, system_prompt, user_prompt, temperature=0.1, record=None,
+                            profile=None, answers=None):
+        """Queue a prompt on model_name's continuous batcher (local models only).
+
+        Returns a concurrent.futures.Future resolving to the response text
+        ("move" if generation failed), so callers can keep submitting while
+        earlier prompts are still decoding. record (core/telemetry.py) is
+        filled before the future resolves; profile and answers set the
+        sequence's budget and stop rules as for generate().
+        """
+        profile = profile or get_profile(None)
+        from core.continuous_batching import ContinuousBatcher
+
+        if model_name not in self.models:
+            self.load_model(model_name)
+        else:
+            self._touch(model_name)
+        model = self.models[model_name]
+        tokenizer = self.tokenizers[model_name]
+
+        with self._lock:
+            batcher = self._batchers.get(model_name)
+            if batcher is None:
+                batcher = ContinuousBatcher(model, tokenizer, MAX_LOCAL_BATCH, profile.budget(),
+                                            lock=self._local_lock, seed=self.seed)
+                self._batchers[model_name] = batcher
+
+        result = Future()
+        try:
+            input_ids = self._tokenize_chat(model_name, system_prompt, user_prompt, model.device)["input_ids"]
+            reasoning = self._reasons_first(model_name, tokenizer, input_ids[0])
+            rule = StopRule(profile, answers, reasoning)
+        except Exception as e:
+            log.error("[LLM ERROR on {}]: {}", model_name, e)
+            if record is not None:
+                record["status"] = "error"
+            result.set_result("move")
+            return result
+
+        def finish(tokens_future):
+            try:
+                decoded = tokenizer.decode(tokens_future.result(), skip_special_tokens=True)
+                result.set_result(self._postprocess_response(truncate(decoded, profile, answers, reasoning).strip()))
+            except Exception as e:
+                log.error("[LLM ERROR on {}]: {}", model_name, e)
+                if record is not None:
+                    record["status"] = "error"
+                result.set_result("move")
+
+        if record is not None:
+            record["prompt_tokens"] = input_ids.shape[1]
+        stop = None
+        if rule.active:
+            stop = lambda tokens: rule.end(tokenizer.decode(tokens, skip_special_tokens=True)) is not None
+        batcher.submit(input_ids[0], temperature, record, max_new_tokens=profile.budget(reasoning),
+                       stop=stop).add_done_callback(finish)
+        return result
+
+    def score_options(self, model_name, system_prompt, user_prompt, options, temperature=0.1, phase=None, tags=None,
+                      record=None):
+        """Answers a multiple-choice prompt with one of options, chosen by likelihood.
+
+        The model's log-likelihood of each option (followed by the chat
+        template's end-of-turn token) as the reply is computed in one batched forward pass that shares the prompt's
+        prefill. temperature 0 takes the most likely option; otherwise one is
+        sampled from softmax(log-likelihood / temperature).
+
+        Local models are scored here and CONTROLLER models on their worker.
+        API, Globus and mock models cannot be scored; they generate a response
+        as generate() would, with options as its answers.
+
+        record: Telemetry record to fill instead of a new one (workers).
+        """
+        emit = record is None
+        if record is None:
+            record = new_record(model_name, phase, tags)
+        started = time.perf_counter()
+        profile = get_profile(phase)
+        if not self._can_score(model_name):
+            response = self._dispatch(model_name, system_prompt, user_prompt, temperature, record, profile, options)
+        elif self.mode == "CONTROLLER":
+            record["backend"] = "controller"
+            response = self._generate_remote(model_name, system_prompt, user_prompt, temperature, record, profile,
+                                             options, score=True)
+        else:
+            record["backend"] = "local"
+            response = self._score_local(model_name, system_prompt, user_prompt, options, temperature, record, profile)
+        if emit:
+            if record["latency"] is None:
+                record["latency"] = time.perf_counter() - started
+            self._emit(record)
+        return response
+
+    def _score_local(self, model_name, system_prompt, user_prompt, options, temperature, record=None, profile=None):
+        """score_options() for a local model; if scoring fails the prompt is generated instead."""
+        started = time.perf_counter()
+        upstream_wait = (record["queue_wait"] or 0.0) if record is not None else 0.0
+        if model_name not in self.models:
+            self.load_model(model_name)
+        else:
+            self._touch(model_name)
+
+        model = self.models[model_name]
+        tokenizer = self.tokenizers[model_name]
+
+        try:
+            prompt_ids, option_ids = self._option_token_ids(model_name, system_prompt, user_prompt, options)
+            prompt_ids = torch.tensor([prompt_ids], dtype=torch.long, device=model.device)
+
+            waiting = time.perf_counter()
+            with self._local_lock, torch.no_grad():
+                add_queue_wait(record, time.perf_counter() - waiting)
+                scores = self._option_logprobs(model, prompt_ids, option_ids, tokenizer.pad_token_id or 0)
+
+            if temperature and temperature > 0:
+                best = max(scores)
+                weights = [math.exp((score - best) / temperature) for score in scores]
+                with self._lock:
+                    choice = self._option_rng.choices(range(len(options)), weights=weights)[0]
+            else:
+                choice = max(range(len(options)), key=scores.__getitem__)
+
+            if record is not None:
+                record.update(prompt_tokens=prompt_ids.shape[1], output_tokens=len(option_ids[choice]),
+                              ttft=upstream_wait + time.perf_counter() - started)
+            return options[choice]
+
+        except Exception as e:
+            log.error("[LLM SCORING ERROR on {}]: {}. Generating instead.", model_name, e)
+            # Not _dispatch(): with OPTION_SCORING on it would score the prompt again
+            return self._generate_local(model_name, system_prompt, user_prompt, temperature, record, profile, options)
+
+    def _option_token_ids(self, model_name, system_prompt, user_prompt, options):
+        """(prompt ids, [ids of each option as the reply, ending the turn]).
+
+        Options are tokenized as a continuation of the templated prompt, as
+        the model would produce them after the assistant header (no leading
+        space piece). If an option merges with the prompt's last tokens, the
+        shared prefix is shortened to where every row still agrees.
+        """
+        tokenizer = self.tokenizers[model_name]
+        messages = self._build_messages(model_name, system_prompt, user_prompt)
+        template_kwargs = {"reasoning_effort": "low"} if model_name in MXFP4_MODELS else {}
+        prompt_text = tokenizer.apply_chat_template(messages, add_generation_prompt=True, tokenize=False,
+                                                    **template_kwargs)
+        prompt_ids = tokenizer(prompt_text, add_special_tokens=False)["input_ids"]
+        rows = [tokenizer(prompt_text + option, add_special_tokens=False)["input_ids"] for option in options]
+
+        shared = len(prompt_ids)
+        for row in rows:
+            common = 0
+            while common < min(shared, len(row)) and row[common] == prompt_ids[common]:
+                common += 1
+            shared = common
+        shared = max(1, shared)
+
+        end = self._end_of_turn_id(model_name, messages, template_kwargs)
+        suffix = [end] if end is not None else []
+        return prompt_ids[:shared], [row[shared:] + suffix for row in rows]
+
+    def _end_of_turn_id(self, model_name, messages, template_kwargs):
+        """Token the chat template closes an assistant reply with (eos_token_id if none is found)."""
+        if model_name in self._end_of_turn:
+            return self._end_of_turn[model_name]
+        tokenizer = self.tokenizers[model_name]
+        end = tokenizer.eos_token_id
+        marker = "ANSWER"
+        try:
+            text = tokenizer.apply_chat_template(messages + [{"role": "assistant", "content": marker}],
+                                                 tokenize=False, **template_kwargs)
+            tail = tokenizer(text[text.rindex(marker) + len(marker):], add_special_tokens=False)["input_ids"]
+            special = set(tokenizer.all_special_ids) | {
+                token for token, added in (getattr(tokenizer, "added_tokens_decoder", None) or {}).items() if added.special
+            }
+            end = next((token for token in tail if token in special), end)
+        except Exception as e:
+            log.warning("[LLM] Could not find the end-of-turn token of {}: {}. Using EOS.", model_name, e)
+        self._end_of_turn[model_name] = end
+        return end
+
+    @staticmethod
+    def _option_logprobs(model, prompt_ids, option_ids, pad_token_id):
+        """Total log-probability of each option (list of token ids) continuing prompt_ids ([1, P]).
+
+        The prompt is prefilled once and its KV cache repeated for every
+        option; models whose cache cannot be repeated run prompt + option rows
+        in one forward pass instead.
+        """
+        device = prompt_ids.device
+        prompt_len = prompt_ids.shape[1]
+        width = max(len(ids) for ids in option_ids)
+        tokens = torch.full((len(option_ids), width), pad_token_id, dtype=torch.long, device=device)
+        mask = torch.zeros((len(option_ids), width), dtype=torch.long, device=device)
+        for row, ids in enumerate(option_ids):
+            tokens[row, :len(ids)] = torch.tensor(ids, dtype=torch.long, device=device)
+            mask[row, :len(ids)] = 1
+        full_mask = torch.cat([torch.ones((len(option_ids), prompt_len), dtype=torch.long, device=device), mask], dim=1)
+
+        prefill = model(input_ids=prompt_ids, use_cache=True)
+        cache = prefill.past_key_values
+        try:
+            cache.batch_repeat_interleave(len(option_ids))
+        except Exception:
+            cache = None
+
+        if cache is not None:
+            first = prefill.logits[:, -1:, :].expand(len(option_ids), -1, -1)
+            positions = torch.arange(prompt_len, prompt_len + width, device=device).unsqueeze(0).expand(len(option_ids), -1)
+            rest = model(input_ids=tokens, attention_mask=full_mask, position_ids=positions,
+                         past_key_values=cache, use_cache=True).logits
+            logits = torch.cat([first, rest[:, :-1]], dim=1)
+        else:
+            rows = torch.cat([prompt_ids.expand(len(option_ids), -1), tokens], dim=1)
+            logits = model(input_ids=rows, attention_mask=full_mask).logits[:, prompt_len - 1:-1]
+
+        logprobs = torch.log_softmax(logits.float(), dim=-1).gather(-1, tokens.unsqueeze(-1)).squeeze(-1)
+        return (logprobs * mask).sum(dim=1).tolist()
+
+    def _generate_local_batch(self, model_name, prompts, records, profile=None, answers=None):
+        """Left-pads prompts and runs them through batched model.generate() calls.
+
+        Prompts are grouped by temperature (sampling settings are per call) and
+        split into chunks of at most MAX_LOCAL_BATCH. Every row stops on its own
+        answers; the chunk ends when all rows have.
+        """
+        profile = profile or get_profile(None)
+        answers = answers or [None] * len(prompts)
+        started = time.perf_counter()
+        if model_name not in self.models:
+            self.load_model(model_name)
+        else:
+            self._touch(model_name)
+
+        model = self.models[model_name]
+        tokenizer = self.tokenizers[model_name]
+        responses = [None] * len(prompts)
+
+        by_temperature = {}
+        for idx, (_, _, temperature) in enumerate(prompts):
+            by_temperature.setdefault(temperature, []).append(idx)
+
+        for temperature, indices in by_temperature.items():
+            for start in range(0, len(indices), MAX_LOCAL_BATCH):
+                chunk = indices[start:start + MAX_LOCAL_BATCH]
+                try:
+                    texts = []
+                    for idx in chunk:
+                        system_prompt, user_prompt, _ = prompts[idx]
+                        messages = self._build_messages(model_name, system_prompt, user_prompt)
+                        template_kwargs = {"reasoning_effort": "low"} if model_name in MXFP4_MODELS else {}
+                        texts.append(tokenizer.apply_chat_template(
+                            messages,
+                            add_generation_prompt=True,
+                            tokenize=False,
+                            **template_kwargs,
+                        ))
+
+                    timer = FirstTokenTimer()
+                    waiting = time.perf_counter()
+                    with self._local_lock, torch.no_grad():
+                        lock_wait = time.perf_counter() - waiting
+                        # Generation appends on the right, so prompts must be padded on the left
+                        padding_side = tokenizer.padding_side
+                        tokenizer.padding_side = "left"
+                        try:
+                            inputs = tokenizer(
+                                texts,
+                                return_tensors="pt",
+                                padding=True,
+                                add_special_tokens=False,
+                            ).to(model.device)
+                        finally:
+                            tokenizer.padding_side = padding_side
+
+                        if "token_type_ids" in inputs:
+                            del inputs["token_type_ids"]
+
+                        input_len = inputs["input_ids"].shape[1]
+                        reasoning = [self._reasons_first(model_name, tokenizer, row) for row in inputs["input_ids"]]
+                        rules = [StopRule(profile, answers[idx], r) for idx, r in zip(chunk, reasoning)]
+                        stopping = None
+                        if any(rule.active for rule in rules):
+                            stopping = StoppingCriteriaList([_StopCriteria(tokenizer, rules, input_len)])
+
+                        outputs = model.generate(
+                            **inputs,
+                            max_new_tokens=profile.budget(any(reasoning)),
+                            do_sample=True,
+                            temperature=temperature,
+                            eos_token_id=tokenizer.eos_token_id,
+                            pad_token_id=tokenizer.pad_token_id,
+                            logits_processor=LogitsProcessorList([timer]),
+                            stopping_criteria=stopping,
+                        )
+
+                    prompt_lens = inputs["attention_mask"].sum(dim=1).tolist()
+                    for row, idx in enumerate(chunk):
+                        generated = outputs[row][input_len:]
+                        decoded = truncate(tokenizer.decode(generated, skip_special_tokens=True),
+                                           profile, answers[idx], reasoning[row]).strip()
+                        responses[idx] = self._postprocess_response(decoded)
+
+                        # Earlier chunks count as queueing for the later ones
+                        record = records[idx]
+                        upstream_wait = record["queue_wait"] or 0.0
+                        add_queue_wait(record, waiting - started + lock_wait)
+                        record.update(prompt_tokens=int(prompt_lens[row]),
+                                      output_tokens=self._count_generated(generated, tokenizer))
+                        if timer.first is not None:
+                            record["ttft"] = upstream_wait + timer.first - started
+
+                except Exception as e:
+                    log.error("[LLM BATCH ERROR on {}]: {}", model_name, e)
+                    for idx in chunk:
+                        responses[idx] = "move"
+                        records[idx]["status"] = "error"
+
+        return responses
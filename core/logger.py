@@ -1,14 +1,79 @@
 # core/logger.py
 import os
+import re
 import shutil
 import csv
+import io
+import atexit
+import json
+import threading
+from config.settings import LOG_FLUSH_POLICY
+
+# Per-agent inference totals LogManager adds to stats.csv (from core/telemetry.py records)
+INFERENCE_TOTAL_FIELDS = ["llm_calls", "llm_prompt_tokens", "llm_output_tokens",
+                          "llm_latency_s", "llm_queue_wait_s", "llm_failures", "llm_coalesced"]
+
+class ContextLog:
+    """
+    In-memory, append-only copy of a text log that agents build prompts from.
+    Mirrors what LogManager writes to the file, and indexes where each round
+    starts so the "current round" slice needs no re-scan of the whole log.
+    """
+    ROUND_PATTERN = re.compile(r"Round (\d+)/|=== Round (\d+) ===")
+
+    def __init__(self, initial_content=""):
+        self._chunks = []
+        self._rounds = {}  # round number -> (chunk index, offset into chunk)
+        self._text = None
+        self._lock = threading.Lock()
+        if initial_content:
+            self.append(initial_content)
+
+    def append(self, content):
+        with self._lock:
+            chunk_idx = len(self._chunks)
+            for match in self.ROUND_PATTERN.finditer(content):
+                round_num = int(match.group(1) or match.group(2))
+                self._rounds.setdefault(round_num, (chunk_idx, match.start()))
+            self._chunks.append(content)
+            self._text = None
+
+    def text(self):
+        """Full log contents, same as reading the file."""
+        with self._lock:
+            if self._text is None:
+                self._text = "".join(self._chunks)
+            return self._text
+
+    def since_round(self, round_num):
+        """
+        Log from the first marker of round_num onwards ("Round N/" or
+        "=== Round N ==="), or the whole log if that round has no marker.
+        """
+        try:
+            pos = self._rounds.get(int(round_num))
+        except (TypeError, ValueError):
+            pos = None
+        if pos is None:
+            return self.text()
+        with self._lock:
+            chunk_idx, offset = pos
+            return self._chunks[chunk_idx][offset:] + "".join(self._chunks[chunk_idx + 1:])
+
 
 class LogManager:
-    def __init__(self, game_id, agents, scenario_name=None):
+    def __init__(self, game_id, agents, scenario_name=None, flush_policy=LOG_FLUSH_POLICY):
         """
         agents: List of Agent objects (needed to categorize into Byz/Honest folders)
+        flush_policy: "phase" buffers writes until flush() (called by the engine at
+            phase boundaries), "line" flushes every entry as it is written.
         """
         self.game_id = game_id
+        self.flush_policy = flush_policy
+        # Files stay open for the whole game (path -> handle), closed by close()
+        self._handles = {}
+        self._io_lock = threading.Lock()
+        self.closed = False
         if scenario_name:
             self.base_dir = os.path.join("logs", scenario_name, f"Game_{game_id}")
         else:
@@ -25,7 +90,14 @@ class LogManager:
             "discussion": os.path.join(self.base_dir, "discussion.log"),
             "stats_csv": os.path.join(self.base_dir, "stats.csv"),
             "discussion_chat": os.path.join(self.base_dir, "discussion_chat.csv"),
+            "debug": os.path.join(self.base_dir, "debug.log"),
+            "inference": os.path.join(self.base_dir, "inference.jsonl"),
         }
+        # Logs agents read back into prompts are also kept in memory (path -> ContextLog)
+        self.context = {}
+        # agent name -> INFERENCE_TOTAL_FIELDS totals, filled by log_inference()
+        self.inference_totals = {}
+        self._totals_lock = threading.Lock()
 
         # Create Root Logs
         self._create_file(self.paths["round_results"], "=== Round Results Log ===\n")
@@ -51,15 +123,61 @@ class LogManager:
                 "vote": vote_log_path
             }
 
+        # Buffered lines must still reach disk if the run crashes or is interrupted
+        atexit.register(self.close)
+
     def _create_file(self, path, initial_content=""):
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(initial_content)
+        with self._io_lock:
+            self._handles[path] = open(path, "w", encoding="utf-8")
+        self._write(path, initial_content)
+        self.context[path] = ContextLog(initial_content)
+
+    def _write(self, path, content, newline=None):
+        with self._io_lock:
+            if self.closed:
+                # A handle reopened now would never be flushed or closed
+                print(f"Dropping write to {path} after the game's logs were closed: {content.strip()[:80]}")
+                return
+            f = self._handles.get(path)
+            if f is None:
+                f = self._handles[path] = open(path, "a", newline=newline, encoding="utf-8")
+            f.write(content)
+            if self.flush_policy == "line":
+                f.flush()
+
+    def _append(self, path, content):
+        self._write(path, content)
+        if path in self.context:
+            self.context[path].append(content)
+
+    def flush(self):
+        """Push buffered log lines to disk."""
+        with self._io_lock:
+            for f in self._handles.values():
+                f.flush()
+
+    def close(self):
+        """Flush and close every open log file. Safe to call more than once; later writes are dropped."""
+        with self._io_lock:
+            self.closed = True
+            handles, self._handles = self._handles, {}
+            for f in handles.values():
+                try:
+                    f.close()
+                except OSError as e:
+                    print(f"Error closing log file {f.name}: {e}")
+        atexit.unregister(self.close)
+
+    def _csv_row(self, path, row):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(row)
+        self._write(path, buffer.getvalue(), newline='')
     
     def _init_discussion_chat_csv(self):
         """Initialize discussion_chat.csv with headers"""
-        with open(self.paths["discussion_chat"], "w", newline='', encoding="utf-8") as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(["discussion_num", "reason", "agent_num", "model", "role", "message"])
+        with self._io_lock:
+            self._handles[self.paths["discussion_chat"]] = open(self.paths["discussion_chat"], "w", newline='', encoding="utf-8")
+        self._csv_row(self.paths["discussion_chat"], ["discussion_num", "reason", "agent_num", "model", "role", "message"])
 
     def log_discussion_chat(self, discussion_num, reason, agent_name, model_name, role, message):
         """Log a discussion chat message to CSV"""
@@ -68,12 +186,26 @@ class LogManager:
             agent_num = agent_name.replace("Agent_", "") if agent_name.startswith("Agent_") else agent_name
             role_label = "Byzantine" if role == "byzantine" else "Honest"
             
-            with open(self.paths["discussion_chat"], "a", newline='', encoding="utf-8") as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow([discussion_num, reason, agent_num, model_name, role_label, message])
+            self._csv_row(self.paths["discussion_chat"], [discussion_num, reason, agent_num, model_name, role_label, message])
         except Exception as e:
             print(f"Error logging discussion chat: {e}")
 
+    def log_inference(self, record):
+        """Appends one telemetry record (core/telemetry.py) to inference.jsonl and adds it to its agent's totals."""
+        self._write(self.paths["inference"], json.dumps(record, separators=(",", ":")) + "\n")
+        if not record.get("agent"):
+            return
+        with self._totals_lock:
+            totals = self.inference_totals.setdefault(record["agent"], dict.fromkeys(INFERENCE_TOTAL_FIELDS, 0))
+            totals["llm_calls"] += 1
+            totals["llm_prompt_tokens"] += record.get("prompt_tokens") or 0
+            totals["llm_output_tokens"] += record.get("output_tokens") or 0
+            totals["llm_latency_s"] += record.get("latency") or 0.0
+            totals["llm_queue_wait_s"] += record.get("queue_wait") or 0.0
+            totals["llm_coalesced"] += record.get("backend") == "coalesced"
+            if record.get("status") != "ok":
+                totals["llm_failures"] += 1
+
     def write_log(self, log_type, agent_name=None, content=""):
         """
         log_type: 'agent', 'discussion', 'results'
@@ -82,27 +214,21 @@ class LogManager:
             path = self.paths["agents"].get(agent_name)
             path = path.get("action") 
             if path:
-                with open(path, "a", encoding="utf-8") as f:
-                    f.write(content + "\n")
+                self._append(path, content + "\n")
                     
         elif log_type == 'discussion':
             # Write to BOTH discussion logs so everyone sees the same public chat
-            with open(self.paths["discussion"], "a", encoding="utf-8") as f:
-                f.write(content + "\n")
+            self._append(self.paths["discussion"], content + "\n")
 
         elif log_type == 'vote' and agent_name:
             path = self.paths["agents"].get(agent_name)
             path = path.get("vote") 
-            with open(path, "a", encoding="utf-8") as f:
-                    f.write(content + "\n")
+            self._append(path, content + "\n")
   
         elif log_type == 'results':
-            with open(self.paths["round_results"], "a", encoding="utf-8") as f:
-                f.write(content + "\n")
+            self._append(self.paths["round_results"], content + "\n")
         elif log_type == 'debug':
-            debug_log_path = os.path.join(self.base_dir, "debug.log")
-            with open(debug_log_path, "a", encoding="utf-8") as f:
-                f.write(content + "\n")
+            self._write(self.paths["debug"], content + "\n")
 
     def export_stats(self, agents_data):
         """
@@ -114,7 +240,7 @@ class LogManager:
 
         first_agent = list(agents_data.values())[0]
         stats_keys = list(first_agent["stats"].keys())
-        fieldnames = ["agent_name"] + stats_keys
+        fieldnames = ["agent_name"] + stats_keys + INFERENCE_TOTAL_FIELDS
 
         print(f"Exporting Game Stats to: {self.paths['stats_csv']}")
 
@@ -126,6 +252,11 @@ class LogManager:
                 for agent_name, data in agents_data.items():
                     row = data["stats"].copy()
                     row["agent_name"] = agent_name
+                    with self._totals_lock:
+                        totals = self.inference_totals.get(agent_name) or dict.fromkeys(INFERENCE_TOTAL_FIELDS, 0)
+                    row.update(totals)
+                    row["llm_latency_s"] = round(row["llm_latency_s"], 3)
+                    row["llm_queue_wait_s"] = round(row["llm_queue_wait_s"], 3)
                     writer.writerow(row)
         except Exception as e:
             print(f"Error exporting CSV stats: {e}")
@@ -137,4 +268,12 @@ class LogManager:
         return self.paths["discussion"]
 
     def get_results_log_path(self):
-        return self.paths["round_results"]
\ No newline at end of file
+        return self.paths["round_results"]
+
+    def get_agent_context(self, agent_name):
+        """In-memory logs an agent reads: its action log, the discussion log and the results log."""
+        return {
+            "action": self.context[self.get_agent_log_path(agent_name)],
+            "discussion": self.context[self.paths["discussion"]],
+            "results": self.context[self.paths["round_results"]],
+        }
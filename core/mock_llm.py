@@ -0,0 +1,193 @@
+"""Deterministic stand-in for every LLM backend (LLM_MODE=MOCK).
+
+Lets GameEngine run end to end without a model, API key or GPU, e.g. to
+measure or regression-test the engine on CPU-only machines. Responses are
+phase-appropriate so games play out normally:
+
+    movement    one of the prompt's options (a room, TAG <agent>, REPORT or BUTTON)
+    discussion  a short chat line naming a room or another agent
+    voting      one of the prompt's candidates (or SKIP)
+
+Every response is drawn from a random.Random seeded by a hash of the model,
+the prompts, the temperature and MOCK_LLM_SEED (LLM_SEED if unset), so a game
+with a fixed --seed replays identically.
+
+Latency is injected by sleeping, with a distribution per phase
+(MOCK_LLM_LATENCY_MOVEMENT / _DISCUSSION / _VOTING, falling back to
+MOCK_LLM_LATENCY):
+
+    0 or 0.2            constant seconds
+    uniform:0.05,0.3    uniform between two bounds
+    normal:0.2,0.05     mean, standard deviation (clipped at 0)
+    lognormal:0.2,0.5   median, sigma of the underlying normal
+    exp:0.2             exponential with this mean
+
+A batch sleeps once, for the longest latency among its prompts, like one
+batched forward pass. Telemetry records get token counts estimated at four
+characters per token.
+"""
+
+import hashlib
+import math
+import os
+import random
+import re
+import threading
+import time
+
+PHASES = ("movement", "discussion", "voting")
+
+_AGENT_NAME = re.compile(r"\bAgent_\d+\b")
+_CANDIDATES_LINE = re.compile(r"^Candidates:(.*)$", re.MULTILINE)
+
+CHAT_TEMPLATES = [
+    "I was in {room} the whole time.",
+    "I saw {agent} near {room}.",
+    "I was with {agent} in {room}, they are clear.",
+    "I don't trust {agent}, where were they?",
+    "Nothing suspicious on my side, I stayed around {room}.",
+    "I think we should skip unless someone saw something.",
+]
+
+
+def parse_latency(spec):
+    """Returns a function rng -> seconds for a latency spec (see module docstring).
+
+    Raises:
+        ValueError: If the spec is not understood.
+    """
+    spec = (spec or "0").strip().lower()
+    kind, _, args = spec.partition(":")
+    if not args:
+        value = float(kind)
+        return lambda rng: value
+    params = [float(x) for x in args.split(",")]
+    if kind == "const":
+        return lambda rng: params[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(params[0], params[1]))
+    if kind == "lognormal":
+        mu = math.log(params[0])
+        return lambda rng: rng.lognormvariate(mu, params[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1.0 / params[0]) if params[0] > 0 else 0.0
+    raise ValueError(f"Unknown mock latency distribution: {spec}")
+
+
+def detect_phase(user_prompt):
+    """Game phase a prompt belongs to (None if it is not one of the agents' prompts)."""
+    for phase in PHASES:
+        if f"You are in a {phase} phase" in user_prompt:
+            return phase
+    return None
+
+
+class MockLLM:
+    """Seeded responses with injected latency, in place of ModelManager's backends.
+
+    Args:
+        seed: Mixed into every response's seed (None behaves like 0).
+        latency: Default latency spec for all phases.
+        phase_latency: {phase: spec} overriding latency per phase.
+    """
+
+    def __init__(self, seed=None, latency="0", phase_latency=None):
+        self.seed = seed if seed is not None else 0
+        default = parse_latency(latency)
+        self.latency = {phase: default for phase in PHASES}
+        self.latency[None] = default
+        for phase, spec in (phase_latency or {}).items():
+            if spec:
+                self.latency[phase] = parse_latency(spec)
+
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.batches = 0
+        self.injected_seconds = 0.0
+
+    @classmethod
+    def from_env(cls, seed=None):
+        env_seed = os.environ.get("MOCK_LLM_SEED")
+        return cls(
+            seed=int(env_seed) if env_seed else seed,
+            latency=os.environ.get("MOCK_LLM_LATENCY", "0"),
+            phase_latency={phase: os.environ.get(f"MOCK_LLM_LATENCY_{phase.upper()}") for phase in PHASES},
+        )
+
+    def _rng(self, model_name, system_prompt, user_prompt, temperature, salt=""):
+        digest = hashlib.sha256(
+            f"{self.seed}|{model_name}|{temperature}|{salt}|{system_prompt}|{user_prompt}".encode("utf-8")
+        ).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def respond(self, model_name, system_prompt, user_prompt, temperature=0.1):
+        """(response, latency seconds) for one prompt, without sleeping."""
+        rng = self._rng(model_name, system_prompt, user_prompt, temperature)
+        phase = detect_phase(user_prompt)
+        if phase == "movement":
+            response = self._movement(rng, user_prompt)
+        elif phase == "discussion":
+            response = self._discussion(rng, user_prompt)
+        elif phase == "voting":
+            response = self._vote(rng, user_prompt)
+        else:
+            response = "OK"
+        latency_rng = self._rng(model_name, system_prompt, user_prompt, temperature, salt="latency")
+        return response, self.latency[phase](latency_rng)
+
+    def generate(self, model_name, system_prompt, user_prompt, temperature=0.1, record=None):
+        response, latency = self.respond(model_name, system_prompt, user_prompt, temperature)
+        self._record(1, latency)
+        self._fill(record, system_prompt, user_prompt, response, latency)
+        if latency > 0:
+            time.sleep(latency)
+        return response
+
+    def generate_batch(self, model_name, prompts, records=None):
+        """Responses for (system_prompt, user_prompt, temperature) tuples, in order."""
+        results = [self.respond(model_name, *prompt) for prompt in prompts]
+        latency = max((latency for _, latency in results), default=0.0)
+        self._record(len(prompts), latency)
+        for i, (prompt, (response, _)) in enumerate(zip(prompts, results)):
+            self._fill(records[i] if records else None, prompt[0], prompt[1], response, latency)
+        if latency > 0:
+            time.sleep(latency)
+        return [response for response, _ in results]
+
+    @staticmethod
+    def _fill(record, system_prompt, user_prompt, response, latency):
+        if record is not None:
+            record.update(prompt_tokens=(len(system_prompt) + len(user_prompt)) // 4,
+                          output_tokens=max(1, len(response) // 4), queue_wait=0.0, ttft=latency)
+
+    def _record(self, calls, latency):
+        with self._lock:
+            self.calls += calls
+            self.batches += 1
+            self.injected_seconds += latency
+
+    @staticmethod
+    def _movement(rng, user_prompt):
+        section = user_prompt.rsplit("Options", 1)[-1].split("INSTRUCTIONS", 1)[0]
+        options = []
+        for line in section.splitlines():
+            line = line.strip().lstrip("- ").strip()
+            if line and not line.endswith(":"):
+                options.append(line)
+        return rng.choice(options) if options else "move"
+
+    @staticmethod
+    def _discussion(rng, user_prompt):
+        from config.settings import ROOMS
+
+        agents = sorted(set(_AGENT_NAME.findall(user_prompt))) or ["nobody"]
+        template = rng.choice(CHAT_TEMPLATES)
+        return template.format(room=rng.choice(sorted(ROOMS)), agent=rng.choice(agents))
+
+    @staticmethod
+    def _vote(rng, user_prompt):
+        match = _CANDIDATES_LINE.search(user_prompt)
+        candidates = re.findall(r"\bAgent_\d+\b|\bSKIP\b", match.group(1)) if match else []
+        return rng.choice(candidates) if candidates else "SKIP"
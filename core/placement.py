@@ -0,0 +1,233 @@
+"""GPU memory planning for worker model placement.
+
+Estimates how much GPU memory each local model needs and packs a
+composition's models onto workers (one per GPU, or several GPUs for models
+larger than one device) with first-fit decreasing bin packing.
+
+A model's footprint is its weights plus a KV cache allowance plus a fixed
+runtime overhead:
+
+    weights  = parameters x bytes per parameter (bf16, or 4-bit for QUANTIZE / MXFP4_MODELS)
+    kv cache = 2 x layers x kv_heads x head_dim x 2 bytes x PLACEMENT_KV_TOKENS
+    overhead = PLACEMENT_OVERHEAD_GB
+
+Parameters and KV shape come from the model's config.json when it is in the
+local Hugging Face cache (or --online), otherwise from the size in the model
+name ("Llama-3.3-70B" -> 70B) or KNOWN_PARAMS_B.
+
+submit_games.sh reads the plan printed by the command line entry point, one
+worker per line as "<gpus> <memory budget GB> <models>". The budget is 0 unless
+the worker is oversubscribed, in which case it becomes the worker's
+MODEL_MEMORY_BUDGET_GB and models are loaded/evicted on demand:
+
+    python -m core.placement MyComp --gpu-mem-gb 80 --max-gpus 4
+    1 0 meta-llama/Llama-3.3-70B-Instruct
+    1 0 Qwen/Qwen2.5-7B-Instruct,google/gemma-2-9b-it
+"""
+
+import argparse
+import math
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+
+GIB = 1024 ** 3
+GPU_MEM_GB = float(os.environ.get("PLACEMENT_GPU_MEM_GB", "180"))  # B200
+# Fraction of a device the planner fills; the rest absorbs fragmentation and activations
+GPU_HEADROOM = float(os.environ.get("PLACEMENT_HEADROOM", "0.9"))
+KV_TOKENS = int(os.environ.get("PLACEMENT_KV_TOKENS", str(16 * 2048)))
+OVERHEAD_GB = float(os.environ.get("PLACEMENT_OVERHEAD_GB", "1.5"))
+
+BYTES_PER_PARAM = 2.0          # bf16
+QUANTIZED_BYTES_PER_PARAM = 0.56  # nf4 with double quantization, plus unquantized embeddings/norms
+MXFP4_BYTES_PER_PARAM = 0.55
+
+# Models whose names do not carry their size (billions of parameters)
+KNOWN_PARAMS_B = {
+    "arcee-ai/Arcee-Nova": 72.7,
+    "Nexusflow/Athene-V2-Chat": 72.7,
+    "arcee-ai/Arcee-Agent": 7.6,
+    "Aratako/Mixtral-8x7B-Instruct-v0.1-upscaled": 46.7,
+}
+
+# KV cache shape assumed when no config is available, by parameter count (billions)
+_DEFAULT_KV_SHAPES = [(10, (32, 8, 128)), (40, (48, 8, 128)), (float("inf"), (80, 8, 128))]
+
+_NAME_SIZE = re.compile(r"(?<![\w.])(?:(\d+)x)?(\d+(?:\.\d+)?)[bB](?![a-zA-Z])")
+
+
+@dataclass
+class ModelFootprint:
+    name: str
+    params_b: float
+    weights_gb: float
+    kv_gb: float
+    source: str
+
+    @property
+    def total_gb(self):
+        return self.weights_gb + self.kv_gb + OVERHEAD_GB
+
+
+@dataclass
+class Worker:
+    gpus: int
+    capacity_gb: float
+    models: list = field(default_factory=list)
+    used_gb: float = 0.0
+
+    @property
+    def oversubscribed(self):
+        return self.used_gb > self.capacity_gb
+
+
+def _load_config(model_name, online=False):
+    try:
+        from transformers import AutoConfig
+        return AutoConfig.from_pretrained(model_name, trust_remote_code=True, local_files_only=not online)
+    except Exception:
+        return None
+
+
+def _params_from_config(config):
+    """Approximate parameter count of a decoder-only (optionally MoE) transformer config."""
+    config = config.get_text_config() if hasattr(config, "get_text_config") else config
+    hidden = config.hidden_size
+    layers = config.num_hidden_layers
+    heads = config.num_attention_heads
+    head_dim = getattr(config, "head_dim", None) or hidden // heads
+    kv_heads = getattr(config, "num_key_value_heads", None) or heads
+    vocab = config.vocab_size
+
+    attention = hidden * head_dim * (2 * heads + 2 * kv_heads)
+    experts = (getattr(config, "num_local_experts", None) or getattr(config, "num_experts", None)
+               or getattr(config, "n_routed_experts", None) or 0)
+    if experts:
+        expert_size = getattr(config, "moe_intermediate_size", None) or config.intermediate_size
+        shared = getattr(config, "shared_expert_intermediate_size", None) or 0
+        mlp = 3 * hidden * (experts * expert_size + shared)
+    else:
+        mlp = 3 * hidden * config.intermediate_size
+    embeddings = vocab * hidden * (1 if getattr(config, "tie_word_embeddings", False) else 2)
+    return layers * (attention + mlp) + embeddings, (layers, kv_heads, head_dim)
+
+
+def _params_from_name(model_name):
+    if model_name in KNOWN_PARAMS_B:
+        return KNOWN_PARAMS_B[model_name]
+    match = _NAME_SIZE.search(model_name.split("/")[-1])
+    if not match:
+        return None
+    experts, size = match.groups()
+    return float(size) * (int(experts) if experts else 1)
+
+
+def bytes_per_param(model_name):
+    from core.llm import MXFP4_MODELS, QUANTIZE
+
+    if model_name in MXFP4_MODELS:
+        return MXFP4_BYTES_PER_PARAM
+    if model_name in QUANTIZE:
+        return QUANTIZED_BYTES_PER_PARAM
+    return BYTES_PER_PARAM
+
+
+def estimate_footprint(model_name, online=False):
+    """ModelFootprint of model_name as ModelManager.load_model would load it on a GPU.
+
+    Raises:
+        ValueError: If neither a config nor the name gives the model's size.
+    """
+    config = _load_config(model_name, online)
+    kv_shape = None
+    if config is not None:
+        try:
+            params, kv_shape = _params_from_config(config)
+            params_b, source = params / 1e9, "config"
+        except (AttributeError, TypeError):
+            config = None
+    if config is None:
+        params_b, source = _params_from_name(model_name), "name"
+        if params_b is None:
+            raise ValueError(f"Cannot estimate the size of {model_name}; add it to KNOWN_PARAMS_B")
+    if kv_shape is None:
+        kv_shape = next(shape for limit, shape in _DEFAULT_KV_SHAPES if params_b <= limit)
+
+    layers, kv_heads, head_dim = kv_shape
+    kv_bytes = 2 * layers * kv_heads * head_dim * 2 * KV_TOKENS
+    weights = params_b * 1e9 * bytes_per_param(model_name)
+    return ModelFootprint(model_name, params_b, weights / GIB, kv_bytes / GIB, source)
+
+
+def plan_workers(footprints, gpu_mem_gb=GPU_MEM_GB, max_gpus=None):
+    """Packs models onto workers, largest first, each into the first worker with room.
+
+    Models larger than one GPU get a worker of their own with enough GPUs.
+    If the plan needs more than max_gpus, the remaining models go to the
+    least-loaded single-GPU workers, which are then oversubscribed and rely on
+    ModelManager's load/evict budget (MODEL_MEMORY_BUDGET_GB).
+    """
+    capacity = gpu_mem_gb * GPU_HEADROOM
+    workers = []
+    overflow = []
+    for fp in sorted(footprints, key=lambda f: f.total_gb, reverse=True):
+        size = fp.total_gb
+        if size > capacity:
+            gpus = math.ceil(size / capacity)
+            if max_gpus is None or sum(w.gpus for w in workers) + gpus <= max_gpus:
+                workers.append(Worker(gpus, capacity * gpus, [fp.name], size))
+            else:
+                overflow.append(fp)
+            continue
+        target = next((w for w in workers if w.gpus == 1 and w.used_gb + size <= w.capacity_gb), None)
+        if target is None and (max_gpus is None or sum(w.gpus for w in workers) < max_gpus):
+            target = Worker(1, capacity)
+            workers.append(target)
+        if target is None:
+            overflow.append(fp)
+            continue
+        target.models.append(fp.name)
+        target.used_gb += size
+
+    for fp in overflow:
+        candidates = [w for w in workers if w.capacity_gb >= fp.total_gb] or workers
+        if not candidates:
+            raise ValueError(f"No GPU can hold {fp.name} ({fp.total_gb:.1f} GB)")
+        target = min(candidates, key=lambda w: w.used_gb / w.capacity_gb)
+        target.models.append(fp.name)
+        target.used_gb += fp.total_gb
+    return workers
+
+
+def main():
+    # Planning loads no model; keep core.llm from importing torch
+    os.environ.setdefault("LLM_MODE", "CONTROLLER")
+    from config.generate_batch_list import get_models_for_composition
+
+    parser = argparse.ArgumentParser(description="Plan worker/GPU placement for a composition's local models")
+    parser.add_argument("comp_name", type=str)
+    parser.add_argument("--gpu-mem-gb", type=float, default=GPU_MEM_GB, help="Memory of one GPU")
+    parser.add_argument("--max-gpus", type=int, default=None, help="GPUs available to the job (default: as many as needed)")
+    parser.add_argument("--online", action="store_true", help="Download configs that are not cached locally")
+    args = parser.parse_args()
+
+    models = [m for m in get_models_for_composition(args.comp_name) if ":" not in m]  # API models need no GPU
+    if not models:
+        sys.exit(1)
+
+    footprints = [estimate_footprint(m, args.online) for m in models]
+    workers = plan_workers(footprints, args.gpu_mem_gb, args.max_gpus)
+
+    for fp in footprints:
+        sys.stderr.write(f"  {fp.name}: {fp.params_b:.1f}B params ({fp.source}), "
+                         f"{fp.weights_gb:.1f} GB weights + {fp.kv_gb:.1f} GB KV + {OVERHEAD_GB:.1f} GB\n")
+    for worker in workers:
+        note = " OVERSUBSCRIBED (load/evict on demand)" if worker.oversubscribed else ""
+        sys.stderr.write(f"Worker {worker.gpus} GPU(s): {worker.used_gb:.1f}/{worker.capacity_gb:.1f} GB{note}\n")
+        budget = int(worker.capacity_gb) if worker.oversubscribed else 0
+        print(f"{worker.gpus} {budget} {','.join(worker.models)}")
+
+
+if __name__ == "__main__":
+    main()
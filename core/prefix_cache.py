@@ -0,0 +1,118 @@
+"""Reuse of prefilled KV caches for prompt prefixes shared by local generate() calls.
+
+Every agent prompt starts with the same long system prompt (rules + ROOMS map),
+so for local models the key/value cache of that prefix is computed once per
+(model, system prompt) and handed to model.generate(), which then only
+prefills the tokens after it. Entries are evicted least-recently-used once
+their tensors exceed the memory budget.
+
+Only imported when local models are loaded (needs torch).
+"""
+
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+
+import torch
+from loguru import logger as log
+
+# Shorter shared prefixes are not worth a cache entry
+MIN_PREFIX_TOKENS = 32
+
+
+def cache_nbytes(past_key_values):
+    """Bytes held by the key/value tensors of a transformers cache object."""
+    total = 0
+    layers = getattr(past_key_values, "layers", None)
+    if layers is None:
+        # Legacy tuple-of-tuples format
+        layers = past_key_values
+    for layer in layers:
+        tensors = (getattr(layer, "keys", None), getattr(layer, "values", None)) if hasattr(layer, "keys") else layer
+        for tensor in tensors:
+            if isinstance(tensor, torch.Tensor):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class PrefixCache:
+    """LRU of {(model, system prompt hash): (prefix token ids, past_key_values, bytes)}.
+
+    Args:
+        max_mb: Memory budget for all cached prefixes; 0 disables the cache.
+    """
+
+    def __init__(self, max_mb):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def _key(model_name, system_prompt):
+        return model_name, hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()
+
+    def lookup(self, model, model_name, system_prompt, input_ids, reference_ids):
+        """Return a private copy of the cached KV for input_ids' system prompt prefix, or None.
+
+        Args:
+            model: The loaded model, used to prefill the prefix on a miss.
+            model_name: Name the model was loaded under.
+            system_prompt: System prompt used to build input_ids.
+            input_ids: Tokenized full prompt, shape (1, seq_len).
+            reference_ids: Callable returning the same chat template tokenized with
+                an empty user message; the common prefix with input_ids is cached.
+        """
+        key = self._key(model_name, system_prompt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                prefix_ids, past_key_values, _ = entry
+                length = prefix_ids.shape[-1]
+                # The tokenizer may merge differently across the prefix boundary
+                if input_ids.shape[-1] > length and torch.equal(input_ids[0, :length], prefix_ids):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(past_key_values)
+                return None
+
+            self.misses += 1
+            reference = reference_ids()[0].to(input_ids.device)
+            limit = min(reference.shape[-1], input_ids.shape[-1] - 1)
+            mismatch = (reference[:limit] != input_ids[0, :limit]).nonzero()
+            length = int(mismatch[0]) if len(mismatch) else limit
+            if length < MIN_PREFIX_TOKENS:
+                return None
+
+            prefix_ids = input_ids[0, :length].clone()
+            with torch.no_grad():
+                past_key_values = model(input_ids=prefix_ids.unsqueeze(0), use_cache=True).past_key_values
+            nbytes = cache_nbytes(past_key_values)
+            if nbytes > self.max_bytes:
+                return None
+
+            self._entries[key] = (prefix_ids, past_key_values, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+            log.debug("[PrefixCache] Cached {} prefix tokens for {} ({:.1f} MB total)",
+                      length, model_name, self._bytes / 2**20)
+            return copy.deepcopy(past_key_values)
+
+    def drop_model(self, model_name):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == model_name]:
+                self._bytes -= self._entries.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
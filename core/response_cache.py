@@ -0,0 +1,132 @@
+"""On-disk cache of LLM responses for reruns and replays.
+
+Responses are stored in SQLite, keyed by a hash of everything that determines a
+generation: model, system prompt, user prompt, temperature, seed and the
+generation profile (output budget and stop rules). Modes (LLM_CACHE_MODE):
+
+    off        no caching (default)
+    readwrite  serve hits from the cache, generate and store misses
+    replay     serve hits only; misses return REPLAY_MISS without touching a backend
+
+The cache keeps at most LLM_CACHE_MAX_ENTRIES rows and evicts the least recently
+used ones beyond that.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from loguru import logger as log
+
+CACHE_MODE = os.environ.get("LLM_CACHE_MODE", "off").lower()
+CACHE_PATH = os.environ.get("LLM_CACHE_PATH", os.path.join("logs", "response_cache.sqlite"))
+CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "200000"))
+
+# Returned in replay mode for prompts that were never recorded
+REPLAY_MISS = "SKIP (Replay Miss)"
+
+# Fallback strings returned on backend errors; never cached
+UNCACHEABLE_RESPONSES = {"move", "ERROR", "SKIP (Timeout)", REPLAY_MISS}
+
+# Eviction runs once per this many inserts rather than on every write
+_EVICT_EVERY = 256
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response cache shared by every thread of a process.
+
+    Args:
+        path: SQLite database file (created if missing).
+        mode: "readwrite" or "replay".
+        max_entries: Row limit enforced by least-recently-used eviction.
+    """
+
+    def __init__(self, path=CACHE_PATH, mode="readwrite", max_entries=CACHE_MAX_ENTRIES):
+        if mode not in ("readwrite", "replay"):
+            raise ValueError(f"Unknown response cache mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._inserts = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT, response TEXT, created REAL, last_used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._db.commit()
+        log.info("[ResponseCache] {} mode, {}", mode, path)
+
+    @classmethod
+    def from_env(cls):
+        """Cache configured by LLM_CACHE_MODE / LLM_CACHE_PATH, or None when off."""
+        if CACHE_MODE in ("", "off", "none", "0"):
+            return None
+        return cls(CACHE_PATH, CACHE_MODE, CACHE_MAX_ENTRIES)
+
+    @property
+    def replay(self):
+        return self.mode == "replay"
+
+    @staticmethod
+    def key(model_name, system_prompt, user_prompt, temperature, seed, max_new_tokens):
+        parts = [model_name, _sha256(system_prompt), _sha256(user_prompt), temperature, seed, max_new_tokens]
+        return _sha256(json.dumps(parts))
+
+    def get(self, key):
+        """Cached response for key, or None."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if not self.replay:
+                self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self._db.commit()
+        return row[0]
+
+    def put(self, key, model_name, response):
+        if self.replay or response in UNCACHEABLE_RESPONSES:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, response, now, now),
+            )
+            self._inserts += 1
+            if self._inserts % _EVICT_EVERY == 0:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        (count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN"
+                " (SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                (excess,),
+            )
+            log.info("[ResponseCache] Evicted {} entries", excess)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -2,14 +2,96 @@
 import json
 import os
 import random
+import time
 from datetime import datetime
-from config.settings import ROOMS, NUM_ROUNDS
+from config.settings import ROOMS, NUM_ROUNDS, LIVE_STATE_MAX_WRITES_PER_SEC, LIVE_STATE_DELTAS
+
+
+def _dump(obj):
+    return json.dumps(obj, separators=(",", ":"))
+
+
+class LiveStatePublisher:
+    """
+    Writes live map snapshots for the frontend.
+    Writes are rate limited to max_writes_per_sec (skipped updates are picked up by
+    the next publish), compact, and atomic (temp file + rename) so the frontend never
+    reads a half-written file. With deltas enabled, every snapshot also appends one
+    JSON line with a sequence number and only the parts that changed since the
+    previous snapshot: changed agents/rooms/global keys and new UI events.
+    """
+
+    def __init__(self, path, max_writes_per_sec=LIVE_STATE_MAX_WRITES_PER_SEC, deltas=LIVE_STATE_DELTAS):
+        self.path = path
+        self.deltas_path = os.path.splitext(path)[0] + "_deltas.jsonl"
+        self.min_interval = 1.0 / max_writes_per_sec if max_writes_per_sec else 0.0
+        self.deltas = deltas
+        self.seq = 0
+        self._last_write = 0.0
+        self._last_parts = {}  # section -> {key: serialized value} from the previous snapshot
+        self._events_sent = 0
+
+        # A new game starts a new delta stream
+        if self.deltas and os.path.exists(self.deltas_path):
+            os.remove(self.deltas_path)
+
+    def due(self):
+        return time.monotonic() - self._last_write >= self.min_interval
+
+    def publish(self, snapshot):
+        """Writes snapshot (and its delta). Returns the sequence number it was published under."""
+        self.seq += 1
+        snapshot["seq"] = self.seq
+        if self.deltas:
+            self._append_delta(snapshot)
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(_dump(snapshot))
+        os.replace(temp_path, self.path)
+        self._last_write = time.monotonic()
+        return self.seq
+
+    def _append_delta(self, snapshot):
+        delta = {"seq": self.seq, "game_id": snapshot.get("game_id")}
+        for section in ("agents", "rooms", "global"):
+            items = snapshot.get(section, {})
+            parts = {k: _dump(v) for k, v in items.items() if not (section == "global" and k == "ui_event_log")}
+            previous = self._last_parts.get(section, {})
+            changed = {k: items[k] for k, v in parts.items() if previous.get(k) != v}
+            if changed:
+                delta[section] = changed
+            self._last_parts[section] = parts
+        for section in ("suspicion", "token_usage"):
+            part = _dump(snapshot.get(section))
+            if self._last_parts.get(section) != part:
+                delta[section] = snapshot.get(section)
+                self._last_parts[section] = part
+
+        events = snapshot.get("global", {}).get("ui_event_log", [])
+        if len(events) > self._events_sent:
+            delta["events"] = events[self._events_sent:]
+            self._events_sent = len(events)
+
+        with open(self.deltas_path, "a", encoding="utf-8") as f:
+            f.write(_dump(delta) + "\n")
+
 
 class GameState:
-    def __init__(self, agents, log_manager):
+    def __init__(self, agents, log_manager, rng=None, live_state_file=None):
+        """
+        rng: random.Random used for this game's draws (start rooms), so concurrent
+            games in one process stay reproducible; defaults to the random module.
+        live_state_file: Live map snapshot path, default logs/live_state.json.
+        """
         self.agents = agents
         self.logger = log_manager
-        self.live_state_file = os.path.join("logs", "live_state.json")
+        self.rng = rng if rng is not None else random
+        self.live_state_file = live_state_file or os.path.join("logs", "live_state.json")
+        self.publisher = LiveStatePublisher(self.live_state_file)
         
         # Onserver tracking
         self.enabled_classifiers = {}  
@@ -33,7 +115,7 @@ class GameState:
 
         # Initialize Data
         for agent in agents:
-            start_room = random.choice(list(ROOMS.keys()))
+            start_room = self.rng.choice(list(ROOMS.keys()))
             #start_room = "Cafeteria"
             alignment = 'B' if agent.role == 'byzantine' else 'H'
             self.world_data["agents"][agent.name] = {
@@ -68,6 +150,19 @@ class GameState:
                 }
             }
             self.world_data["rooms"][start_room]["occupants"].append(agent.name)
+
+        # Kept current by _set_status() so get_agent_view() never scans every agent
+        self._active_total = len(agents)
+        self._active_honest = sum(1 for agent in agents if agent.role == "honest")
+        byzantines = [agent.name for agent in agents if agent.role == "byzantine"]
+        self._teammates = {name: [tm for tm in byzantines if tm != name] for name in byzantines}
+        # Header fragments ("Players Remaining", teammate status) per agent, valid while
+        # no status changes; _status_version is bumped on every elimination/ejection
+        self._status_version = 0
+        self._header_cache = {}
+        # Adjacent-room entries of the view: the room's live occupant list and no bodies
+        self._neighbor_views = {room: {"occupants": data["occupants"], "bodies": []}
+                                for room, data in self.world_data["rooms"].items()}
             
     def add_ui_event(self, message, category="info"):
         """Adds a message to the live UI log."""
@@ -126,44 +221,15 @@ class GameState:
             if not already_known:
                 agent_data["known_bodies"].append({"name": body, "room": loc})
 
-        active_honest = len([a for n, a in self.world_data["agents"].items() 
-                             if a["role"] == "honest" and a["status"] == "active"])
-        total_active = len([a for n, a in self.world_data["agents"].items() 
-                             if a["status"] == "active"])
-
-        if agent_data["role"] == "byzantine":
-            count_str = f"Honest Agents Remaining: {active_honest}"
-        else:
-            count_str = f"Players Remaining: {total_active}"
-
-        current_room_bodies = self.world_data["rooms"][loc]["bodies"]
-
-        visible_bodies = []
-        for body in current_room_bodies:
-            visible_bodies.append({"name": body, "room": loc})
-    
-        surroundings = {loc: {"occupants": occupants, "bodies": current_room_bodies}}
-        adj_log_str = ""
-        if loc in ROOMS:
-            for neighbor in ROOMS[loc]:
-                neighbor_data = self.world_data["rooms"][neighbor].copy()
-                neighbor_data["bodies"] = []
-                surroundings[neighbor] = neighbor_data
-                occ = [p for p in self.world_data["rooms"][neighbor]["occupants"] if p != agent_name]
-                adj_log_str += f"\n    [{neighbor}] -> Occupants: {occ if occ else 'None'}"
-
-        teammate_str = ""
-        if agent_data["role"] == "byzantine":
-            teammates = [a.name for a in self.agents if a.role == "byzantine" and a.name != agent_name]
-            tm_status = []
-            for tm in teammates:
-                status = self.world_data["agents"][tm]["status"]
-                tm_status.append(f"{tm}: {status}")
-            teammate_str = f"Teammate(s) Status: {' || '.join(tm_status)}\n"
+        surroundings = {loc: {"occupants": occupants, "bodies": current_bodies}}
+        neighbors = ROOMS.get(loc, [])
+        for neighbor in neighbors:
+            surroundings[neighbor] = self._neighbor_views[neighbor]
 
         header_str = ""
         # Only check/update header
         if log_to_file and agent_data["last_round_seen"] < round_num:
+            count_str, teammate_str = self._header_fragments(agent_name, agent_data["role"])
             header_str = (
                 f"Round {round_num}/{NUM_ROUNDS}\n"
                 f"{count_str}\n"
@@ -173,6 +239,10 @@ class GameState:
 
         # Agent Observation Block 
         if log_to_file:
+            adj_log_str = ""
+            for neighbor in neighbors:
+                occ = [p for p in self._neighbor_views[neighbor]["occupants"] if p != agent_name]
+                adj_log_str += f"\n    [{neighbor}] -> Occupants: {occ if occ else 'None'}"
             if agent_data["known_bodies"]:
                 bodies_log_str = ", ".join([f"{b['name']} (in {b['room']})" for b in agent_data['known_bodies']])
             else:
@@ -193,10 +263,36 @@ class GameState:
             "known_bodies": agent_data["known_bodies"],
             "log_path": self.logger.get_agent_log_path(agent_name),
             "discussion_log_path": self.logger.get_discussion_log_path(agent_data["role"]),
-            "results_log_path": self.logger.get_results_log_path()
+            "results_log_path": self.logger.get_results_log_path(),
+            "context": self.logger.get_agent_context(agent_name)
         }
         return view
 
+    def _header_fragments(self, agent_name, role):
+        """(count_str, teammate_str) of the round header, rebuilt only after a status change."""
+        cached = self._header_cache.get(agent_name)
+        if cached is not None and cached[0] == self._status_version:
+            return cached[1]
+
+        if role == "byzantine":
+            count_str = f"Honest Agents Remaining: {self._active_honest}"
+            tm_status = [f"{tm}: {self.world_data['agents'][tm]['status']}" for tm in self._teammates[agent_name]]
+            teammate_str = f"Teammate(s) Status: {' || '.join(tm_status)}\n"
+        else:
+            count_str = f"Players Remaining: {self._active_total}"
+            teammate_str = ""
+        self._header_cache[agent_name] = (self._status_version, (count_str, teammate_str))
+        return count_str, teammate_str
+
+    def _set_status(self, agent_name, status):
+        agent_data = self.world_data["agents"][agent_name]
+        if agent_data["status"] == "active" and status != "active":
+            self._active_total -= 1
+            if agent_data["role"] == "honest":
+                self._active_honest -= 1
+        agent_data["status"] = status
+        self._status_version += 1
+
     def record_action(self, agent_name, action_text, raw_response=None):
         """Records the selected action to the log file, ensuring it is one line."""
         clean_action = action_text.replace("\n", " ").replace("\r", "").strip()
@@ -227,7 +323,7 @@ class GameState:
         self.world_data["agents"][agent_name]["location"] = new_room
 
     def eliminate_agent(self, target_name, location):
-        self.world_data["agents"][target_name]["status"] = "eliminated"
+        self._set_status(target_name, "eliminated")
         self.world_data["agents"][target_name]["stats"]["times_eliminated"] += 1
 
         self.world_data["rooms"][location]["occupants"].remove(target_name)
@@ -329,7 +425,7 @@ class GameState:
         self.add_ui_event(f"{agent_name} voted for {target}", "vote")
 
     def eject_agent(self, agent_name):
-        self.world_data["agents"][agent_name]["status"] = "ejected"
+        self._set_status(agent_name, "ejected")
         current_loc = self.world_data["agents"][agent_name]["location"]
         self.world_data["agents"][agent_name]["stats"]["ejections"] += 1
 
@@ -339,8 +435,14 @@ class GameState:
         self.logger.write_log("results", None, f"EJECTION: {agent_name} was ejected.")
         self.add_ui_event(f"{agent_name} was EJECTED.", "eject")
     
-    def save_json(self):
-        """Exports the current state to a JSON file for the Live Map."""
+    def save_json(self, force=False):
+        """
+        Exports the current state to a JSON file for the Live Map.
+        Calls within the publisher's rate limit are skipped unless force=True;
+        the engine forces a write at phase boundaries.
+        """
+        if not force and not self.publisher.due():
+            return
         try:
             from core.llm import ModelManager
 
@@ -351,7 +453,6 @@ class GameState:
             }
             output_data['token_usage'] = ModelManager.get_instance().get_token_usage()
 
-            with open(self.live_state_file, "w", encoding="utf-8") as f:
-                json.dump(output_data, f, indent=4)
+            self.publisher.publish(output_data)
         except Exception as e:
-            print(f"[Warning] Could not save live state: {e}")
\ No newline at end of file
+            print(f"[Warning] Could not save live state: {e}")
@@ -0,0 +1,62 @@
+"""Per-call inference records.
+
+ModelManager.generate() and generate_batch() fill one record per prompt and
+pass it to the telemetry sink registered for the record's game
+(LogManager.log_inference). The sink appends it to the game's inference.jsonl
+and keeps per-agent totals for stats.csv. Fields:
+
+    time            wall-clock time the call started (epoch seconds)
+    game, round, agent
+                    from the caller's tags (None when untagged)
+    phase           "movement", "discussion" or "voting"
+    model, backend  backend is api, globus, controller, local, mock, cache or
+                    coalesced (answered by an identical call already in flight)
+    prompt_tokens, output_tokens
+                    None where the backend does not report them
+    queue_wait      seconds spent waiting before generation started: API limiter,
+                    worker queue, local device lock
+    ttft            seconds from the start of the request to the first generated
+                    token (local, worker and Globus generation only)
+    latency         seconds until the response was returned to the caller
+    status          ok, error, timeout or replay_miss
+"""
+
+import time
+
+FIELDS = ("time", "game", "round", "phase", "agent", "model", "backend",
+          "prompt_tokens", "output_tokens", "queue_wait", "ttft", "latency", "status")
+
+# Measured where the model runs; workers send them back with their reply
+REMOTE_FIELDS = ("prompt_tokens", "output_tokens", "queue_wait", "ttft")
+
+
+def new_record(model_name, phase=None, tags=None):
+    tags = tags or {}
+    record = dict.fromkeys(FIELDS)
+    record.update(
+        time=time.time(),
+        game=tags.get("game"),
+        round=tags.get("round"),
+        agent=tags.get("agent"),
+        phase=phase,
+        model=model_name,
+        status="ok",
+    )
+    return record
+
+
+def add_queue_wait(record, seconds):
+    if record is not None:
+        record["queue_wait"] = (record["queue_wait"] or 0.0) + seconds
+
+
+class FirstTokenTimer:
+    """Logits processor that notes when the first token is sampled; scores pass through unchanged."""
+
+    def __init__(self):
+        self.first = None
+
+    def __call__(self, input_ids, scores):
+        if self.first is None:
+            self.first = time.perf_counter()
+        return scores
@@ -36,6 +36,7 @@ BACKEND_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 MASTER_CSV = os.path.join(DATA_DIR, 'frontend_stats.csv')
 LIVE_STATE_FILE = os.path.join(BACKEND_PATH, 'logs', 'live_state.json')
+LIVE_STATE_DELTAS_FILE = os.path.join(BACKEND_PATH, 'logs', 'live_state_deltas.jsonl')
 
 current_game_process = None
 
@@ -238,11 +239,12 @@ def start_game():
         session['num_discussion_messages'] = num_discussion_messages
 
         # reset live state so we don't show a previous game's snapshot
-        try:
-            if os.path.exists(LIVE_STATE_FILE):
-                os.remove(LIVE_STATE_FILE)
-        except Exception as e:
-            print(f"WARNING: Could not clear live_state.json: {e}")
+        for path in (LIVE_STATE_FILE, LIVE_STATE_DELTAS_FILE):
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except Exception as e:
+                print(f"WARNING: Could not clear {os.path.basename(path)}: {e}")
         
         # Build command
         cmd = [
@@ -253,7 +255,8 @@ def start_game():
             '--job_index', '0',
             '--num_rounds', str(num_rounds),
             '--num_ticks', str(num_ticks),
-            '--num_discussion_messages', str(num_discussion_messages)
+            '--num_discussion_messages', str(num_discussion_messages),
+            '--action_delay', '1'  # keep the live map watchable
         ]
         
         print(f"{'='*60}")
@@ -327,25 +330,33 @@ def stop_game():
         return jsonify({'error': str(e)}), 500
 
 
+def _backend_process_error():
+    """Error response if the backend process crashed, else None"""
+    global current_game_process
+
+    # check if backend process is still running
+    if current_game_process is not None:
+        poll_result = current_game_process.poll()
+        if poll_result is not None:
+            if poll_result != 0:
+                current_game_process = None
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Backend process crashed (exit code: {poll_result}). Check terminal for errors.',
+                    'process_ended': True
+                })
+            else:
+                current_game_process = None
+    return None
+
+
 @app.route('/api/game_state')
 def get_game_state():
     """Read live_state.json and return current game state"""
-    global current_game_process
-    
     try:
-        # check if backend process is still running
-        if current_game_process is not None:
-            poll_result = current_game_process.poll()
-            if poll_result is not None:
-                if poll_result != 0:
-                    current_game_process = None
-                    return jsonify({
-                        'status': 'error',
-                        'message': f'Backend process crashed (exit code: {poll_result}). Check terminal for errors.',
-                        'process_ended': True
-                    })
-                else:
-                    current_game_process = None
+        error = _backend_process_error()
+        if error is not None:
+            return error
         
         # check if live_state.json exists
         if not os.path.exists(LIVE_STATE_FILE):
@@ -371,6 +382,47 @@ def get_game_state():
         }), 500
 
 
+@app.route('/api/game_state/deltas')
+def get_game_state_deltas():
+    """Return live state changes published after ?since=<seq>.
+    Falls back to the full state when the client has no seq, belongs to another
+    game, or has fallen behind the available deltas."""
+    since = request.args.get('since', type=int)
+    game_id = request.args.get('game_id')
+    if since is None or not os.path.exists(LIVE_STATE_DELTAS_FILE):
+        return get_game_state()
+
+    try:
+        error = _backend_process_error()
+        if error is not None:
+            return error
+
+        deltas = []
+        latest_seq = 0
+        with open(LIVE_STATE_DELTAS_FILE, 'r') as f:
+            for line in f:
+                try:
+                    delta = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # line still being written
+                latest_seq = delta['seq']
+                if delta['seq'] > since:
+                    deltas.append(delta)
+
+        if latest_seq < since:
+            return get_game_state()
+        if deltas and (deltas[0]['seq'] != since + 1 or str(deltas[0].get('game_id')) != game_id):
+            return get_game_state()
+
+        return jsonify({'seq': latest_seq, 'deltas': deltas})
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
 @app.route('/api/game_status')
 def get_game_status():
     """Check if game is still running"""
@@ -467,6 +467,7 @@ let lastPhase = "";
 let lastRound = 0;
 let clearedAgents = new Set();
 let currentTokenUsage = {};
+let liveState = null;  // last full state from the backend, kept current by applying deltas
 
 // SUSPICION SCORES 
 let enabledClassifiers = {
@@ -980,11 +981,41 @@ function updateLiveFeed(events) {
     }
 }
 
+// Applies one published delta (changed agents/rooms/global keys, new events) to liveState.
+function applyStateDelta(delta) {
+    ["agents", "rooms", "global"].forEach(function(section) {
+        if (delta[section]) Object.assign(liveState[section], delta[section]);
+    });
+    if (delta.events) {
+        Array.prototype.push.apply(liveState.global.ui_event_log, delta.events);
+    }
+    if ("suspicion" in delta) liveState.suspicion = delta.suspicion;
+    if ("token_usage" in delta) liveState.token_usage = delta.token_usage;
+    liveState.seq = delta.seq;
+}
+
+// Fetches the full state once, then only the changes since the last poll.
+async function fetchLiveState() {
+    let url = "/api/game_state";
+    if (liveState && typeof liveState.seq === "number") {
+        url = "/api/game_state/deltas?since=" + liveState.seq + "&game_id=" + encodeURIComponent(liveState.game_id);
+    }
+    const response = await fetch(url);
+    if (!response.ok) return null;
+    const data = await response.json();
+
+    if (Array.isArray(data.deltas)) {
+        data.deltas.forEach(applyStateDelta);
+        return liveState;
+    }
+    liveState = (data.status === undefined && typeof data.seq === "number") ? data : null;
+    return data;
+}
+
 async function updateGameState() {
     try {
-        const response = await fetch("/api/game_state");
-        if (!response.ok) return;
-        const data = await response.json();
+        const data = await fetchLiveState();
+        if (!data) return;
         
         if (!suspicionInitialized) {
             initSuspicionTracking(data);
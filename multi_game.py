@@ -0,0 +1,83 @@
+# multi_game.py
+# Entrypoint for running several games of one composition concurrently in a single controller
+# process: models/workers and the classifiers (via ClassifierRegistry) are loaded once and shared,
+# and the games' LLM requests interleave so the workers always have work queued.
+import argparse
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Importing main applies the same environment setup (.env, LLM_MODE default) as a single game
+from main import load_composition
+from config.settings import NUM_ROUNDS as DEFAULT_NUM_ROUNDS, MAX_MOVEMENT_PHASES, DECISION_WORKERS
+from core.game_engine import GameEngine
+from core.llm import ModelManager
+
+
+def run_game(game_index, args, composition):
+    unique_run_id = f"{args.game_id}_Run{game_index}"
+    seed = args.seed + game_index if args.seed is not None else None
+    num_discussion_messages = composition.get('num_discussion_messages', args.num_discussion_messages)
+    # Each game publishes its own live map inside its log folder instead of sharing logs/live_state.json
+    live_state_file = os.path.join("logs", composition.get("name", "Unknown_Scenario"), f"Game_{unique_run_id}", "live_state.json")
+
+    engine = GameEngine(
+        game_id=unique_run_id,
+        num_agents=composition['honest_count'] + composition['byzantine_count'],
+        num_rounds=args.num_rounds,
+        num_ticks=args.num_ticks,
+        num_discussion_messages=num_discussion_messages,
+        decision_workers=args.decision_workers,
+        action_delay=0,
+        seed=seed,
+        live_state_file=live_state_file,
+    )
+    engine.setup(composition=composition)
+    result = engine.run()
+    print(f"Game {unique_run_id} Over. Result: {result}", flush=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--composition_name", type=str, required=True, help="Name of the composition to run")
+    parser.add_argument("--game_id", type=str, required=True, help="Shared Session ID for IPC")
+    parser.add_argument("--start_index", type=int, default=0, help="Global index of the first game (Run<index> in log names)")
+    parser.add_argument("--num_games", type=int, default=2, help="Number of games to play")
+    parser.add_argument("--concurrency", type=int, default=None, help="Games in flight at once (default: all)")
+    parser.add_argument("--seed", type=int, default=None, help="Base seed; game i uses seed + its global index")
+    parser.add_argument("--num_rounds", type=int, default=DEFAULT_NUM_ROUNDS, help="Number of rounds to play")
+    parser.add_argument("--num_ticks", type=int, default=MAX_MOVEMENT_PHASES, help="Movement ticks per round")
+    parser.add_argument("--num_discussion_messages", type=int, default=2, help="Messages per agent per discussion")
+    parser.add_argument("--decision_workers", type=int, default=DECISION_WORKERS, help="Agents deciding concurrently per tick, per game")
+    args = parser.parse_args()
+
+    composition = load_composition(args.composition_name)
+
+    manager = ModelManager.get_instance()
+    manager.set_game_context(args.game_id, args.composition_name)
+    if manager.mode == "GLOBUS":
+        manager.init_globus_executor()
+
+    game_indices = range(args.start_index, args.start_index + args.num_games)
+    concurrency = args.concurrency or args.num_games
+    print(f"Running {args.num_games} games of {args.composition_name}, {concurrency} at a time", flush=True)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {i: pool.submit(run_game, i, args, composition) for i in game_indices}
+        for i, future in futures.items():
+            try:
+                results[i] = future.result()
+            except Exception:
+                # One crashed game should not take the others down with it
+                print(f"Game {args.game_id}_Run{i} failed:", flush=True)
+                traceback.print_exc()
+                results[i] = None
+
+    for i, result in results.items():
+        print(f"  Run{i}: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,26 +4,22 @@ import re
 import warnings
 import ast
 import pickle
+import hashlib
+import threading
 import joblib
 import pandas as pd
 import numpy as np
-from collections import defaultdict, Counter
-from tqdm import tqdm
-
-from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-from sklearn.svm import LinearSVC
-from sklearn.calibration import CalibratedClassifierCV
-from sklearn.neural_network import MLPClassifier
-import xgboost as xgb
+from collections import defaultdict, Counter, OrderedDict
+
+# tqdm, xgboost and the sklearn training/metrics modules are imported inside the
+# offline training methods: games only import this module for the live pruner.
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from core.stopwords import ENGLISH_STOP_WORDS
 warnings.filterwarnings('ignore')
 
+# Pruned logs remembered by prune_live_log; every hybrid voter of a round prunes the same slice
+PRUNE_CACHE_SIZE = int(os.environ.get("PRUNE_CACHE_SIZE", "64"))
+
 class GameLogLoader:
     def __init__(self, root_dir, cache_dir="classifiers/data"):
         self.root_dir = root_dir
@@ -183,6 +179,7 @@ class GameLogLoader:
         return False
 
     def load_all(self, force_reload=False):
+        from tqdm import tqdm
         if not force_reload and self._load_from_cache():
             
             return self.games_data, self.silent_games
@@ -244,37 +241,56 @@ class DatasetBuilder:
 
 class ContextPruner:
     def __init__(self):
-        self.models = {
-            #'Logistic_Regression': LogisticRegression(max_iter=1000, random_state=42),
-            #'Random_Forest': RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1),
-            'MLP_Net': MLPClassifier(hidden_layer_sizes=(100,), max_iter=500, random_state=42, early_stopping=True),
-            'XGBoost': xgb.XGBClassifier(use_label_encoder=False, eval_metric='logloss', random_state=42),
-            'SVM': CalibratedClassifierCV(LinearSVC(dual='auto', random_state=42), cv=3),
-            #'LightGBM': LGBMClassifier(random_state=42, n_jobs=-1, verbose=-1)
-        }
+        # Candidate estimators are only needed for training; built on first use of self.models
+        self._models = None
         self.best_model_name = None
         self.best_pipeline = None
         self.optimal_threshold = 0.5
         self.global_avg_importance = 0.0
         self.dynamic_thresholds = {}
+
+        # Compiled once: the live pruner runs for every hybrid vote
+        locations = ["Reactor", "Security", "UpperEngine", "LowerEngine", "MedBay", 
+                     "Cafeteria", "Electrical", "Storage", "Admin", "Weapons", 
+                     "Shields", "O2", "Navigation", "Communications"]
+        self.loc_pattern = re.compile(r'\b(?:' + '|'.join(locations) + r')\b', flags=re.IGNORECASE)
+        self.agent_pattern = re.compile(r'\bagent_\d+\b', flags=re.IGNORECASE)
+        self.non_word_pattern = re.compile(r'[^a-z0-9\s_]')
+        self.round_pattern = re.compile(r"=== Round (\d+) ===")
+        self.meeting_pattern = re.compile(r"\*\* MEETING CALLED by (Agent_\d+)")
+        self.talk_pattern = re.compile(r"^(Agent_\d+):\s*(.*)")
+
+        self._prune_cache = OrderedDict()
+        self._prune_cache_lock = threading.Lock()
+        self.prune_cache_hits = 0
+        self.prune_cache_misses = 0
+    
+    @property
+    def models(self):
+        if self._models is None:
+            import xgboost as xgb
+            from sklearn.calibration import CalibratedClassifierCV
+            from sklearn.neural_network import MLPClassifier
+            from sklearn.svm import LinearSVC
+            self._models = {
+                #'Logistic_Regression': LogisticRegression(max_iter=1000, random_state=42),
+                #'Random_Forest': RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1),
+                'MLP_Net': MLPClassifier(hidden_layer_sizes=(100,), max_iter=500, random_state=42, early_stopping=True),
+                'XGBoost': xgb.XGBClassifier(use_label_encoder=False, eval_metric='logloss', random_state=42),
+                'SVM': CalibratedClassifierCV(LinearSVC(dual='auto', random_state=42), cv=3),
+                #'LightGBM': LGBMClassifier(random_state=42, n_jobs=-1, verbose=-1)
+            }
+        return self._models
     
     def _preprocess_live_text(self, text):
         """
         Replicates the DatasetBuilder cleaning so the TF-IDF vectorizer 
         recognizes the vocabulary during live inference.
         """
-        
-        locations = ["Reactor", "Security", "UpperEngine", "LowerEngine", "MedBay", 
-                     "Cafeteria", "Electrical", "Storage", "Admin", "Weapons", 
-                     "Shields", "O2", "Navigation", "Communications"]
-                     
-        loc_pattern = re.compile(r'\b(?:' + '|'.join(locations) + r')\b', flags=re.IGNORECASE)
-        agent_pattern = re.compile(r'\bagent_\d+\b', flags=re.IGNORECASE)
-
         text = text.lower()
-        text = loc_pattern.sub('place', text)
-        text = agent_pattern.sub('agent_x', text)
-        text = re.sub(r'[^a-z0-9\s_]', '', text)
+        text = self.loc_pattern.sub('place', text)
+        text = self.agent_pattern.sub('agent_x', text)
+        text = self.non_word_pattern.sub('', text)
         
         tokens = [word for word in text.split() if word not in ENGLISH_STOP_WORDS]
         return ' '.join(tokens)
@@ -293,6 +309,10 @@ class ContextPruner:
         print("="*50 + "\n")
 
     def _build_pipeline(self, model):
+        from sklearn.compose import ColumnTransformer
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import MinMaxScaler
         preprocessor = ColumnTransformer(
             transformers=[
                 ('text', TfidfVectorizer(max_features=5000, ngram_range=(1, 3)), 'Text'),
@@ -303,6 +323,7 @@ class ContextPruner:
         return Pipeline(steps=[('preprocessor', preprocessor), ('classifier', model)])
 
     def _find_optimal_threshold(self, y_true, y_probs):
+        from sklearn.metrics import f1_score
         best_f1 = -1
         best_thresh = 0.50
         thresholds = np.arange(0.50, 0.95, 0.01)
@@ -316,6 +337,8 @@ class ContextPruner:
         return best_thresh
 
     def train_and_evaluate_all(self, df):
+        from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+        from sklearn.model_selection import train_test_split
         print("="*85)
         print(f"{'TRAINING CLASSIFIERS ON ALL GAMES (GLOBAL THRESHOLD OPTIMIZATION)':^85}")
         print("="*85)
@@ -445,14 +468,15 @@ class ContextPruner:
 
         return dynamic_thresholds
     
-    def load_live_model(self, model_path, thresholds):
+    def load_live_model(self, model_path, thresholds, mmap_mode=None):
         """
         Loads the pre-trained pipeline and dynamic thresholds for live game inference.
+        mmap_mode is passed to joblib.load (e.g. "r" to memory-map the pipeline's arrays).
         """
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Could not find trained model at {model_path}")
             
-        self.best_pipeline = joblib.load(model_path)
+        self.best_pipeline = joblib.load(model_path, mmap_mode=mmap_mode)
         self.dynamic_thresholds = thresholds
         
     def pruner(self, raw_log: str) -> str:
@@ -464,110 +488,133 @@ class ContextPruner:
             print("Pruner not trained/loaded. Returning raw log.")
             return raw_log
 
-        lines = raw_log.strip().split('\n')
-        pruned_lines = []
-        surviving_agents = set()
+        lines = [line.strip() for line in raw_log.strip().split('\n')]
+        lines = [line for line in lines if line]
 
-        # Count active speakers per round to set dynamic 'n' 
+        # Parse once: speakers per round (dynamic 'n') and the model inputs of every statement.
+        # Reporter/statement-number features depend only on the log, never on the scores,
+        # so all statements can be scored together before the sequential pass.
         agents_per_round = defaultdict(set)
+        events = []
+        rows = []
         curr_r = 0
-        for line in lines:
-            line = line.strip()
-            if line.startswith("=== Round"):
-                match = re.search(r"=== Round (\d+) ===", line)
-                if match:
-                    curr_r = int(match.group(1))
-            elif line.startswith("Agent_"):
-                agent_match = re.match(r"^(Agent_\d+):", line)
-                if agent_match:
-                    agents_per_round[curr_r].add(agent_match.group(1))
-
-        # Prune the log sequentially 
-        suspicion_state = {}
-        threshold = self.dynamic_thresholds.get('fallback', 0.5)
         statement_counts = defaultdict(int)
         meeting_caller = None
-        prior = 0.1
-        n_agents = 0
 
         for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
             # System & Game Info lines
             if line.startswith("===") or line.startswith("**"):
-                pruned_lines.append(line)
-
-                # Reset trackers if it's a new round
+                round_num = None
                 if line.startswith("=== Round"):
-                    match = re.search(r"=== Round (\d+) ===", line)
+                    match = self.round_pattern.search(line)
                     if match:
-                        current_round = int(match.group(1))
-                        n_agents = len(agents_per_round[current_round])
-
-                        # Initialize Suspicion Vector for the new round
-                        prior = 1.0 / n_agents if n_agents > 0 else 0.1
-                        suspicion_state = {agent: prior for agent in agents_per_round[current_round]}
-                        
+                        round_num = curr_r = int(match.group(1))
                         statement_counts.clear()
                         meeting_caller = None
 
-                        surviving_agents.clear()
-
-                        # Fetch correct dynamic threshold
-                        threshold = self.dynamic_thresholds.get(n_agents, self.dynamic_thresholds.get('fallback', 0.5))
-
                 # Track the reporter
                 elif line.startswith("** MEETING CALLED by"):
-                    caller_match = re.search(r"\*\* MEETING CALLED by (Agent_\d+)", line)
+                    caller_match = self.meeting_pattern.search(line)
                     if caller_match:
                         meeting_caller = caller_match.group(1)
+                events.append((line, round_num, None))
 
-            # 2. Agent Statements 
+            # Agent Statements
             elif line.startswith("Agent_"):
-                agent_match = re.match(r"^(Agent_\d+):\s*(.*)", line)
+                agent_match = self.talk_pattern.match(line)
                 if agent_match:
                     agent_name = agent_match.group(1)
-                    raw_text = agent_match.group(2)
+                    agents_per_round[curr_r].add(agent_name)
 
                     # Update interaction metrics
                     statement_counts[agent_name] += 1
                     s_num = min(statement_counts[agent_name], 2)
                     is_reporter = 1 if (agent_name == meeting_caller and s_num == 1) else 0
-
-                    # Preprocess for the model
-                    clean_text = self._preprocess_live_text(raw_text)
-
-                    # Predict
-                    df_statement = pd.DataFrame([{
-                        'Text': clean_text,
+                    rows.append({
+                        'Text': self._preprocess_live_text(agent_match.group(2)),
                         'Reported': is_reporter,
                         'Statement_Num': s_num
-                    }])
+                    })
+                    events.append((line, None, agent_name))
+
+        # Score every statement in one vectorized call
+        probs = self.best_pipeline.predict_proba(pd.DataFrame(rows))[:, 1] if rows else []
+
+        # Replay the sequential pruning over the precomputed scores
+        pruned_lines = []
+        surviving_agents = set()
+        suspicion_state = {}
+        threshold = self.dynamic_thresholds.get('fallback', 0.5)
+        prior = 0.1
+        n_agents = 0
+        next_prob = 0
 
-                    new_prob = self.best_pipeline.predict_proba(df_statement)[0][1]
-                    old_prob = suspicion_state.get(agent_name, prior)
+        for line, round_num, agent_name in events:
+            if agent_name is None:
+                pruned_lines.append(line)
 
-                    # Calculate Vector Shift I(t)
-                    shift = abs(new_prob - old_prob)
+                # Reset trackers if it's a new round
+                if round_num is not None:
+                    n_agents = len(agents_per_round[round_num])
 
-                    # Apply dynamic threshold filter
-                    if n_agents < 4 or shift >= threshold:
-                        # Append the original RAW line so the LLM gets proper grammar/names
-                        pruned_lines.append(line) 
-                        # Only update the state if the statement was significant enough to keep
-                        suspicion_state[agent_name] = new_prob 
+                    # Initialize Suspicion Vector for the new round
+                    prior = 1.0 / n_agents if n_agents > 0 else 0.1
+                    suspicion_state = {agent: prior for agent in agents_per_round[round_num]}
+                    surviving_agents.clear()
 
-                        surviving_agents.add(agent_name)
+                    # Fetch correct dynamic threshold
+                    threshold = self.dynamic_thresholds.get(n_agents, self.dynamic_thresholds.get('fallback', 0.5))
+                continue
+
+            new_prob = probs[next_prob]
+            next_prob += 1
+            old_prob = suspicion_state.get(agent_name, prior)
+
+            # Calculate Vector Shift I(t)
+            shift = abs(new_prob - old_prob)
+
+            # Apply dynamic threshold filter
+            if n_agents < 4 or shift >= threshold:
+                # Append the original RAW line so the LLM gets proper grammar/names
+                pruned_lines.append(line) 
+                # Only update the state if the statement was significant enough to keep
+                suspicion_state[agent_name] = new_prob 
+
+                surviving_agents.add(agent_name)
 
         # Return the condensed string format
         return "\n".join(pruned_lines), suspicion_state, surviving_agents
 
+    def _prune_cache_key(self, raw_log):
+        thresholds = repr(sorted(self.dynamic_thresholds.items(), key=lambda item: str(item[0])))
+        digest = hashlib.sha1(raw_log.encode("utf-8"))
+        digest.update(thresholds.encode("utf-8"))
+        return id(self.best_pipeline), digest.hexdigest()
+
     def prune_live_log(self, raw_log: str) -> str:
-        """Live inference entry point
+        """Live inference entry point. Results are memoized (LRU of PRUNE_CACHE_SIZE)
+        by the log and threshold table, so voters sharing a round's log prune it once.
         """
-        return self.pruner(raw_log)
+        if not self.best_pipeline or PRUNE_CACHE_SIZE <= 0:
+            return self.pruner(raw_log)
+
+        key = self._prune_cache_key(raw_log)
+        with self._prune_cache_lock:
+            cached = self._prune_cache.get(key)
+            if cached is not None:
+                self._prune_cache.move_to_end(key)
+                self.prune_cache_hits += 1
+        if cached is None:
+            cached = self.pruner(raw_log)
+            with self._prune_cache_lock:
+                self.prune_cache_misses += 1
+                self._prune_cache[key] = cached
+                while len(self._prune_cache) > PRUNE_CACHE_SIZE:
+                    self._prune_cache.popitem(last=False)
+
+        # Callers get their own suspicion state and survivor set
+        pruned_log, suspicion_state, surviving_agents = cached
+        return pruned_log, dict(suspicion_state), set(surviving_agents)
 
 
 if __name__ == "__main__":
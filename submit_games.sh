@@ -23,8 +23,16 @@ mkdir -p "$IPC_DIR"
 # uv is bundled with the conda module on HiPerGator
 module load conda
 
-MODELS_PER_GPU=10
 GAMES_PER_JOB=2
+mapfile -t NODE_ARRAY < <(scontrol show hostnames $SLURM_JOB_NODELIST)
+
+# Memory of one GPU (B200); MAX_GPUS caps the GPUs the planner may use
+# (default: the job's allocation, GPUs per node x nodes)
+GPU_MEM_GB=${GPU_MEM_GB:-180}
+GPUS_PER_NODE=${SLURM_GPUS_ON_NODE:-}
+if [ -n "$GPUS_PER_NODE" ]; then
+    MAX_GPUS=${MAX_GPUS:-$(( GPUS_PER_NODE * ${#NODE_ARRAY[@]} ))}
+fi
 MODEL_LIST=$(uv run -m config.generate_batch_list "$COMP_NAME")
 if [ $? -ne 0 ]; then
     echo "Error: Could not determine models for composition '$COMP_NAME'"
@@ -33,24 +41,54 @@ fi
 MODEL_ARRAY=($MODEL_LIST) 
 TOTAL_MODELS=${#MODEL_ARRAY[@]}
 
-mapfile -t NODE_ARRAY < <(scontrol show hostnames $SLURM_JOB_NODELIST)
+# One line per worker: "<gpus> <memory budget GB> <comma-separated models>"
+mapfile -t WORKER_PLAN < <(uv run -m core.placement "$COMP_NAME" --gpu-mem-gb "$GPU_MEM_GB" ${MAX_GPUS:+--max-gpus "$MAX_GPUS"})
+if [ ${#WORKER_PLAN[@]} -eq 0 ]; then
+    echo "Error: Could not plan worker placement for composition '$COMP_NAME'"
+    exit 1
+fi
 
-for (( i=0; i<TOTAL_MODELS; i+=MODELS_PER_GPU )); do
+# Place every worker on a node with enough free GPUs before launching any, so a
+# plan larger than the allocation fails now instead of queueing srun steps
+# until the ready loop times out
+declare -A FREE_GPUS
+for NODE in "${NODE_ARRAY[@]}"; do
+    FREE_GPUS[$NODE]=${GPUS_PER_NODE:-0}
+done
+WORKER_NODES=()
+for (( w=0; w<${#WORKER_PLAN[@]}; w++ )); do
+    read -r WORKER_GPUS _ _ <<< "${WORKER_PLAN[$w]}"
+    if [ -z "$GPUS_PER_NODE" ]; then
+        # GPU count unknown (outside SLURM's GPU allocation): spread workers over the nodes
+        WORKER_NODES+=("${NODE_ARRAY[$(( w % ${#NODE_ARRAY[@]} ))]}")
+        continue
+    fi
+    TARGET=""
+    for NODE in "${NODE_ARRAY[@]}"; do
+        if [ "${FREE_GPUS[$NODE]}" -ge "$WORKER_GPUS" ]; then
+            TARGET=$NODE
+            break
+        fi
+    done
+    if [ -z "$TARGET" ]; then
+        echo "Error: Worker plan needs more GPUs than allocated (${#NODE_ARRAY[@]} node(s) x $GPUS_PER_NODE GPUs):"
+        printf '  %s\n' "${WORKER_PLAN[@]}"
+        exit 1
+    fi
+    FREE_GPUS[$TARGET]=$(( FREE_GPUS[$TARGET] - WORKER_GPUS ))
+    WORKER_NODES+=("$TARGET")
+done
 
-    NODE_IDX=$(( i / MODELS_PER_GPU ))    
-    CURRENT_NODE=${NODE_ARRAY[$NODE_IDX]}
+for (( w=0; w<${#WORKER_PLAN[@]}; w++ )); do
 
-    CURRENT_MODELS=("${MODEL_ARRAY[@]:$i:$MODELS_PER_GPU}")
-    
-    IFS=',' 
-    MODELS_TO_PASS="${CURRENT_MODELS[*]}"
-    unset IFS 
+    read -r WORKER_GPUS MEMORY_BUDGET_GB MODELS_TO_PASS <<< "${WORKER_PLAN[$w]}"
+    CURRENT_NODE=${WORKER_NODES[$w]}
 
-    echo "Launching Worker on node: $CURRENT_NODE with models: $MODELS_TO_PASS"
-    srun --ntasks=1 \
+    echo "Launching Worker on node: $CURRENT_NODE ($WORKER_GPUS GPU) with models: $MODELS_TO_PASS"
+    MODEL_MEMORY_BUDGET_GB=$MEMORY_BUDGET_GB srun --ntasks=1 \
          --nodes=1 \
          -exclusive \
-         --gpus-per-task=1 \
+         --gpus-per-task=$WORKER_GPUS \
          --nodelist=$CURRENT_NODE \
          --cpu-bind=none \
          uv run -m worker \
@@ -87,20 +125,20 @@ echo "Running Composition: $COMP_NAME"
 
 START_INDEX=$(( TASK_ID * GAMES_PER_JOB ))
 
-for (( j=0; j<GAMES_PER_JOB; j++ )); do
-    CURRENT_GAME_IDX=$(( START_INDEX + j ))
-    
-    echo ">>> Starting Game $j (Global Index $CURRENT_GAME_IDX)"
-    
-    uv run -m main \
-        --composition_name "$COMP_NAME" \
-        --job_index $CURRENT_GAME_IDX \
-        --game_id "$SESSION_ID" 
-        
-    echo "Game $j finished."
-    rm -f "$IPC_DIR"/*
-done
-rmdir "$IPC_DIR" 2>/dev/null
+# All games of this job share one controller process (and the workers above);
+# GAME_CONCURRENCY=1 plays them one after another.
+GAME_CONCURRENCY=${GAME_CONCURRENCY:-$GAMES_PER_JOB}
+echo ">>> Starting Games $START_INDEX-$(( START_INDEX + GAMES_PER_JOB - 1 )) ($GAME_CONCURRENCY at a time)"
+
+uv run -m multi_game \
+    --composition_name "$COMP_NAME" \
+    --game_id "$SESSION_ID" \
+    --start_index $START_INDEX \
+    --num_games $GAMES_PER_JOB \
+    --concurrency $GAME_CONCURRENCY
+
+echo "Games finished."
+rm -rf "$IPC_DIR"
 kill $(jobs -p) 2>/dev/null || true
 wait
 sacct -j $SLURM_JOB_ID --format=JobID,JobName,Partition,MaxRSS,Elapsed,State
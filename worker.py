@@ -2,56 +2,263 @@
 import os
 import traceback
 os.environ["LLM_MODE"] = "WORKER"
+os.environ["LLM_CACHE_MODE"] = "off"  # responses are cached by the controller, not per worker
 import sys
 import time
 import json
 import glob
 import argparse
-from core.llm import ModelManager
-import gc       
-import torch    
+import queue
+from collections import Counter, defaultdict
+from core.llm import ModelManager, MAX_LOCAL_BATCH
+from core.ipc import IPC_TRANSPORT, WorkerServer, sanitize_model_name, write_ready_signal
+from core.telemetry import REMOTE_FIELDS, new_record
+from core.generation_profiles import GenerationProfile, get_profile
+import gc
+import torch
+
+# Most requests taken off the queue (or IPC directory) for one round of batched generation
+WORKER_MAX_BATCH = int(os.environ.get("WORKER_MAX_BATCH", str(MAX_LOCAL_BATCH * 2)))
+# Free the CUDA cache only once free GPU memory falls below this fraction of the device
+WORKER_FLUSH_FREE_FRACTION = float(os.environ.get("WORKER_FLUSH_FREE_FRACTION", "0.1"))
+# "static": batch whatever is queued per cycle; "continuous": admit requests into a running decode loop
+WORKER_SCHEDULER = os.environ.get("WORKER_SCHEDULER", "static").lower()
+# Seconds between batch statistics printouts
+WORKER_STATS_INTERVAL = float(os.environ.get("WORKER_STATS_INTERVAL", "60"))
 
 def flush_memory():
     gc.collect()
     if torch.cuda.is_available():
         torch.cuda.empty_cache()
-def run_worker(game_id, model_names_str, comp_name):
-    # Set mode to LOCAL loads models
-    os.environ["LLM_MODE"] = "LOCAL" 
-    model_list = [m.strip() for m in model_names_str.split(',') if m.strip()]
-    print(f"--- Starting Worker for Game {game_id} ---")
 
-    manager = ModelManager.get_instance()
-    
-    for model_name in model_list:
-        manager.load_model(model_name)
-  
-    ipc_path = os.path.join("logs", comp_name, f"Game_{game_id}", "ipc")
-    #  prevent race conditions on startup
+def under_memory_pressure():
+    if not torch.cuda.is_available():
+        return False
+    for device in range(torch.cuda.device_count()):
+        free, total = torch.cuda.mem_get_info(device)
+        if free < total * WORKER_FLUSH_FREE_FRACTION:
+            return True
+    return False
+
+class WorkerStats:
+    """Batch sizes and queue wait (controller submit -> batch start) of the requests served."""
+
+    def __init__(self):
+        self.batches = 0
+        self.requests = 0
+        self.flushes = 0
+        self.batch_sizes = Counter()
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._last_report = time.time()
+        self._reported_requests = 0
+
+    def record_batch(self, requests, started):
+        """Returns the queue wait of each request."""
+        self.batches += 1
+        self.batch_sizes[len(requests)] += 1
+        return [self.record_request(data, started) for data in requests]
+
+    def record_request(self, data, started):
+        """Returns the request's queue wait in seconds."""
+        self.requests += 1
+        # created_at is stamped by the controller; clamp small clock skew between nodes
+        wait = max(0.0, started - data.get("created_at", started))
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return wait
+
+    def maybe_report(self, force=False, batcher_stats=None):
+        now = time.time()
+        if self.requests == self._reported_requests or (not force and now - self._last_report < WORKER_STATS_INTERVAL):
+            return
+        self._last_report = now
+        self._reported_requests = self.requests
+        batchers = batcher_stats() if batcher_stats else None
+        if batchers:
+            batching = "; ".join(f"{name}: {summary}" for name, summary in batchers.items())
+        else:
+            sizes = ", ".join(f"{size}x{count}" for size, count in sorted(self.batch_sizes.items()))
+            batching = f"{self.batches} batches (avg {self.requests / max(1, self.batches):.1f}; sizes {sizes})"
+        print(f"[Worker] {self.requests} requests, {batching}; "
+              f"queue wait avg {self.total_wait / self.requests:.2f}s max {self.max_wait:.2f}s; "
+              f"{self.flushes} cache flushes", flush=True)
+
+def worker_metrics(record):
+    """Part of a telemetry record sent back to the controller with the response."""
+    return {field: record[field] for field in REMOTE_FIELDS}
+
+def request_profile(data):
+    """The controller's GenerationProfile for a request (older controllers send only the phase, or neither)."""
+    if data.get("profile"):
+        return GenerationProfile.from_dict(data["profile"])
+    return get_profile(data.get("phase"))
+
+def score_request(manager, data, record):
+    """Answers a request the controller wants scored (option scoring, see ModelManager.score_options)."""
     try:
-        os.makedirs(ipc_path, exist_ok=True)
-    except OSError:
-        pass
-    
-    for model_name in model_list:
-        sanitized_name = model_name.replace("/", "_").replace("-", "_")
-        ready_file = os.path.join(ipc_path, f"ready_{sanitized_name}.signal")
-        with open(ready_file, 'w') as f:
-            pass
+        return manager.score_options(data["model_name"], data["system_prompt"], data["user_prompt"],
+                                     data["answers"], data["temperature"], phase=data.get("phase"), record=record)
+    except Exception as e:
+        print(f"Error scoring options for {data['model_name']}: {e}")
+        return "ERROR"
+
+def generate_batches(manager, requests, model_list, stats):
+    """Runs the requests (payload dicts) grouped by model and phase.
+
+    Returns {request id: (response text, metrics for the controller's telemetry record)}.
+    """
+    started = time.time()
+    waits = stats.record_batch(requests, started)
+
+    by_model = defaultdict(list)
+    responses = {}
+    for data, wait in zip(requests, waits):
+        if data["model_name"] in model_list:
+            record = new_record(data["model_name"], data.get("phase"))
+            record["queue_wait"] = wait
+            if data.get("score"):
+                responses[data["id"]] = (score_request(manager, data, record), worker_metrics(record))
+                continue
+            by_model[(data["model_name"], data.get("phase"))].append((data, record))
+        else:
+            responses[data["id"]] = ("ERROR", None)
+
+    for (model_name, _), batch in by_model.items():
+        records = [record for _, record in batch]
+        try:
+            texts = manager.generate_batch(
+                model_name,
+                [(d["system_prompt"], d["user_prompt"], d["temperature"]) for d, _ in batch],
+                records=records,
+                answers=[d.get("answers") for d, _ in batch],
+                profile=request_profile(batch[0][0]),
+            )
+        except Exception as e:
+            print(f"Error processing batch for {model_name}: {e}")
+            texts = ["ERROR"] * len(batch)
+            flush_memory()
+            stats.flushes += 1
+        for (data, record), text in zip(batch, texts):
+            responses[data["id"]] = (text, worker_metrics(record))
+
+    if under_memory_pressure():
+        flush_memory()
+        stats.flushes += 1
+    stats.maybe_report()
+    return responses
+
+def serve_socket(manager, server, model_list):
+    """Answers requests pushed by controllers over the worker's socket.
+
+    Blocks for one request, then drains whatever else is already queued (up to
+    WORKER_MAX_BATCH) so concurrent requests to a model share one generate call.
+    """
+    stats = WorkerStats()
+    while True:
+        try:
+            pending = [server.requests.get(timeout=WORKER_STATS_INTERVAL)]
+        except queue.Empty:
+            stats.maybe_report(force=True)
+            continue
+        while len(pending) < WORKER_MAX_BATCH:
+            try:
+                pending.append(server.requests.get_nowait())
+            except queue.Empty:
+                break
+
+        try:
+            responses = generate_batches(manager, [data for data, _ in pending], model_list, stats)
+        except Exception as e:
+            print(f"Error processing loop: {e}")
+            responses = {}
+            flush_memory()
+
+        for data, reply in pending:
+            text, metrics = responses.get(data.get("id"), ("ERROR", None))
+            reply({"id": data.get("id"), "response": text, "metrics": metrics})
+
+def serve_socket_continuous(manager, server, model_list):
+    """Socket transport with continuous batching: every request joins its model's
+    running decode loop right away and is answered as soon as it finishes."""
+    stats = WorkerStats()
+    while True:
+        try:
+            data, reply = server.requests.get(timeout=WORKER_STATS_INTERVAL)
+        except queue.Empty:
+            stats.maybe_report(force=True, batcher_stats=manager.batcher_stats)
+            continue
+
+        if data.get("model_name") not in model_list:
+            reply({"id": data.get("id"), "response": "ERROR"})
+            continue
+        record = new_record(data["model_name"], data.get("phase"))
+        record["queue_wait"] = stats.record_request(data, time.time())
+        if data.get("score"):
+            # One forward pass over the options; no decoding to overlap with
+            response_text = score_request(manager, data, record)
+            reply({"id": data["id"], "response": response_text, "metrics": worker_metrics(record)})
+            continue
+
+        def answer(future, data=data, reply=reply, record=record):
+            try:
+                response_text = future.result()
+            except Exception as e:
+                print(f"Error processing loop: {e}")
+                response_text = "ERROR"
+            reply({"id": data["id"], "response": response_text, "metrics": worker_metrics(record)})
+
+        try:
+            manager.generate_continuous(
+                data["model_name"],
+                data["system_prompt"],
+                data["user_prompt"],
+                data["temperature"],
+                record=record,
+                profile=request_profile(data),
+                answers=data.get("answers"),
+            ).add_done_callback(answer)
+        except Exception as e:
+            print(f"Error processing loop: {e}")
+            reply({"id": data.get("id"), "response": "ERROR"})
 
+        if under_memory_pressure():
+            flush_memory()
+            stats.flushes += 1
+        stats.maybe_report(batcher_stats=manager.batcher_stats)
+
+def write_response(ipc_path, request_id, response_text, metrics=None):
+    response_path = os.path.join(ipc_path, f"{request_id}_response.json")
+    temp_path = response_path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump({"id": request_id, "response": response_text, "metrics": metrics}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.rename(temp_path, response_path)
+
+def serve_files(manager, ipc_path, model_list):
+    """Legacy transport: polls the IPC directory for request files.
+
+    Every pending request file for this worker's models is claimed (up to
+    WORKER_MAX_BATCH), generated as one batch per model, and answered.
+    """
+    stats = WorkerStats()
     while True:
         files = glob.glob(os.path.join(ipc_path, "*.json"))
         relevant_files = []
         for f in files:
             if f.endswith("_response.json") or f.endswith(".lock"):
                 continue
-        
-            if any(m.replace("/", "_").replace("-", "_") in f for m in model_list):
+
+            if any(sanitize_model_name(m) in f for m in model_list):
                 relevant_files.append(f)
 
+        claimed = []
         for req_file in relevant_files:
+            if len(claimed) >= WORKER_MAX_BATCH:
+                break
             lock_file = req_file + ".lock"
-            
+
             # Attempt to Lock file (Atomic rename)
             try:
                 os.rename(req_file, lock_file)
@@ -62,47 +269,82 @@ def run_worker(game_id, model_names_str, comp_name):
             try:
                 with open(lock_file, "r") as f:
                     data = json.load(f)
-                
-                if data["model_name"] not in model_list:
-                    # unlock it
-                    try:
-                        os.rename(lock_file, req_file)
-                    except OSError:
-                        pass
-                    continue
-                                
-                response_text = manager.generate(
-                    data["model_name"],
-                    data["system_prompt"],
-                    data["user_prompt"],
-                    data["temperature"]
-                )
-                
-                response_path = os.path.join(ipc_path, f"{data['id']}_response.json")
-                temp_path = response_path + ".tmp"
-                with open(temp_path, "w") as f:
-                    json.dump({"id": data["id"], "response": response_text}, f)
-                    f.flush()
-                    os.fsync(f.fileno())
-                os.rename(temp_path, response_path)
-                
+            except Exception as e:
+                print(f"Error processing loop: {e}")
+                data = None
+
+            if data is None or data["model_name"] not in model_list:
+                # unlock it
                 try:
-                    os.remove(lock_file)
+                    os.rename(lock_file, req_file)
                 except OSError:
                     pass
-                flush_memory()
-                
-            except Exception as e:
-                print(f"Error processing loop: {e}")
-                if os.path.exists(lock_file):
+                continue
+            claimed.append((data, req_file, lock_file))
+
+        if claimed:
+            try:
+                responses = generate_batches(manager, [data for data, _, _ in claimed], model_list, stats)
+                for data, _, lock_file in claimed:
+                    write_response(ipc_path, data["id"], *responses[data["id"]])
                     try:
-                        os.rename(lock_file, req_file)
+                        os.remove(lock_file)
                     except OSError:
                         pass
+
+            except Exception as e:
+                print(f"Error processing loop: {e}")
+                # Hand unanswered requests back for another attempt
+                for _, req_file, lock_file in claimed:
+                    if os.path.exists(lock_file):
+                        try:
+                            os.rename(lock_file, req_file)
+                        except OSError:
+                            pass
                 flush_memory()
-                
+            continue
+
+        stats.maybe_report()
         time.sleep(0.1)
 
+def run_worker(game_id, model_names_str, comp_name, transport=IPC_TRANSPORT, scheduler=WORKER_SCHEDULER):
+    # Set mode to LOCAL loads models
+    os.environ["LLM_MODE"] = "LOCAL"
+    model_list = [m.strip() for m in model_names_str.split(',') if m.strip()]
+    print(f"--- Starting Worker for Game {game_id} ({transport} IPC) ---")
+
+    manager = ModelManager.get_instance()
+
+    for model_name in model_list:
+        # Oversubscribed workers (MODEL_MEMORY_BUDGET_GB) load the rest on first request
+        if not manager.has_memory_for(model_name):
+            print(f"Deferring {model_name}: memory budget is full, it loads on first request")
+            continue
+        manager.load_model(model_name)
+
+    ipc_path = os.path.join("logs", comp_name, f"Game_{game_id}", "ipc")
+    #  prevent race conditions on startup
+    try:
+        os.makedirs(ipc_path, exist_ok=True)
+    except OSError:
+        pass
+
+    server = WorkerServer().start() if transport == "socket" else None
+
+    # Ready signals double as the address book: controllers connect to the
+    # advertised host:port with the token next to it, an empty signal means "use IPC files"
+    for model_name in model_list:
+        write_ready_signal(ipc_path, model_name, server.signal if server else "")
+
+    if server and scheduler == "continuous":
+        serve_socket_continuous(manager, server, model_list)
+    elif server:
+        serve_socket(manager, server, model_list)
+    else:
+        if scheduler == "continuous":
+            print("Continuous batching needs the socket transport; batching per polling cycle instead.")
+        serve_files(manager, ipc_path, model_list)
+
 if __name__ == "__main__":
 
     try:
@@ -110,9 +352,11 @@ if __name__ == "__main__":
         parser.add_argument("--game_id", type=str, required=True)
         parser.add_argument("--model_names", type=str, required=True)
         parser.add_argument("--comp_name", type=str, required=True)
+        parser.add_argument("--transport", type=str, choices=["socket", "file"], default=IPC_TRANSPORT)
+        parser.add_argument("--scheduler", type=str, choices=["static", "continuous"], default=WORKER_SCHEDULER)
         args = parser.parse_args()
-        run_worker(args.game_id, args.model_names, args.comp_name)
+        run_worker(args.game_id, args.model_names, args.comp_name, args.transport, args.scheduler)
     except Exception:
         traceback.print_exc()
-        sys.stdout.flush()     
-        sys.stderr.flush()
\ No newline at end of file
+        sys.stdout.flush()
+        sys.stderr.flush()